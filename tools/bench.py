@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Offline fetch benchmarks against the local Zotero stand-in.
+
+uv run tools/bench.py fetch --items 2000 --latency 0.05 --workers 4 --workers 8 --workers 16
+uv run tools/bench.py fetch --fixture library.json --engine async --rate-limit 20
+uv run tools/bench.py parse --items 20000
+"""
+
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+
+from fetch import SKIP_TYPES, ItemParser, ZoteroFetcherConfig, fetch_from_zotero, parse_item, parse_items
+from models import Publication
+from zotero_standin import StandInLibrary, server_url, synthetic_items
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class FetchRun:
+    """Outcome of one fetch against the stand-in."""
+
+    engine: str
+    workers: int
+    bulk: bool
+    items: int
+    requests: int
+    rate_limited: int
+    seconds: float
+
+    def row(self) -> str:
+        rate = self.items / self.seconds if self.seconds else 0.0
+        return (
+            f"{self.engine:<8}{self.workers:>8}{'yes' if self.bulk else 'no':>6}{self.items:>8}"
+            f"{self.requests:>10}{self.rate_limited:>6}{self.seconds:>9.2f}{rate:>10.0f}"
+        )
+
+
+HEADER = f"{'engine':<8}{'workers':>8}{'bulk':>6}{'items':>8}{'requests':>10}{'429s':>6}{'seconds':>9}{'items/s':>10}"
+
+
+def bench_fetch(library: StandInLibrary, config: ZoteroFetcherConfig) -> FetchRun:
+    """Fetch the whole library once and report what it cost."""
+    requests, rate_limited = len(library.requests), library.rate_limited
+    started = time.perf_counter()
+    items = fetch_from_zotero(config)
+    return FetchRun(
+        engine=config.engine,
+        workers=config.workers,
+        bulk=config.bulk,
+        items=len(items),
+        requests=len(library.requests) - requests,
+        rate_limited=library.rate_limited - rate_limited,
+        seconds=time.perf_counter() - started,
+    )
+
+
+@dataclass
+class ParseRun:
+    """Best of several timed runs of one parse path."""
+
+    path: str
+    items: int
+    seconds: float
+
+    def row(self) -> str:
+        rate = self.items / self.seconds if self.seconds else 0.0
+        return f"{self.path:<14}{self.items:>8}{self.seconds:>9.3f}{rate:>10.0f}"
+
+
+PARSE_HEADER = f"{'path':<14}{'items':>8}{'seconds':>9}{'items/s':>10}"
+
+
+def parse_batched(items: list[dict[str, Any]]) -> list[Publication]:
+    """ItemParser without the relation merges: plain fields, validated PARSE_BATCH at a time."""
+    parser = ItemParser()
+    for item in items:
+        parser.add(item)
+    parser.flush()
+    return parser.publications
+
+
+def bench_parse(items: list[dict[str, Any]], repeat: int) -> list[ParseRun]:
+    """Time constructing Publications one model at a time against one batched validation."""
+    datas = [item["data"] for item in items if item["data"].get("itemType") not in SKIP_TYPES]
+    paths: dict[str, Callable[[], object]] = {
+        "per-item": lambda: [pub for data in datas if (pub := parse_item(data))],
+        "batched": lambda: parse_batched(items),
+        "parse_items": lambda: parse_items(items),
+    }
+    runs = []
+    for path, parse in paths.items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            parse()
+            timings.append(time.perf_counter() - started)
+        runs.append(ParseRun(path, len(items), min(timings)))
+    return runs
+
+
+@click.group()
+def main() -> None:
+    """Benchmark archive tools offline."""
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+
+
+@main.command()
+@click.option("--fixture", type=click.Path(exists=True), help="Raw items recorded with zotero_standin.py record")
+@click.option("--items", type=int, default=1000, help="Synthetic library size (without --fixture)")
+@click.option("--latency", type=float, default=0.02, help="Seconds the stand-in adds to every response")
+@click.option("--rate-limit", type=float, help="Stand-in requests/second before answering 429")
+@click.option("--incomplete", is_flag=True, help="Listings without item data, forcing detail requests")
+@click.option("--engine", type=click.Choice(["threads", "async"]), multiple=True, help="Engines to compare")
+@click.option("--workers", type=int, multiple=True, help="Worker counts to compare")
+@click.option("--bulk/--no-bulk", default=True, help="Batch detail requests")
+@click.option("--retry-budget", type=int, default=30, help="Retries shared by all workers")
+def fetch(
+    fixture: str | None,
+    items: int,
+    latency: float,
+    rate_limit: float | None,
+    incomplete: bool,
+    engine: tuple[str, ...],
+    workers: tuple[int, ...],
+    bulk: bool,
+    retry_budget: int,
+) -> None:
+    """Time full fetches for every engine × workers combination."""
+    library = (
+        StandInLibrary.from_fixture(Path(fixture), rate_limit=rate_limit, complete=not incomplete)
+        if fixture
+        else StandInLibrary(synthetic_items(items), rate_limit=rate_limit, complete=not incomplete)
+    )
+    server = library.serve(latency=latency)
+    url = server_url(server)
+    click.echo(HEADER)
+    try:
+        for eng in engine or ("threads",):
+            for count in workers or (8,):
+                config = ZoteroFetcherConfig(
+                    api_key="bench",
+                    library_id=1,
+                    workers=count,
+                    retry_budget=retry_budget,
+                    bulk=bulk,
+                    engine=eng,
+                    endpoint=url,
+                )
+                click.echo(bench_fetch(library, config).row())
+    finally:
+        server.shutdown()
+
+
+@main.command()
+@click.option("--fixture", type=click.Path(exists=True), help="Raw items recorded with zotero_standin.py record")
+@click.option("--items", type=int, default=10000, help="Synthetic library size (without --fixture)")
+@click.option("--repeat", type=int, default=5, help="Runs per path; the best is reported")
+def parse(fixture: str | None, items: int, repeat: int) -> None:
+    """Time parsing raw items into Publications."""
+    raw = json.loads(Path(fixture).read_text()) if fixture else synthetic_items(items)
+    logging.getLogger("fetch").setLevel(logging.ERROR)  # one warning per skipped attachment
+    click.echo(PARSE_HEADER)
+    for run in bench_parse(raw, repeat):
+        click.echo(run.row())
+
+
+if __name__ == "__main__":
+    main()
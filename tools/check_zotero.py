@@ -1,23 +1,129 @@
 #!/usr/bin/env python3
-"""Check if Zotero My Publications have changed. Outputs SHA256 hash of versions."""
+"""Check if Zotero My Publications have changed.
+
+By default outputs a SHA256 hash of all publication versions. With --state,
+asks only for what changed since the library version stored there and
+outputs the change set as JSON.
+"""
 
 import hashlib
 import json
 import os
 import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
 
+import click
+import httpx
 from pyzotero import zotero
 
+from fetch import Library
+from models import get_cache_dir
+from zotero_api import API_URL, RateLimiter, ResponseCache, sync_client
+
+
+def get_publications_hash(library_id: int, library_type: str, api_key: str, cache_dir: Path | None = None) -> str:
+    """Fetch publication versions from Zotero and return their SHA256 hash.
 
-def get_publications_hash(library_id: int, library_type: str, api_key: str) -> str:
-    """Fetch publication versions from Zotero and return their SHA256 hash."""
-    zt = zotero.Zotero(library_id, library_type, api_key)
-    versions: dict[str, int] = zt.publications(format="versions")
+    With `cache_dir`, the request is conditional on the cached library
+    version: an unchanged library answers 304 and the cached map is hashed.
+    """
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    zt = zotero.Zotero(library_id, library_type, api_key, client=sync_client(api_key, RateLimiter(), cache))
+    # Only user libraries have My Publications; a group publishes all its items.
+    versions: dict[str, int] = zt.publications(format="versions") if library_type == "user" else zt.item_versions()
     canonical = json.dumps(versions, sort_keys=True, separators=(",", ":"))
     return hashlib.sha256(canonical.encode()).hexdigest()
 
 
-def main() -> None:
+@dataclass
+class LibraryChanges:
+    """Publications changed and removed between two library versions."""
+
+    since: int
+    version: int
+    changed: list[str]
+    # Deleted from the library, or taken out of My Publications.
+    removed: list[str]
+
+
+@dataclass
+class CheckState:
+    """What the last --state run saw: the library version and the published keys."""
+
+    version: int = 0
+    published: list[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> CheckState:
+        """Load the state, or an empty one (everything counts as changed)."""
+        if not path.exists():
+            return cls()
+        with path.open() as f:
+            return cls(**json.load(f))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(self)) + "\n")
+
+    def apply(self, changes: LibraryChanges) -> None:
+        self.version = changes.version
+        self.published = sorted((set(self.published) - set(changes.removed)) | set(changes.changed))
+
+
+def get_changes(
+    client: httpx.Client, library_url: str, state: CheckState, published_path: str = "/publications/items"
+) -> LibraryChanges:
+    """Return what changed in My Publications after the version in `state`.
+
+    The first request is conditional on that version: an unchanged library
+    answers a bodiless 304 and nothing else is asked. Otherwise two more
+    requests split the touched items into still published and removed ones;
+    only keys `state` knew as published can be removed. `published_path`
+    lists what the library publishes (see fetch.Library.published).
+    """
+    since = state.version
+    response = client.get(
+        f"{library_url}/items",
+        # Trashed items drop out of both listings but reach /deleted only once the trash is emptied.
+        params={"format": "versions", "since": since, "includeTrashed": 1},
+        headers={"If-Modified-Since-Version": str(since)},
+    )
+    if response.status_code == 304:
+        return LibraryChanges(since=since, version=since, changed=[], removed=[])
+    response.raise_for_status()
+    touched: dict[str, int] = response.json()
+    version = int(response.headers["Last-Modified-Version"])
+
+    published = client.get(f"{library_url}{published_path}", params={"format": "versions", "since": since})
+    deleted = client.get(f"{library_url}/deleted", params={"since": since})
+    for r in (published, deleted):
+        r.raise_for_status()
+    changed = published.json().keys()
+    gone = set(deleted.json().get("items", [])) | (touched.keys() - changed)
+    removed = gone & set(state.published)
+    return LibraryChanges(since=since, version=version, changed=sorted(changed), removed=sorted(removed))
+
+
+def check_state(state_path: Path, api_key: str, library: Library) -> LibraryChanges:
+    """Get the changes since the version stored at `state_path`, then advance it."""
+    state = CheckState.load(state_path)
+    with sync_client(api_key, RateLimiter()) as client:
+        changes = get_changes(client, library_url(library.library_id, library.library_type), state, library.published)
+    state.apply(changes)
+    state.save(state_path)
+    return changes
+
+
+def library_url(library_id: int | str, library_type: str) -> str:
+    """API URL of a library (`ZOTERO_API_URL` overrides the host, e.g. for the stand-in)."""
+    return f"{os.environ.get('ZOTERO_API_URL', API_URL)}/{library_type}s/{library_id}"
+
+
+@click.command()
+@click.option("--state", type=click.Path(), help="State file of the last check: output changes since it as JSON")
+def main(state: str | None) -> None:
+    """Print a hash of publication versions, or with --state the change set since the last run."""
     api_key = os.environ.get("ZOTERO_API_KEY")
     library_id = os.environ.get("ZOTERO_LIBRARY_ID")
     if not api_key or not library_id:
@@ -25,8 +131,12 @@ def main() -> None:
         sys.exit(1)
 
     library_type = os.environ.get("ZOTERO_LIBRARY_TYPE", "user")
-    h = get_publications_hash(int(library_id), library_type, api_key)
-    print(h)
+    if not state:
+        print(get_publications_hash(int(library_id), library_type, api_key, get_cache_dir() / "http"))
+        return
+
+    changes = check_state(Path(state), api_key, Library(library_type, int(library_id)))
+    print(json.dumps(asdict(changes)))
 
 
 if __name__ == "__main__":
@@ -1,26 +1,68 @@
 #!/usr/bin/env python3
 """Fetch publications from Zotero and save to publications.json."""
 
+import asyncio
+import json
 import logging
 import os
 import re
 import threading
-import time
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
-from datetime import datetime
+from collections.abc import AsyncIterator, Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from datetime import date
 from pathlib import Path
 from typing import Any
 
 import click
+import httpx
 from pyzotero import zotero
 
-from models import Artifact, Author, Publication, PublicationsData, get_static_data_dir
+from models import (
+    PUBLICATIONS,
+    ArchiveConfig,
+    Artifact,
+    Publication,
+    PublicationsData,
+    gc_paused,
+    get_archive_config_path,
+    get_cache_dir,
+    get_pdf_dir,
+    get_static_data_dir,
+)
+from pdf_store import PdfStore, pdf_attachment
+from zotero_api import API_URL, PAGE_SIZE, AsyncZotero, FetchMetrics, RateLimiter, ResponseCache, sync_client
+from zotero_export import read_csl_json, read_rdf
+from zotero_sqlite import read_publications
 
 log = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class Library:
+    """One Zotero library: the personal one (`user`) or a `group`."""
+
+    library_type: str
+    library_id: int
+
+    @classmethod
+    def parse(cls, spec: str) -> Library:
+        """Parse `group:123` or `user:123`."""
+        library_type, _, library_id = spec.strip().partition(":")
+        if library_type not in ("user", "group") or not library_id.isdigit():
+            raise ValueError(f"Expected user:ID or group:ID, got {spec!r}")
+        return cls(library_type, int(library_id))
+
+    def __str__(self) -> str:
+        return f"{self.library_type}:{self.library_id}"
+
+    @property
+    def published(self) -> str:
+        """Path listing what the library publishes: a user's My Publications, a whole group (groups have none)."""
+        return "/publications/items" if self.library_type == "user" else "/items"
+
+
 @dataclass(frozen=True)
 class ZoteroFetcherConfig:
     """Zotero API configuration."""
@@ -29,7 +71,52 @@ class ZoteroFetcherConfig:
     library_id: int
     library_type: str = "user"
     workers: int = 8
-    retries: int = 3
+    # Retries shared by all workers for the whole run (see zotero_api.RateLimiter).
+    retry_budget: int = 30
+    # Reuse listing payloads and batch the rest via itemKey=; off = one request per item.
+    bulk: bool = True
+    # "threads": pyzotero client per worker thread; "async": one pooled httpx client.
+    engine: str = "threads"
+    # Directory for conditional-request response caching; None disables it.
+    http_cache: Path | None = None
+    # Checkpoint journal of fetched details (see FetchJournal); `resume` reuses a failed run's.
+    journal: Path | None = None
+    resume: bool = False
+    # Per-request counters shared by every client of the run; None disables them.
+    metrics: FetchMetrics | None = None
+    # API root; point at a local stand-in (see zotero_standin.py) to fetch offline.
+    endpoint: str = API_URL
+    # Further libraries (e.g. lab groups) fetched alongside this one into one result.
+    extra_libraries: tuple[Library, ...] = ()
+    # Server-side listing filters (Zotero search syntax), so items parse_items would
+    # drop are never transferred: item types to leave out, and tags to require (any of).
+    item_type: str = "-attachment || note"
+    tags: tuple[str, ...] = ()
+
+    @property
+    def listing_params(self) -> dict[str, str]:
+        """Query parameters applying `item_type` and `tags` to a listing."""
+        params = {"itemType": self.item_type} if self.item_type else {}
+        if self.tags:
+            params["tag"] = " || ".join(self.tags)
+        return params
+
+    @property
+    def libraries(self) -> list[Library]:
+        return list(dict.fromkeys([Library(self.library_type, self.library_id), *self.extra_libraries]))
+
+    def for_library(self, library: Library) -> ZoteroFetcherConfig:
+        """This config narrowed to one of its libraries, with a journal of its own."""
+        journal = self.journal
+        if journal and library != self.libraries[0]:
+            journal = journal.with_stem(f"{journal.stem}-{library.library_type}-{library.library_id}")
+        return replace(
+            self,
+            library_type=library.library_type,
+            library_id=library.library_id,
+            extra_libraries=(),
+            journal=journal,
+        )
 
     @classmethod
     def from_env(cls) -> ZoteroFetcherConfig:
@@ -41,6 +128,8 @@ class ZoteroFetcherConfig:
             api_key=api_key,
             library_id=int(library_id),
             library_type=os.environ.get("ZOTERO_LIBRARY_TYPE", "user"),
+            endpoint=os.environ.get("ZOTERO_API_URL", API_URL),
+            extra_libraries=tuple(map(Library.parse, filter(None, os.environ.get("ZOTERO_LIBRARIES", "").split(",")))),
         )
 
 
@@ -53,14 +142,26 @@ SOFTWARE_TYPE = "computerProgram"
 PREPRINT_KINDS = {"preprint": "arxiv"}
 # Zotero itemType -> artifact kind for the two halves of one event.
 EVENT_KINDS = {"presentation": "slides", "videoRecording": "video"}
-
-DATE_FORMATS = [
-    ("%Y/%m/%d", lambda dt: (dt.year, dt.month, dt.day)),
-    ("%Y-%m-%d", lambda dt: (dt.year, dt.month, dt.day)),
-    ("%Y/%m", lambda dt: (dt.year, dt.month, None)),
-    ("%Y-%m", lambda dt: (dt.year, dt.month, None)),
-    ("%Y", lambda dt: (dt.year, None, None)),
-]
+# Zotero caps itemKey= filters (and page size) at 50 keys.
+BATCH_SIZE = 50
+# --source readers of local files (prefix:PATH), each yielding API-shaped items.
+FILE_SOURCES: dict[str, Callable[[Path], Iterable[dict[str, Any]]]] = {
+    "sqlite": read_publications,
+    "csl": read_csl_json,
+    "rdf": read_rdf,
+}
+# A batch of raw items, as the async engine yields them.
+Chunk = list[dict[str, Any]]
+# Fields every full item `data` carries; a listing entry without them needs a detail fetch.
+DETAIL_FIELDS = {"key", "version", "itemType", "relations"}
+
+# strptime's %Y/%m/%d, %Y-%m-%d, %Y/%m, %Y-%m and %Y as one precompiled pattern:
+# one separator throughout, months and days spelled the way strptime accepts them.
+DATE_PATTERN = re.compile(r"(\d{4})(?:([/-])(1[0-2]|0[1-9]|[1-9])(?:\2(3[01]|[12]\d|0[1-9]|[1-9]| [1-9]))?)?")
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+RELATION_KEY = re.compile(r"/items/([A-Z0-9]+)$")
+# Items ItemParser validates at once: amortizes the call, yet a streamed fetch still parses as pages land.
+PARSE_BATCH = 500
 
 
 def parse_date(date_str: str | None) -> tuple[int, int | None, int | None]:
@@ -68,13 +169,15 @@ def parse_date(date_str: str | None) -> tuple[int, int | None, int | None]:
     if not date_str:
         return (0, None, None)
 
-    for fmt, extractor in DATE_FORMATS:
+    if m := DATE_PATTERN.fullmatch(date_str):
+        year, month, day = int(m[1]), m[3] and int(m[3]), m[4] and int(m[4])
         try:
-            return extractor(datetime.strptime(date_str, fmt))
+            date(year, month or 1, day or 1)  # rejects what strptime would: Feb 30, year 0
+            return (year, month, day)
         except ValueError:
-            continue
+            pass
 
-    match = re.search(r"\b(19|20)\d{2}\b", date_str)
+    match = YEAR_PATTERN.search(date_str)
     if match:
         return (int(match.group()), None, None)
 
@@ -93,45 +196,172 @@ def empty_to_none(value: str | None) -> str | None:
     return value if value else None
 
 
-def extract_related_keys(data: dict[str, Any]) -> list[str]:
+def extract_related_keys(data: dict[str, Any], predicate: str = "dc:relation") -> list[str]:
     """Extract related item keys from Zotero relations field.
 
     Zotero stores relations as URLs: http://zotero.org/users/123/items/KEY
     """
     relations = data.get("relations", {})
-    dc_relation = relations.get("dc:relation", [])
+    dc_relation = relations.get(predicate, [])
     if isinstance(dc_relation, str):
         dc_relation = [dc_relation]
-    matches = (re.search(r"/items/([A-Z0-9]+)$", url) for url in dc_relation)
+    matches = map(RELATION_KEY.search, dc_relation)
     return [m.group(1) for m in matches if m]
 
 
-def _merge_related(
+def merge_library_copies(
+    publications: list[Publication],
+    relations: dict[str, list[str]],
+    same_as: dict[str, list[str]],
+) -> tuple[list[Publication], dict[str, list[str]]]:
+    """Drop copies of an item fetched from more than one library.
+
+    Copying an item into another library links the copy to its original with
+    `owl:sameAs`. The original is kept; the copy's Related Items move over to
+    it and relations pointing at the copy are redirected, so links that cross
+    libraries still pair up in the merges that follow.
+    """
+    by_key = {p.id: p for p in publications}
+    alias: dict[str, str] = {}
+    for pub in publications:
+        original = next((k for k in same_as.get(pub.id, []) if k in by_key and k not in alias and k != pub.id), None)
+        if original:
+            alias[pub.id] = original
+
+    def resolve(key: str) -> str:
+        while key in alias:
+            key = alias[key]
+        return key
+
+    merged: dict[str, list[str]] = {}
+    for key, related in relations.items():
+        owner = resolve(key)
+        targets = merged.setdefault(owner, [])
+        targets.extend(k for k in map(resolve, related) if k != owner and k not in targets)
+    if alias:
+        log.info(f"Dropped {len(alias)} copies of items held in several libraries")
+    return [p for p in publications if p.id not in alias], merged
+
+
+class UnionFind:
+    """Disjoint sets over item keys: union by size with path halving, near-constant per operation."""
+
+    def __init__(self) -> None:
+        self.parent: dict[str, str] = {}
+        self.size: dict[str, int] = {}
+
+    def find(self, key: str) -> str:
+        parent = self.parent.setdefault(key, key)
+        while parent != key:
+            self.parent[key] = key = self.parent[parent]
+            parent = self.parent[key]
+        return key
+
+    def union(self, a: str, b: str) -> None:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size.get(a, 1) < self.size.get(b, 1):
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] = self.size.get(a, 1) + self.size.pop(b, 1)
+
+    def groups(self, keys: Iterable[str]) -> list[list[str]]:
+        """Sets of two or more of `keys`, members and sets in the order of `keys`."""
+        groups: dict[str, list[str]] = {}
+        for key in keys:
+            if key in self.parent:
+                groups.setdefault(self.find(key), []).append(key)
+        return [members for members in groups.values() if len(members) > 1]
+
+
+@dataclass(frozen=True)
+class RelationPolicy:
+    """How one kind of Related Items cluster folds into primary records.
+
+    `joins(a, b)` says which relation edges belong to the cluster; `fold`
+    gets a connected component (in publication order), attaches artifacts to
+    the records it keeps and returns the ids to drop.
+    """
+
+    label: str
+    joins: Callable[[Publication, Publication], bool]
+    fold: Callable[[list[Publication]], set[str]]
+
+
+def fold_preprints(members: list[Publication]) -> set[str]:
+    # Preprint versions of one paper chain to each other and to its published
+    # versions: every published version gets the first preprint link, and the
+    # preprints go — unless no published version exists yet.
+    preprints = [p for p in members if p.type in PREPRINT_KINDS]
+    primaries = [p for p in members if p.type in PRIMARY_TYPES]
+    if not primaries:
+        return set()
+    links: dict[str, str] = {}
+    for preprint in preprints:
+        if preprint.url:
+            links.setdefault(PREPRINT_KINDS[preprint.type], preprint.url)
+    for primary in primaries:
+        for kind, url in links.items():
+            if not any(a.kind == kind for a in primary.artifacts):
+                primary.artifacts.append(Artifact(kind=kind, url=url))
+    return {p.id for p in preprints}
+
+
+def joins_preprint(a: Publication, b: Publication) -> bool:
+    if a.type in PREPRINT_KINDS:
+        return b.type in PREPRINT_KINDS or b.type in PRIMARY_TYPES
+    return a.type in PRIMARY_TYPES and b.type in PREPRINT_KINDS
+
+
+def joins_event(a: Publication, b: Publication) -> bool:
+    # Only presentation-video edges: a paper related to both must not bridge them.
+    return {a.type, b.type} == set(EVENT_KINDS)
+
+
+def fold_events(members: list[Publication]) -> set[str]:
+    # The first presentation becomes the card with its slides and every linked
+    # recording; the videos go. Further presentations of the cluster stay as they are.
+    slides = next(p for p in members if p.type == "presentation")
+    videos = [p for p in members if p.type == "videoRecording"]
+    slides.artifacts = [Artifact(kind=EVENT_KINDS[p.type], url=p.url) for p in (slides, *videos) if p.url]
+    return {p.id for p in videos}
+
+
+PREPRINTS = RelationPolicy("preprint(s) into published versions", joins_preprint, fold_preprints)
+EVENTS = RelationPolicy("event video(s) into presentation cards", joins_event, fold_events)
+
+
+def merge_related(
     publications: list[Publication],
     relations: dict[str, list[str]],
-    fold: Callable[[Publication, Publication], str | None],
-    label: str,
+    policies: Iterable[RelationPolicy] = (PREPRINTS, EVENTS),
 ) -> list[Publication]:
-    """Walk Related Item pairs; `fold` collapses a pair and returns the id to drop.
+    """Fold Related Items clusters into primary records, one policy at a time.
 
-    `fold(pub, related)` applies its policy (which is primary, what to copy) and
-    returns the secondary's id, or None if the pair doesn't apply. Already-dropped
-    records are skipped, so bidirectional relations collapse once.
+    Each policy's qualifying relation edges are collapsed into connected
+    components with a union-find, so a cluster is resolved as a whole,
+    whatever its size and whichever side holds the relations; bidirectional
+    links collapse once. Linear in items + relations; the result depends only
+    on publication order, not on the order relations were listed in.
     """
     by_key = {p.id: p for p in publications}
     to_remove: set[str] = set()
-    for pub in publications:
-        if pub.id in to_remove:
-            continue
-        for related_key in relations.get(pub.id, []):
-            related = by_key.get(related_key)
-            if related is None or related.id in to_remove:
+    for policy in policies:
+        components = UnionFind()
+        for key, related in relations.items():
+            pub = by_key.get(key)
+            if pub is None or key in to_remove:
                 continue
-            dropped = fold(pub, related)
-            if dropped:
-                to_remove.add(dropped)
-    if to_remove:
-        log.info(f"Merged {len(to_remove)} {label}")
+            for other in (by_key.get(k) for k in related if k not in to_remove):
+                if other is not None and other.id != key and policy.joins(pub, other):
+                    components.union(key, other.id)
+        dropped: set[str] = set()
+        for members in components.groups(by_key):
+            dropped |= policy.fold([by_key[k] for k in members])
+        if dropped:
+            log.info(f"Merged {len(dropped)} {policy.label}")
+        to_remove |= dropped
     return [p for p in publications if p.id not in to_remove]
 
 
@@ -140,20 +370,7 @@ def merge_preprints(
     relations: dict[str, list[str]],
 ) -> list[Publication]:
     """Add a preprint's arXiv link to its published version, then drop the preprint."""
-
-    def fold(pub: Publication, related: Publication) -> str | None:
-        if pub.type in PREPRINT_KINDS and related.type in PRIMARY_TYPES:
-            preprint, primary = pub, related
-        elif related.type in PREPRINT_KINDS and pub.type in PRIMARY_TYPES:
-            preprint, primary = related, pub
-        else:
-            return None
-        kind = PREPRINT_KINDS[preprint.type]
-        if preprint.url and not any(a.kind == kind for a in primary.artifacts):
-            primary.artifacts.append(Artifact(kind=kind, url=preprint.url))
-        return preprint.id
-
-    return _merge_related(publications, relations, fold, "preprint(s) into published versions")
+    return merge_related(publications, relations, (PREPRINTS,))
 
 
 def merge_event_artifacts(
@@ -165,20 +382,11 @@ def merge_event_artifacts(
     The presentation becomes the card and keeps both links as `artifacts`
     (slides, video) — unlike a preprint, the secondary link is not lost.
     """
-
-    def fold(pub: Publication, related: Publication) -> str | None:
-        types = {pub.type, related.type}
-        if types != set(EVENT_KINDS):
-            return None
-        slides, video = (pub, related) if pub.type == "presentation" else (related, pub)
-        slides.artifacts = [Artifact(kind=EVENT_KINDS[p.type], url=p.url) for p in (slides, video) if p.url]
-        return video.id
-
-    return _merge_related(publications, relations, fold, "event video(s) into presentation cards")
+    return merge_related(publications, relations, (EVENTS,))
 
 
-def parse_item(data: dict[str, Any]) -> Publication | None:
-    """Parse Zotero item data into Publication."""
+def publication_fields(data: dict[str, Any]) -> dict[str, Any] | None:
+    """Map Zotero item data onto plain Publication fields, or None if it has no date."""
     item_type = data.get("itemType", "")
 
     if "websiteType" in data:
@@ -188,144 +396,698 @@ def parse_item(data: dict[str, Any]) -> Publication | None:
     if year == 0:
         return None
 
-    def creators_of(*types: str | None) -> list[Author]:
-        wanted = set(types)
-        return [
-            Author(firstName=c.get("firstName", ""), lastName=c.get("lastName", ""))
+    license_ = empty_to_none(data.get("rights")) if item_type == SOFTWARE_TYPE else None
+
+    return {
+        "id": data["key"],
+        "type": item_type,
+        "year": year,
+        "month": month,
+        "day": day,
+        "title": data.get("title", "Untitled"),
+        "authors": [
+            {"firstName": c.get("firstName", ""), "lastName": c.get("lastName", "")}
             for c in data.get("creators", [])
-            if c.get("creatorType") in wanted
-        ]
+            if c.get("creatorType") in AUTHOR_TYPES
+        ],
+        "tags": [tag["tag"] for tag in data.get("tags", [])],
+        "url": empty_to_none(data.get("url")),
+        "license": license_,
+        "language": normalize_language(data.get("language")),
+        "course": empty_to_none(data.get("series")),
+        "school": empty_to_none(data.get("place")),
+        "section": empty_to_none(data.get("sessionTitle")),
+        "presentationType": empty_to_none(data.get("presentationType")),
+    }
 
-    license_ = empty_to_none(data.get("rights")) if item_type == SOFTWARE_TYPE else None
 
-    return Publication(
-        id=data["key"],
-        type=item_type,
-        year=year,
-        month=month,
-        day=day,
-        title=data.get("title", "Untitled"),
-        authors=creators_of(*AUTHOR_TYPES),
-        tags=[tag["tag"] for tag in data.get("tags", [])],
-        url=empty_to_none(data.get("url")),
-        license=license_,
-        language=normalize_language(data.get("language")),
-        course=empty_to_none(data.get("series")),
-        school=empty_to_none(data.get("place")),
-        section=empty_to_none(data.get("sessionTitle")),
-        presentationType=empty_to_none(data.get("presentationType")),
-    )
+def parse_item(data: dict[str, Any]) -> Publication | None:
+    """Parse Zotero item data into Publication."""
+    fields = publication_fields(data)
+    return Publication.model_validate(fields) if fields else None
 
 
-def fetch_item_details(zt_factory: Callable[[], zotero.Zotero], key: str, retries: int = 3) -> dict[str, Any]:
-    """Fetch full item details with exponential backoff retry.
+class FetchError(RuntimeError):
+    """A Zotero request came back without the JSON payload it should have."""
 
-    Uses a per-thread Zotero client because pyzotero stores per-request state
-    (self.request, self.url_params) on the instance and is not thread-safe;
-    sharing one client across threads corrupts format detection and yields
-    raw bytes instead of parsed JSON.
 
-    On HTTP 429 pyzotero records a backoff but does not raise, returning raw
-    bytes instead — detect this and retry; the per-thread client's backoff
-    timer will throttle the next call.
-    """
-    zt = zt_factory()
-    for attempt in range(retries):
-        try:
-            result = zt.item(key)
-            if isinstance(result, dict):
-                return result
-            log.debug(f"Rate-limited on {key} (attempt {attempt + 1}/{retries}): {result[:80]!r}")
-        except Exception as e:
-            if attempt == retries - 1:
-                raise
-            log.debug(f"Retry {attempt + 1}/{retries} for {key}: {e}")
-        if attempt < retries - 1:
-            time.sleep(2**attempt)  # 1s, 2s, 4s
-    raise RuntimeError(f"Failed to fetch {key} after {retries} retries (rate-limited)")
+def expect_json(result: Any, label: str) -> Any:
+    """Return a decoded JSON payload; pyzotero hands back raw bytes when a request failed."""
+    if isinstance(result, dict | list):
+        return result
+    raise FetchError(f"Failed to fetch {label}: {result[:80]!r}")
 
 
-def fetch_from_zotero(config: ZoteroFetcherConfig) -> list[dict[str, Any]]:
-    """Fetch all items from Zotero with full details (parallel)."""
-    log.info(f"Fetching from Zotero library {config.library_id}")
+def fetch_item_details(zt_factory: Callable[[], zotero.Zotero], key: str) -> dict[str, Any]:
+    """Fetch full details of one item."""
+    return expect_json(zt_factory().item(key), key)
+
+
+def fetch_item_batch(zt_factory: Callable[[], zotero.Zotero], keys: list[str]) -> list[dict[str, Any]]:
+    """Fetch full details of up to BATCH_SIZE items in one request."""
+    result = zt_factory().items(itemKey=",".join(keys), include="data", limit=len(keys))
+    return expect_json(result, f"{len(keys)} items from {keys[0]}")
+
+
+def fetch_keys_sync(zt_factory: Callable[[], zotero.Zotero], keys: list[str], bulk: bool) -> list[dict[str, Any]]:
+    """Full details for one `plan_details` batch."""
+    if bulk:
+        return fetch_item_batch(zt_factory, keys)
+    return [fetch_item_details(zt_factory, keys[0])]
+
+
+def is_complete(item: dict[str, Any]) -> bool:
+    """Whether a listing entry already carries the full item `data`."""
+    return item.get("data", {}).keys() >= DETAIL_FIELDS
+
 
+def make_limiter(config: ZoteroFetcherConfig) -> RateLimiter:
+    """The run-wide rate limiter every client of one fetch shares."""
+    return RateLimiter(burst=config.workers, retry_budget=config.retry_budget)
+
+
+def make_cache(config: ZoteroFetcherConfig) -> ResponseCache | None:
+    """The response cache, if enabled."""
+    return ResponseCache(config.http_cache) if config.http_cache else None
+
+
+def client_factory(config: ZoteroFetcherConfig, limiter: RateLimiter | None = None) -> Callable[[], zotero.Zotero]:
+    """Return a factory handing each thread its own Zotero client.
+
+    pyzotero stores per-request state (self.request, self.url_params) on the
+    instance and is not thread-safe; sharing one client across threads
+    corrupts format detection and yields raw bytes instead of parsed JSON.
+
+    The clients share one RateLimiter underneath, so pacing, 429 retries and
+    server backoff apply to all threads together rather than per client.
+    """
     local = threading.local()
+    limiter = limiter or make_limiter(config)
+    cache = make_cache(config)
 
     def zt_factory() -> zotero.Zotero:
         client = getattr(local, "client", None)
         if client is None:
-            client = zotero.Zotero(config.library_id, config.library_type, config.api_key)
+            http = sync_client(config.api_key, limiter, cache, metrics=config.metrics)
+            client = zotero.Zotero(config.library_id, config.library_type, config.api_key, client=http)
+            client.endpoint = config.endpoint
             local.client = client
         return client
 
-    zt = zt_factory()
-    zt.add_parameters(sort="date")
+    return zt_factory
+
+
+class FetchJournal:
+    """Append-only NDJSON log of fetched item details, so a failed run can resume.
+
+    Complete listing entries are appended as their page lands, detail batches
+    as they finish. A resumed run lists item versions instead of pages and
+    reuses a logged item only while its version still matches, so anything
+    edited in between is fetched again.
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = path
+        self.items: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if resume and path.exists():
+            with path.open() as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line of a killed run
+                    self.items[item["key"]] = item
+            log.info(f"Resuming with {len(self.items)} item(s) from {path}")
+        else:
+            path.unlink(missing_ok=True)
+
+    def get(self, listed: dict[str, Any]) -> dict[str, Any] | None:
+        """The logged details of a listing entry, if still at the listed version."""
+        item = self.items.get(listed["key"])
+        return item if item and item.get("version") == listed.get("version") else None
+
+    def record(self, items: list[dict[str, Any]]) -> None:
+        """Append a finished batch; safe to call from any worker thread."""
+        lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in items)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(lines)
+
+    def discard(self) -> None:
+        """Drop the journal once the fetch it covers has succeeded."""
+        self.path.unlink(missing_ok=True)
+
+
+def open_journal(config: ZoteroFetcherConfig) -> FetchJournal | None:
+    """The run's checkpoint journal, if enabled."""
+    return FetchJournal(config.journal, config.resume) if config.journal else None
+
 
-    items = zt.everything(zt.publications())
-    log.info(f"Fetched {len(items)} items, getting details...")
+def versions_listing(versions: dict[str, int]) -> list[dict[str, Any]]:
+    """A `format=versions` reply as listing entries without data, for `plan_details`."""
+    return [{"key": key, "version": version} for key, version in versions.items()]
 
-    keys = [item["data"]["key"] for item in items]
-    detailed = []
 
-    with ThreadPoolExecutor(max_workers=config.workers) as executor:
-        futures = {executor.submit(fetch_item_details, zt_factory, key, config.retries): key for key in keys}
-        for future in as_completed(futures):
-            detailed.append(future.result())
+def plan_details(
+    listed: list[dict[str, Any]],
+    config: ZoteroFetcherConfig,
+    journal: FetchJournal | None = None,
+) -> tuple[list[dict[str, Any]], list[list[str]]]:
+    """Split listed items into (already detailed, key batches still to fetch).
+
+    In bulk mode complete listing entries are used as-is (and go to `journal`)
+    and the rest are batched BATCH_SIZE keys per request; otherwise every item
+    is its own batch. Items a resumed `journal` already holds are not fetched again.
+    """
+    detailed, missing, complete = [], [], []
+    for item in listed:
+        if journal and (logged := journal.get(item)):
+            detailed.append(logged)
+        elif config.bulk and is_complete(item):
+            complete.append(item)
+        else:
+            missing.append(item["key"])
+    if journal and complete:
+        journal.record(complete)
+    detailed += complete
+    size = BATCH_SIZE if config.bulk else 1
+    return detailed, [missing[i : i + size] for i in range(0, len(missing), size)]
+
+
+def fetch_details(
+    zt_factory: Callable[[], zotero.Zotero],
+    listed: list[dict[str, Any]],
+    config: ZoteroFetcherConfig,
+    journal: FetchJournal | None = None,
+    executor: ThreadPoolExecutor | None = None,
+) -> list[dict[str, Any]]:
+    """Return full details for listed items, fetching what `plan_details` leaves out.
+
+    Finished batches go to `journal` as they complete, so a failure loses
+    only the requests still in flight. Batches run on `executor` when given
+    (a pool shared by several libraries), else on a pool of `config.workers`.
+    """
+    detailed, batches = plan_details(listed, config, journal)
+    if not batches:
+        return detailed
+
+    log.info(f"Fetching {sum(map(len, batches))} item details in {len(batches)} request(s)")
+    with nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=config.workers) as pool:
+        futures = [pool.submit(fetch_keys_sync, zt_factory, keys, config.bulk) for keys in batches]
+        try:
+            for future in as_completed(futures):
+                batch = future.result()
+                if journal:
+                    journal.record(batch)
+                detailed.extend(batch)
+        except BaseException:
+            # Fail fast: don't start queued batches a rerun will fetch anyway.
+            for future in futures:
+                future.cancel()
+            raise
+    return detailed
+
+
+def fetch_from_zotero(config: ZoteroFetcherConfig) -> list[dict[str, Any]]:
+    """Fetch all items of every configured library with full details (parallel).
+
+    Libraries are listed side by side; their detail batches share one pool of
+    `config.workers` and one rate limiter, so adding a library adds requests,
+    not concurrency.
+    """
+    libraries = ", ".join(map(str, config.libraries))
+    log.info(f"Fetching from Zotero {libraries} ({config.engine} engine)")
+    if config.engine == "async":
+        return asyncio.run(fetch_from_zotero_async(config))
+
+    limiter = make_limiter(config)
+    with (
+        ThreadPoolExecutor(max_workers=config.workers) as workers,
+        ThreadPoolExecutor(max_workers=len(config.libraries)) as listers,
+    ):
+        results = listers.map(
+            lambda library: fetch_library(config.for_library(library), limiter, workers), config.libraries
+        )
+        detailed = [item for items in results for item in items]
 
     log.info(f"Fetched {len(detailed)} item details")
     return detailed
 
 
-def parse_items(items: list[dict[str, Any]]) -> list[Publication]:
-    """Parse Zotero items into Publications, filtering invalid ones.
+def fetch_library(
+    config: ZoteroFetcherConfig, limiter: RateLimiter, executor: ThreadPoolExecutor
+) -> list[dict[str, Any]]:
+    """List one library's publications and fetch the details the listing lacks, all on `executor`.
 
-    Related items are merged into a primary record's `artifacts` list: a
-    preprint contributes its arXiv link, a video its recording link.
+    The first page's `Total-Results` tells how many pages follow; they are
+    requested at once instead of link by link, and each page's detail batches
+    are queued as soon as it lands rather than after the whole listing.
+    Without the header, the listing follows `Link: rel="next"` instead.
+
+    A resumed run skips the listing: one `format=versions` request gives every
+    key's version, and only keys the journal lacks at that version are fetched.
     """
-    publications = []
-    relations: dict[str, list[str]] = {}
-    skipped_attachments = 0
-    skipped_no_date = 0
+    zt_factory = client_factory(config, limiter)
+    journal = open_journal(config)
+
+    def listing() -> Callable[..., Any]:
+        zt = zt_factory()
+        return zt.publications if config.library_type == "user" else zt.items
+
+    def list_page(start: int) -> list[dict[str, Any]]:
+        page = listing()(start=start, limit=PAGE_SIZE, sort="date", include="data", **config.listing_params)
+        return expect_json(page, f"listing page at {start}")
+
+    if journal and journal.items:
+        versions = expect_json(listing()(format="versions", limit=None, **config.listing_params), "item versions")
+        first, starts = versions_listing(versions), range(0)
+        log.info(f"Resuming {len(first)} items from {config.library_type} {config.library_id}")
+    else:
+        first, zt = list_page(0), zt_factory()
+        if "Total-Results" in zt.request.headers:
+            total = int(zt.request.headers["Total-Results"])
+            starts = range(PAGE_SIZE, total, PAGE_SIZE)
+        else:
+            # Nothing to fan out over: follow Link rel="next" one page at a time, as AsyncZotero.pages does.
+            while zt.links and zt.links.get("next"):
+                first += expect_json(zt.follow(), f"listing page after {len(first)}")
+            total, starts = len(first), range(0)
+        log.info(f"Listing {total} items from {config.library_type} {config.library_id}")
+    pages = {executor.submit(list_page, start) for start in starts}
+    batches: set[Future[list[dict[str, Any]]]] = set()
+    detailed: list[dict[str, Any]] = []
+
+    def plan(page: list[dict[str, Any]]) -> None:
+        complete, missing = plan_details(page, config, journal)
+        detailed.extend(complete)
+        batches.update(executor.submit(fetch_keys_sync, zt_factory, keys, config.bulk) for keys in missing)
+
+    plan(first)
+    try:
+        while pages or batches:
+            done, _ = wait(pages | batches, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in pages:
+                    pages.remove(future)
+                    plan(future.result())
+                    continue
+                batches.remove(future)
+                batch = future.result()
+                if journal:
+                    journal.record(batch)
+                detailed.extend(batch)
+    except BaseException:
+        # Fail fast: don't start queued requests a rerun will make anyway.
+        for future in pages | batches:
+            future.cancel()
+        raise
+    if journal:
+        journal.discard()
+    return detailed
 
-    for item in items:
+
+async def fetch_keys(zt: AsyncZotero, keys: list[str], bulk: bool) -> list[dict[str, Any]]:
+    """Full details for one `plan_details` batch."""
+    if bulk:
+        return await zt.items(keys)
+    return [await zt.get_json(f"/items/{keys[0]}")]
+
+
+async def stream_from_zotero(
+    config: ZoteroFetcherConfig,
+    limiter: RateLimiter | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Yield fully detailed items in chunks as they land.
+
+    Complete listing entries come out page by page; detail batches for the
+    rest are started as soon as their page arrives and yielded as they finish,
+    each logged to the checkpoint journal first.
+    """
+    async with AsyncZotero(
+        config.library_id,
+        config.library_type,
+        config.api_key,
+        concurrency=config.workers,
+        limiter=limiter or make_limiter(config),
+        cache=make_cache(config),
+        endpoint=config.endpoint,
+        transport=transport,
+        metrics=config.metrics,
+    ) as zt:
+        streams = [
+            stream_library(zt.library(library.library_id, library.library_type), config.for_library(library))
+            for library in config.libraries
+        ]
+        async for chunk in merge_streams(streams):
+            yield chunk
+
+
+async def stream_library(zt: AsyncZotero, config: ZoteroFetcherConfig) -> AsyncIterator[Chunk]:
+    """`stream_from_zotero` for the one library `zt` addresses."""
+    journal = open_journal(config)
+    pending: set[asyncio.Task[list[dict[str, Any]]]] = set()
+
+    async def fetch_logged(keys: list[str]) -> list[dict[str, Any]]:
+        batch = await fetch_keys(zt, keys, config.bulk)
+        if journal:
+            journal.record(batch)
+        return batch
+
+    async def listing() -> AsyncIterator[list[dict[str, Any]]]:
+        path = config.libraries[0].published
+        if journal and journal.items:  # resuming: see fetch_library
+            yield versions_listing(await zt.get_json(path, format="versions", **config.listing_params))
+            return
+        async for page in zt.pages(path, sort="date", include="data", **config.listing_params):
+            yield page
+
+    try:
+        async for page in listing():
+            detailed, batches = plan_details(page, config, journal)
+            pending |= {asyncio.create_task(fetch_logged(keys)) for keys in batches}
+            yield detailed
+            done = {task for task in pending if task.done()}
+            pending -= done
+            for task in done:
+                yield task.result()
+        for next_done in asyncio.as_completed(pending):
+            yield await next_done
+    finally:
+        for task in pending:
+            task.cancel()
+    if journal:
+        journal.discard()
+
+
+async def merge_streams(streams: list[AsyncIterator[Chunk]]) -> AsyncIterator[Chunk]:
+    """Yield from several async iterators at once, in whatever order their items land.
+
+    The first failure is raised once the chunks that landed before it are out;
+    the other streams are then cancelled.
+    """
+    if len(streams) == 1:
+        async for chunk in streams[0]:
+            yield chunk
+        return
+
+    queue: asyncio.Queue[Chunk] = asyncio.Queue(maxsize=len(streams))
+
+    async def drain(stream: AsyncIterator[Chunk]) -> None:
+        async for chunk in stream:
+            await queue.put(chunk)
+
+    tasks = [asyncio.create_task(drain(stream)) for stream in streams]
+    finished = asyncio.gather(*tasks)
+    try:
+        while not (finished.done() and queue.empty()):
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.wait({get, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                yield get.result()
+            else:
+                get.cancel()
+        finished.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def fetch_from_zotero_async(
+    config: ZoteroFetcherConfig,
+    limiter: RateLimiter | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> list[dict[str, Any]]:
+    """Fetch all items with full details over one pooled async client.
+
+    Same result as the threaded engine; concurrency is `config.workers`
+    requests in flight on shared keep-alive connections instead of threads.
+    """
+    detailed = [item async for chunk in stream_from_zotero(config, limiter, transport) for item in chunk]
+    log.info(f"Fetched {len(detailed)} item details")
+    return detailed
+
+
+async def fetch_and_parse(
+    config: ZoteroFetcherConfig,
+    spill: Path | None = None,
+    queue_size: int = 4,
+    limiter: RateLimiter | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+    parser: ItemParser | None = None,
+) -> list[Publication]:
+    """Fetch and parse concurrently, holding only Publications in memory.
+
+    Chunks from `stream_from_zotero` pass through a bounded queue into an
+    ItemParser, so parsing overlaps network I/O and a slow consumer stalls
+    the listing instead of buffering it. Raw items are dropped once parsed,
+    or appended to `spill` as NDJSON when given.
+    """
+    queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(maxsize=queue_size)
+
+    async def produce() -> None:
+        try:
+            async for chunk in stream_from_zotero(config, limiter, transport):
+                await queue.put(chunk)
+        finally:
+            await queue.put(None)
+
+    parser = parser or ItemParser()
+    producer = asyncio.create_task(produce())
+    try:
+        with spill.open("w") if spill else nullcontext() as out:
+            while (chunk := await queue.get()) is not None:
+                for item in chunk:
+                    parser.add(item)
+                    if out:
+                        out.write(json.dumps(item, ensure_ascii=False) + "\n")
+        await producer
+    finally:
+        producer.cancel()
+    return parser.finish()
+
+
+@dataclass
+class ItemCache:
+    """Raw Zotero items kept between runs, stamped with the library version they reflect."""
+
+    version: int = 0
+    items: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> ItemCache:
+        """Load the cache, or return an empty one if there is none yet."""
+        if not path.exists():
+            return cls()
+        with path.open() as f:
+            data = json.load(f)
+        return cls(version=data["version"], items=data["items"])
+
+    def save(self, path: Path) -> None:
+        """Write the cache atomically, so an interrupted run keeps the previous one."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("w") as f:
+            json.dump({"version": self.version, "items": self.items}, f, ensure_ascii=False)
+        tmp.replace(path)
+
+    def patch(self, version: int, changed: list[dict[str, Any]], removed: Iterable[str]) -> None:
+        """Apply one sync round: upsert `changed`, drop `removed`, advance the version."""
+        for key in removed:
+            self.items.pop(key, None)
+        for item in changed:
+            self.items[item["key"]] = item
+        self.version = version
+
+
+def sync_cache(cache: ItemCache, zt_factory: Callable[[], zotero.Zotero], config: ZoteroFetcherConfig) -> bool:
+    """Bring `cache` up to date with Zotero in place; return whether anything changed.
+
+    Three cheap requests find the change set: `/items?since=` (every item touched,
+    including ones taken out of My Publications or moved to the trash, which
+    `/deleted` only lists once the trash is emptied), `/publications/items?since=`
+    (what is still published) and `/deleted?since=`. When the library version
+    hasn't moved, the first request is the only one.
+
+    Versions are per library, so only the primary library is synced. A group
+    library has no My Publications; its `/items?since=` listing stands in.
+    """
+    zt = zt_factory()
+    if not cache.version:
+        log.info("Item cache empty, doing a full fetch")
+        # Read the version before listing: anything edited mid-fetch is re-fetched next run.
+        version = zt.last_modified_version()
+        cache.patch(version, fetch_from_zotero(replace(config, extra_libraries=())), [])
+        return True
+
+    touched: dict[str, int] = zt.item_versions(since=cache.version, includeTrashed=1)
+    version = int(zt.request.headers.get("last-modified-version", cache.version))
+    if version == cache.version:
+        log.info(f"Library unchanged at version {version}, {len(cache.items)} cached items")
+        return False
+
+    deleted = zt.deleted(since=cache.version).get("items", [])
+    published = []
+    if touched:
+        listing = zt.publications if config.library_type == "user" else zt.items
+        published = zt.everything(listing(since=cache.version, include="data", **config.listing_params))
+    keys = [item["key"] for item in published]
+    changed = fetch_details(zt_factory, published, config)
+    removed = set(deleted) | (touched.keys() - set(keys))
+
+    dropped = len(removed & cache.items.keys())
+    cache.patch(version, changed, removed)
+    log.info(f"Library {cache.version}: {len(changed)} changed, {dropped} removed, {len(cache.items)} cached items")
+    return True
+
+
+def fetch_incremental(config: ZoteroFetcherConfig, cache_path: Path) -> list[dict[str, Any]]:
+    """Sync the raw-item cache at `cache_path` with Zotero, downloading only what changed since its version."""
+    cache = ItemCache.load(cache_path)
+    if sync_cache(cache, client_factory(config), config):
+        cache.save(cache_path)
+    return list(cache.items.values())
+
+
+class ItemParser:
+    """Parse Zotero items one at a time; merge related records once all are in.
+
+    Only the compact Publication fields and their relation keys are kept, so
+    the raw item can be discarded as soon as `add` returns. Fields are
+    validated into Publications PARSE_BATCH at a time.
+    """
+
+    def __init__(self) -> None:
+        self.publications: list[Publication] = []
+        # Plain fields of items not yet validated; see flush.
+        self.pending: list[dict[str, Any]] = []
+        self.relations: dict[str, list[str]] = {}
+        self.seen = 0
+        self.skipped_attachments = 0
+        self.skipped_no_date = 0
+        # Parent item key -> its stored PDF attachment (see pdf_store.pdf_attachment).
+        self.attachments: dict[str, dict[str, Any]] = {}
+        # Item key -> keys of the originals it is a library copy of (owl:sameAs).
+        self.same_as: dict[str, list[str]] = {}
+
+    def add(self, item: dict[str, Any]) -> None:
+        """Parse one raw item (with or without the `data` envelope)."""
+        self.seen += 1
         data = item.get("data", item)
         item_type = data.get("itemType", "")
         title = data.get("title", "unknown")
 
         if item_type in SKIP_TYPES:
+            if (pdf := pdf_attachment(data)) and pdf["parent"] not in self.attachments:
+                if library := item.get("library"):
+                    pdf["library"] = Library(library["type"], library["id"])
+                self.attachments[pdf["parent"]] = pdf
             log.warning(f"Skipped {item_type}: {title}")
-            skipped_attachments += 1
-            continue
+            self.skipped_attachments += 1
+            return
 
-        pub = parse_item(data)
-        if pub:
-            publications.append(pub)
+        fields = publication_fields(data)
+        if fields:
+            self.pending.append(fields)
             related = extract_related_keys(data)
             if related:
-                relations[pub.id] = related
+                self.relations[fields["id"]] = related
+            if same_as := extract_related_keys(data, "owl:sameAs"):
+                self.same_as[fields["id"]] = same_as
+            if len(self.pending) >= PARSE_BATCH:
+                self.flush()
         else:
             log.warning(f"Skipped (no date): {title}")
-            skipped_no_date += 1
+            self.skipped_no_date += 1
 
-    log.info(f"Parsed {len(publications)}/{len(items)} items")
-    if skipped_attachments or skipped_no_date:
-        log.warning(f"Total skipped: {skipped_attachments} attachments, {skipped_no_date} no date")
+    def flush(self) -> None:
+        """Validate the items added since the last flush into Publications, in one call."""
+        if self.pending:
+            with gc_paused():
+                self.publications.extend(PUBLICATIONS.validate_python(self.pending))
+            self.pending = []
 
-    merged = merge_preprints(publications, relations)
-    return merge_event_artifacts(merged, relations)
+    def finish(self) -> list[Publication]:
+        """Merge preprints and event artifacts into their primary records."""
+        self.flush()
+        log.info(f"Parsed {len(self.publications)}/{self.seen} items")
+        if self.skipped_attachments or self.skipped_no_date:
+            log.warning(f"Total skipped: {self.skipped_attachments} attachments, {self.skipped_no_date} no date")
 
+        publications, relations = merge_library_copies(self.publications, self.relations, self.same_as)
+        return merge_related(publications, relations)
 
-@click.command()
-@click.option("-o", "--output", type=click.Path(), help="Output JSON file path")
-@click.option("--dry-run", is_flag=True, help="Fetch and parse but don't save")
-def main(output: str | None, dry_run: bool) -> None:
-    """Fetch publications from Zotero and save to JSON."""
-    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
-    config = ZoteroFetcherConfig.from_env()
-    items = fetch_from_zotero(config)
-    publications = parse_items(items)
+def parse_items(items: Iterable[dict[str, Any]], parser: ItemParser | None = None) -> list[Publication]:
+    """Parse Zotero items into Publications, filtering invalid ones.
+
+    Related items are merged into a primary record's `artifacts` list: a
+    preprint contributes its arXiv link, a video its recording link. Pass a
+    `parser` to keep what it collects besides publications (attachments).
+    """
+    parser = parser or ItemParser()
+    for item in items:
+        parser.add(item)
+    return parser.finish()
 
+
+async def download_pdfs(
+    config: ZoteroFetcherConfig,
+    publications: list[Publication],
+    attachments: dict[str, dict[str, Any]],
+    store: PdfStore,
+    limiter: RateLimiter | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> None:
+    """Download each publication's PDF attachment into `store` and link it as `pub.pdf`.
+
+    Files stream straight to disk, `config.workers` at a time. The response
+    cache is bypassed: it buffers bodies and would copy every PDF into it.
+    """
+    wanted: dict[Library, list[dict[str, Any]]] = {}
+    for pub in publications:
+        if pdf := attachments.get(pub.id):
+            wanted.setdefault(pdf.get("library", config.libraries[0]), []).append(pdf)
+    async with AsyncZotero(
+        config.library_id,
+        config.library_type,
+        config.api_key,
+        concurrency=config.workers,
+        limiter=limiter or make_limiter(config),
+        endpoint=config.endpoint,
+        transport=transport,
+        metrics=config.metrics,
+    ) as zt:
+        downloads = (
+            store.download_all(zt.library(library.library_id, library.library_type), pdfs)
+            for library, pdfs in wanted.items()
+        )
+        stored = set().union(*await asyncio.gather(*downloads))
+    for pub in publications:
+        if (pdf := attachments.get(pub.id)) and pdf["md5"] in stored:
+            pub.pdf = store.url(pdf["md5"])
+
+
+def curated_tags_of(archive: ArchiveConfig) -> tuple[str, ...]:
+    """Every spelling of the tags archive.yaml shows (groups, sections), for a server-side tag filter.
+
+    Zotero matches tags as written, so aliases are spelled out; course
+    lectures without any of these tags are filtered out too. Aliases are
+    matched as the site matches tags (see ArchiveConfig.taxonomy): through
+    `normalize`, ignoring case, so a group's `mipt` brings in `MIPT`'s.
+    """
+    tags = {t for g in archive.groups for t in g.tags}
+    tags |= {s.filter.tag for s in archive.sections if s.filter and s.filter.tag}
+    shown = {archive.normalize(t).casefold() for t in tags}
+    for canonical, variants in archive.aliases.items():
+        if canonical.casefold() in shown:
+            tags.update([canonical, *variants])
+    return tuple(sorted(tags))
+
+
+def save_publications(publications: list[Publication], output: str | None, dry_run: bool) -> None:
     if dry_run:
         log.info("Dry run - not saving")
         for pub in publications[:5]:
@@ -333,9 +1095,130 @@ def main(output: str | None, dry_run: bool) -> None:
         return
 
     output_path = Path(output) if output else get_static_data_dir() / "publications.json"
-    PublicationsData(publications=publications).save(output_path)
+    PublicationsData(publications=publications).save(output_path, snapshot=True)
     log.info(f"Saved to {output_path}")
 
 
+@click.command()
+@click.option("-o", "--output", type=click.Path(), help="Output JSON file path")
+@click.option(
+    "--source",
+    default="api",
+    metavar="api|sqlite:PATH|csl:PATH|rdf:PATH",
+    help="Zotero Web API, or offline: a copy of zotero.sqlite, a CSL-JSON or a Zotero RDF export",
+)
+@click.option("--dry-run", is_flag=True, help="Fetch and parse but don't save")
+@click.option("--incremental", is_flag=True, help="Fetch only items changed since the last run (uses --cache)")
+@click.option("--cache", type=click.Path(), help="Raw item cache for --incremental")
+@click.option("--bulk/--no-bulk", default=True, help="Reuse listing payloads, batch detail requests")
+@click.option(
+    "--engine",
+    type=click.Choice(["threads", "async"]),
+    default="threads",
+    help="Thread pool of pyzotero clients, or one pooled asyncio HTTP client",
+)
+@click.option("--workers", type=click.IntRange(min=1), default=8, help="Parallel requests in flight")
+@click.option(
+    "--library",
+    "libraries",
+    multiple=True,
+    metavar="group:ID",
+    help="Also fetch this library (repeatable; adds to ZOTERO_LIBRARIES), merging copies across libraries",
+)
+@click.option("--stream", is_flag=True, help="Parse while fetching (async engine), keeping no raw items in memory")
+@click.option("--spill", type=click.Path(), help="With --stream, also write raw items to this NDJSON file")
+@click.option("--http-cache/--no-http-cache", default=True, help="Revalidate cached API responses by library version")
+@click.option("--resume", is_flag=True, help="Skip items a failed previous fetch already downloaded")
+@click.option("--pdfs", is_flag=True, help="Download PDF attachments into site/static/pdf and link them")
+@click.option("--curated-tags", is_flag=True, help="Only fetch items carrying a tag archive.yaml displays")
+@click.option("--metrics", type=click.Path(), help="Write per-request latency, status and throughput report (JSON)")
+def main(
+    output: str | None,
+    source: str,
+    dry_run: bool,
+    incremental: bool,
+    cache: str | None,
+    bulk: bool,
+    engine: str,
+    workers: int,
+    libraries: tuple[str, ...],
+    stream: bool,
+    spill: str | None,
+    http_cache: bool,
+    resume: bool,
+    pdfs: bool,
+    curated_tags: bool,
+    metrics: str | None,
+) -> None:
+    """Fetch publications from Zotero and save to JSON."""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if stream and incremental:
+        raise click.UsageError("--stream and --incremental are mutually exclusive")
+    kind, _, path = source.partition(":")
+    if source != "api" and (kind not in FILE_SOURCES or not path):
+        raise click.UsageError(f"--source must be 'api' or one of {', '.join(FILE_SOURCES)} with :PATH, got {source!r}")
+    api_options = {
+        "--stream": stream,
+        "--incremental": incremental,
+        "--library": libraries,
+        "--resume": resume,
+        "--pdfs": pdfs,
+        "--curated-tags": curated_tags,
+        "--metrics": metrics,
+    }
+    if path and (given := [name for name, value in api_options.items() if value]):
+        raise click.UsageError(f"--source {kind} reads a local file; it takes no API options ({', '.join(given)})")
+
+    parser = ItemParser()
+    if path:
+        publications = parse_items(FILE_SOURCES[kind](Path(path)), parser)
+        save_publications(publications, output, dry_run)
+        return
+
+    try:
+        extra_libraries = tuple(map(Library.parse, libraries))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--library") from e
+    config = ZoteroFetcherConfig.from_env()
+    config = replace(
+        config,
+        extra_libraries=tuple(dict.fromkeys(config.extra_libraries + extra_libraries)),
+        bulk=bulk,
+        engine=engine,
+        workers=workers,
+        http_cache=get_cache_dir() / "http" if http_cache else None,
+        journal=get_cache_dir() / "fetch-journal.ndjson",
+        resume=resume,
+        metrics=FetchMetrics() if metrics else None,
+        # Attachments are only worth their payload when their PDFs are wanted
+        # (and are listed on their own under a tag filter, see below).
+        item_type="-note" if pdfs and not curated_tags else "-attachment || note",
+        tags=curated_tags_of(ArchiveConfig.load(get_archive_config_path())) if curated_tags else (),
+    )
+    if stream:
+        publications = asyncio.run(fetch_and_parse(config, Path(spill) if spill else None, parser=parser))
+    elif incremental:
+        if config.extra_libraries:
+            raise click.UsageError("--incremental syncs one library; drop --library / ZOTERO_LIBRARIES")
+        cache_path = Path(cache) if cache else get_cache_dir() / "zotero-items.json"
+        publications = parse_items(fetch_incremental(config, cache_path), parser)
+    else:
+        publications = parse_items(fetch_from_zotero(config), parser)
+    if pdfs and curated_tags:
+        # Child attachments carry no tags of their own, so the tag filter would drop every one.
+        for item in fetch_from_zotero(replace(config, item_type="attachment", tags=(), journal=None, resume=False)):
+            parser.add(item)
+    if pdfs:
+        asyncio.run(download_pdfs(config, publications, parser.attachments, PdfStore(get_pdf_dir())))
+    if config.metrics:
+        report = config.metrics.report(items=parser.seen)
+        Path(metrics).write_text(json.dumps(report, indent=2) + "\n")
+        log.info(
+            f"{report['requests']} requests, {report['rate_limited']} rate-limited, "
+            f"{report['throttle_wait_s']}s throttled, {report['items_per_s']} items/s; report in {metrics}"
+        )
+    save_publications(publications, output, dry_run)
+
+
 if __name__ == "__main__":
     main()
@@ -11,22 +11,27 @@ import click
 import yaml
 
 from models import (
-    COURSE_TYPES,
     RESEARCH_TYPES,
     ArchiveConfig,
     Contacts,
     Course,
     Publication,
     PublicationsData,
+    SectionFilter,
     get_archive_config_path,
     get_content_dir,
     get_static_data_dir,
 )
+from publication_index import PublicationIndex
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 log = logging.getLogger(__name__)
 
 DEFAULT_DATE = date(1990, 3, 25)
+# libyaml's emitter when PyYAML was built with it, many times faster. It only differs from
+# PyYAML's in double-quoted scalars (see dump_frontmatter), so those go to yaml.Dumper.
+YAML_DUMPER = getattr(yaml, "CDumper", yaml.Dumper)
+YAML_OPTIONS = {"allow_unicode": True, "default_flow_style": False, "sort_keys": False}
 
 
 def strip_shortcodes(text: str) -> str:
@@ -65,18 +70,13 @@ def latest_pub_date(publications: list[Publication]) -> date:
     return max(p.pub_date for p in publications)
 
 
-def taxonomy_tags(config: ArchiveConfig) -> dict[str, str]:
-    """Map casefolded group tag -> canonical spelling. The curated taxonomy."""
-    return {config.normalize(t).casefold(): config.normalize(t) for g in config.groups for t in g.tags}
-
-
 def curate_tags(tags: list[str], config: ArchiveConfig) -> list[str]:
     """Keep only tags in the curated taxonomy, deduped case-insensitively.
 
     Drops raw Zotero keyword noise (e.g. 'Casimir force', 'Drude model'),
     keeping curated group tags and collapsing case variants (casimir / Casimir).
     """
-    taxonomy = taxonomy_tags(config)
+    taxonomy = config.taxonomy
     seen: set[str] = set()
     result: list[str] = []
     for t in config.normalize_list(tags):
@@ -90,7 +90,7 @@ def curate_tags(tags: list[str], config: ArchiveConfig) -> list[str]:
 
 def pub_to_item(pub: Publication, config: ArchiveConfig) -> dict:
     """Convert publication to item dict for frontmatter."""
-    authors = [config.normalize(str(a)) for a in pub.authors if str(a)]
+    authors = [config.normalize(name) for name in pub.author_names]
     tags = curate_tags(pub.tags, config)
     item = {
         "title": pub.title,
@@ -169,74 +169,35 @@ def group_by_year(
     config: ArchiveConfig,
 ) -> list[dict]:
     """Group publications and courses by year, return list of year groups."""
-    by_year: dict[int, list[dict]] = {}
+    by_year: dict[int, list[tuple[tuple[int, int, int], dict]]] = {}
 
     # Add standalone publications
     for pub in publications:
-        item = pub_to_item(pub, config)
-        item["_sort_key"] = pub.date_sort_key
-        by_year.setdefault(pub.year, []).append(item)
+        by_year.setdefault(pub.year, []).append((pub.date_sort_key, pub_to_item(pub, config)))
 
     # Add courses
     for course in courses:
-        item = course_to_item(course, config)
-        item["_sort_key"] = course.latest_date
-        by_year.setdefault(course.year, []).append(item)
+        by_year.setdefault(course.year, []).append((course.latest_date, course_to_item(course, config)))
 
     groups = []
     for year in sorted(by_year.keys(), reverse=True):
-        items = sorted(by_year[year], key=lambda x: x["_sort_key"], reverse=True)
-        items = [{k: v for k, v in item.items() if k != "_sort_key"} for item in items]
-        groups.append({"year": year, "items": items})
+        items = sorted(by_year[year], key=lambda entry: entry[0], reverse=True)
+        groups.append({"year": year, "items": [item for _, item in items]})
 
     return groups
 
 
-def filter_publications(
-    publications: list[Publication],
-    config: ArchiveConfig,
-    tag: str | None = None,
-    has_course: bool | None = None,
-) -> list[Publication]:
-    """Filter publications by criteria."""
-    result = publications
-
-    if tag:
-        normalized_tag = config.normalize(tag)
-        result = [p for p in result if normalized_tag in config.normalize_list(p.tags)]
-
-    if has_course is True:
-        result = [p for p in result if p.course]
-    elif has_course is False:
-        result = [p for p in result if not p.course]
-
-    return result
-
-
-def compute_courses(
-    publications: list[Publication],
-    config: ArchiveConfig,
-) -> list[Course]:
+def compute_courses(index: PublicationIndex) -> list[Course]:
     """Compute courses from publications with allowed presentation_type and course field.
 
-    Only publications with presentation_type in COURSE_TYPES become course lectures.
-    Other publications with meetingName (e.g. conference presentations) are ignored.
+    Only publications with presentation_type in COURSE_TYPES become course lectures
+    (see PublicationIndex.by_course). Other publications with meetingName (e.g.
+    conference presentations) are ignored.
     """
-    # Only allowed types with meetingName become course lectures
-    lectures = [p for p in publications if p.course and p.presentation_type in COURSE_TYPES]
-
-    # Group by normalized (course, school)
-    groups: dict[tuple[str, str], list[Publication]] = {}
-    for lec in lectures:
-        course_name = config.normalize(lec.course)
-        school_name = config.normalize(lec.school) if lec.school else ""
-        key = (course_name, school_name)
-        groups.setdefault(key, []).append(lec)
-
-    courses = []
-    for (name, school), group_lectures in groups.items():
-        course = Course.from_lectures(name, school, group_lectures)
-        courses.append(course)
+    courses = [
+        Course.from_lectures(name, school, index.take(positions))
+        for (name, school), positions in index.by_course.items()
+    ]
 
     # Sort by year descending, then name
     courses.sort(key=lambda c: (-c.year, c.name))
@@ -257,39 +218,53 @@ def compute_stats(publications: list[Publication], courses: list[Course]) -> dic
     }
 
 
-def write_frontmatter(path: Path, data: dict, content: str = "") -> None:
-    """Write markdown file with YAML frontmatter."""
+def write_if_changed(path: Path, text: str) -> bool:
+    """Write `text` unless the file already holds it; return whether it was written.
+
+    Leaving identical files untouched keeps their mtimes, so a running
+    `hugo server` rebuilds only the pages whose content actually changed.
+    """
+    if path.exists() and path.read_text() == text:
+        return False
     path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    log.debug(f"Wrote {path}")
+    return True
 
-    frontmatter = yaml.dump(data, allow_unicode=True, default_flow_style=False, sort_keys=False)
 
-    with path.open("w") as f:
-        f.write("---\n")
-        f.write(frontmatter)
-        f.write("---\n")
-        if content:
-            f.write("\n")
-            f.write(content)
+def dump_frontmatter(data: dict) -> str:
+    """YAML for `data`, exactly as PyYAML's own emitter writes it.
 
-    log.debug(f"Wrote {path}")
+    libyaml escapes characters outside the BMP (emoji) even with allow_unicode,
+    which forces double quotes, and wraps long double-quoted scalars at other
+    columns. Both show up only as double-quoted scalars, so output containing
+    a double quote is redone with the pure-Python emitter; the rest is identical.
+    """
+    frontmatter = yaml.dump(data, Dumper=YAML_DUMPER, **YAML_OPTIONS)
+    if YAML_DUMPER is not yaml.Dumper and '"' in frontmatter:
+        frontmatter = yaml.dump(data, Dumper=yaml.Dumper, **YAML_OPTIONS)
+    return frontmatter
+
+
+def write_frontmatter(path: Path, data: dict, content: str = "") -> bool:
+    """Write markdown file with YAML frontmatter; return whether it changed."""
+    frontmatter = dump_frontmatter(data)
+    text = f"---\n{frontmatter}---\n"
+    if content:
+        text += f"\n{content}"
+    return write_if_changed(path, text)
 
 
 def match_pubs_by_tags(
-    pubs: list[Publication],
+    index: PublicationIndex,
+    candidates: set[int],
     group_tags: set[str],
-    seen_ids: set[str],
-    config: ArchiveConfig,
+    seen: set[int],
 ) -> list[Publication]:
-    """Match publications by tags, updating seen_ids."""
-    matched = []
-    for pub in pubs:
-        if pub.id in seen_ids:
-            continue
-        pub_tags = set(config.normalize_list(pub.tags))
-        if pub_tags & group_tags:
-            matched.append(pub)
-            seen_ids.add(pub.id)
-    return matched
+    """Match publications among `candidates` (index positions) by tags, updating seen."""
+    matched = (index.tagged(group_tags) & candidates) - seen
+    seen |= matched
+    return index.take(matched)
 
 
 def match_courses_by_tags(
@@ -311,18 +286,18 @@ def match_courses_by_tags(
 
 
 def group_items(
-    standalone_pubs: list[Publication],
+    index: PublicationIndex,
+    standalone: set[int],
     courses: list[Course],
     config: ArchiveConfig,
 ) -> list[dict]:
-    """Group standalone publications and courses by tags."""
-    seen_pub_ids: set[str] = set()
+    """Group standalone publications (index positions) and courses by tags."""
+    seen_pubs: set[int] = set()
     seen_course_slugs: set[str] = set()
     groups_data = []
 
-    for group in config.groups:
-        group_tags = {config.normalize(t) for t in group.tags}
-        matched_pubs = match_pubs_by_tags(standalone_pubs, group_tags, seen_pub_ids, config)
+    for group, group_tags in zip(config.groups, config.group_tags, strict=True):
+        matched_pubs = match_pubs_by_tags(index, standalone, group_tags, seen_pubs)
         matched_courses = match_courses_by_tags(courses, group_tags, seen_course_slugs, config)
 
         if matched_pubs or matched_courses:
@@ -334,7 +309,7 @@ def group_items(
             )
 
     # Other: items not matching any group
-    other_pubs = [p for p in standalone_pubs if p.id not in seen_pub_ids]
+    other_pubs = index.take(standalone - seen_pubs)
     other_courses = [c for c in courses if c.slug not in seen_course_slugs]
     if other_pubs or other_courses:
         groups_data.append(
@@ -349,28 +324,30 @@ def group_items(
 
 def generate_index(
     content_dir: Path,
-    publications: list[Publication],
+    index: PublicationIndex,
     courses: list[Course],
     config: ArchiveConfig,
     stats: dict,
-) -> None:
-    """Generate main index page with groups, stats, and nav."""
-    standalone = filter_publications(publications, config, has_course=False)
-    groups_data = group_items(standalone, courses, config)
+) -> Path:
+    """Generate main index page with groups, stats, and nav; return its path."""
+    standalone = index.positions(SectionFilter(has_course=False))
+    groups_data = group_items(index, standalone, courses, config)
     nav_items = [{"path": s.path, "label": s.label} for s in config.sections]
 
     data = {
         "title": "Publications",
         "layout": "index",
-        "date": latest_pub_date(publications),
+        "date": latest_pub_date(index.publications),
         "stats": stats,
         "nav": nav_items,
         "groups": groups_data,
     }
-    write_frontmatter(content_dir / "_index.md", data)
+    path = content_dir / "_index.md"
+    write_frontmatter(path, data)
 
     counts = ", ".join(f"{g['name']}: {sum(len(y['items']) for y in g['items'])}" for g in groups_data)
     log.info(f"Generated _index.md ({counts})")
+    return path
 
 
 def generate_section(
@@ -379,11 +356,11 @@ def generate_section(
     label: str,
     publications: list[Publication],
     config: ArchiveConfig,
-) -> None:
-    """Generate a section index page with grouped publications."""
+) -> Path | None:
+    """Generate a section index page with grouped publications; return its path (None for the root)."""
     clean_path = section_path.strip("/")
     if not clean_path:
-        return
+        return None
 
     data = {
         "title": label,
@@ -393,17 +370,18 @@ def generate_section(
         "items": group_pubs_by_year(publications, config),
     }
 
-    section_dir = content_dir / clean_path
-    write_frontmatter(section_dir / "_index.md", data)
+    path = content_dir / clean_path / "_index.md"
+    write_frontmatter(path, data)
     log.info(f"Generated {clean_path}/_index.md ({len(publications)} publications)")
+    return path
 
 
 def generate_course_page(
     teaching_dir: Path,
     course: Course,
     config: ArchiveConfig,
-) -> None:
-    """Generate individual course page."""
+) -> Path:
+    """Generate individual course page; return its path."""
     lectures_data = []
     for lec in course.lectures:
         item = lecture_to_item(lec)
@@ -424,15 +402,17 @@ def generate_course_page(
     description = config.course_description(course.slug)
     if description:
         course_data["description"] = description
-    write_frontmatter(teaching_dir / f"{course.slug}.md", course_data)
+    path = teaching_dir / f"{course.slug}.md"
+    write_frontmatter(path, course_data)
+    return path
 
 
 def generate_teaching(
     content_dir: Path,
     courses: list[Course],
     config: ArchiveConfig,
-) -> None:
-    """Generate teaching section with course pages."""
+) -> list[Path]:
+    """Generate teaching section with course pages; return their paths."""
     teaching_dir = content_dir / "teaching"
     by_school: dict[str, list[Course]] = {}
     for course in courses:
@@ -468,20 +448,21 @@ def generate_teaching(
     log.info(f"Generated teaching/_index.md ({len(courses)} courses)")
 
     # Individual course pages
-    for course in courses:
-        generate_course_page(teaching_dir, course, config)
+    paths = [teaching_dir / "_index.md"]
+    paths += [generate_course_page(teaching_dir, course, config) for course in courses]
 
     log.info(f"Generated {len(courses)} course pages")
+    return paths
 
 
-def generate_about(content_dir: Path, config: ArchiveConfig) -> None:
-    """Generate about page with contacts."""
+def generate_about(content_dir: Path, config: ArchiveConfig) -> Path:
+    """Generate about page with contacts; return its path, written or not."""
     about_path = content_dir / "about" / "_index.md"
 
     # Skip if file exists (user-edited content)
     if about_path.exists():
         log.info("Skipped about/_index.md (exists)")
-        return
+        return about_path
 
     contacts = {}
     if config.site.contacts:
@@ -497,6 +478,7 @@ def generate_about(content_dir: Path, config: ArchiveConfig) -> None:
     bio = config.site.bio or ""
     write_frontmatter(about_path, data, content=bio)
     log.info("Generated about/_index.md")
+    return about_path
 
 
 def format_contacts(contacts: Contacts | None) -> list[str]:
@@ -590,16 +572,19 @@ def generate_all(
     publications: list[Publication],
     config: ArchiveConfig,
     content_dir: Path,
-) -> None:
-    """Generate all content files."""
+) -> set[Path]:
+    """Generate all content files; return the pages of this run (see prune_content)."""
     content_dir.mkdir(parents=True, exist_ok=True)
 
+    # Index once; sections, groups and courses are lookups into it
+    index = PublicationIndex.build(publications, config)
+
     # Compute courses and stats
-    courses = compute_courses(publications, config)
+    courses = compute_courses(index)
     stats = compute_stats(publications, courses)
 
     # Generate main index (includes stats and nav)
-    generate_index(content_dir, publications, courses, config, stats)
+    pages = {generate_index(content_dir, index, courses, config, stats)}
 
     # Generate sections from config
     for section in config.sections:
@@ -607,23 +592,16 @@ def generate_all(
             continue
 
         # Apply filters
-        section_pubs = publications
-        if section.filter:
-            section_pubs = filter_publications(
-                publications,
-                config,
-                tag=section.filter.tag,
-                has_course=section.filter.has_course,
-            )
+        section_pubs = index.match(section.filter) if section.filter else publications
 
         # Special sections
         if section.filter and section.filter.has_course:
-            generate_teaching(content_dir, courses, config)
-        else:
-            generate_section(content_dir, section.path, section.label, section_pubs, config)
+            pages.update(generate_teaching(content_dir, courses, config))
+        elif path := generate_section(content_dir, section.path, section.label, section_pubs, config):
+            pages.add(path)
 
     # Generate about page (not in nav)
-    generate_about(content_dir, config)
+    pages.add(generate_about(content_dir, config))
 
     # Generate llms.txt and ai.txt
     site_dir = content_dir.parent
@@ -631,8 +609,25 @@ def generate_all(
     base_url = read_base_url(site_dir)
     llms_content = build_llms_txt(publications, courses, config, stats, base_url)
     for name in ("llms.txt", "ai.txt"):
-        (static_dir / name).write_text(llms_content)
+        write_if_changed(static_dir / name, llms_content)
     log.info("Generated llms.txt, ai.txt")
+    return pages
+
+
+def prune_content(content_dir: Path, pages: set[Path]) -> list[Path]:
+    """Remove pages under `content_dir` that are not in `pages` (e.g. a course that lost its lectures).
+
+    Only markdown is touched; directories left empty go too. Return what was removed.
+    """
+    stale = sorted(p for p in content_dir.rglob("*.md") if p not in pages)
+    for path in stale:
+        path.unlink()
+        log.info(f"Removed {path.relative_to(content_dir)}")
+    for directory in sorted({p.parent for p in stale}, key=lambda d: len(d.parts), reverse=True):
+        while directory != content_dir and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+    return stale
 
 
 @click.command()
@@ -0,0 +1,97 @@
+"""Content-addressed store for PDF attachments downloaded from Zotero."""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from zotero_api import AsyncZotero
+
+log = logging.getLogger(__name__)
+
+# Zotero attachment link modes that have a stored file behind /items/{key}/file.
+STORED_LINK_MODES = {"imported_file", "imported_url"}
+
+
+def pdf_attachment(data: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the stored PDF an attachment item points at ({key, parent, md5}), if any."""
+    if (
+        data.get("itemType") != "attachment"
+        or data.get("contentType") != "application/pdf"
+        or data.get("linkMode") not in STORED_LINK_MODES
+        or not data.get("parentItem")
+        or not data.get("md5")
+    ):
+        return None
+    return {"key": data["key"], "parent": data["parentItem"], "md5": data["md5"]}
+
+
+class PdfStore:
+    """PDFs named by their MD5 (Zotero's own file hash) under a static directory.
+
+    A file's name is its content, so an attachment already present is never
+    downloaded again, however many runs or items reference it.
+    """
+
+    def __init__(self, directory: Path, url_prefix: str = "/pdf") -> None:
+        self.directory = directory
+        self.url_prefix = url_prefix
+
+    def path(self, md5: str) -> Path:
+        return self.directory / f"{md5}.pdf"
+
+    def url(self, md5: str) -> str:
+        """Site URL of a stored file."""
+        return f"{self.url_prefix}/{md5}.pdf"
+
+    def __contains__(self, md5: str) -> bool:
+        return self.path(md5).exists()
+
+    async def download(self, zt: AsyncZotero, attachment: dict[str, Any]) -> bool:
+        """Stream an attachment's file into the store; False if it was already there.
+
+        Chunks are hashed as they are written to a temp file, which only
+        replaces the target once the MD5 matches, so a torn or corrupt
+        download never lands in the store.
+        """
+        md5 = attachment["md5"]
+        if md5 in self:
+            return False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        digest = hashlib.md5()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with zt.stream(f"/items/{attachment['key']}/file") as response:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+                        digest.update(chunk)
+            if digest.hexdigest() != md5:
+                raise ValueError(f"Attachment {attachment['key']}: MD5 {digest.hexdigest()}, expected {md5}")
+            os.replace(tmp, self.path(md5))
+        finally:
+            Path(tmp).unlink(missing_ok=True)
+        return True
+
+    async def download_all(self, zt: AsyncZotero, attachments: Iterable[dict[str, Any]]) -> set[str]:
+        """Download attachments concurrently; return the MD5s now in the store.
+
+        A failed download is logged and left out rather than failing the
+        rest: the publication simply keeps no local PDF until the next run.
+        """
+        attachments = list(attachments)
+        results = await asyncio.gather(*(self.download(zt, a) for a in attachments), return_exceptions=True)
+        stored = set()
+        for attachment, result in zip(attachments, results, strict=True):
+            if isinstance(result, Exception):
+                log.warning(f"PDF download failed for {attachment['key']}: {result}")
+            else:
+                stored.add(attachment["md5"])
+        downloaded = sum(result is True for result in results)
+        present = sum(result is False for result in results)
+        log.info(f"PDFs: {downloaded} downloaded, {present} already stored")
+        return stored
@@ -0,0 +1,79 @@
+"""Inverted indexes over the catalogue, so sections and groups are lookups instead of scans.
+
+`PublicationIndex` is built once per generate run: every publication's tags
+are normalized once and its position filed under each tag, year, type,
+language and (for course lectures) its course. A `SectionFilter` is
+answered by intersecting those position sets; results keep catalogue order.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from models import COURSE_TYPES, ArchiveConfig, Publication, SectionFilter
+
+
+@dataclass
+class PublicationIndex:
+    """Positions of `publications` by normalized tag, year, type, language and course."""
+
+    publications: list[Publication]
+    config: ArchiveConfig
+    by_tag: dict[str, set[int]] = field(default_factory=dict)
+    by_year: dict[int, set[int]] = field(default_factory=dict)
+    by_type: dict[str, set[int]] = field(default_factory=dict)
+    by_language: dict[str, set[int]] = field(default_factory=dict)
+    # Course lectures only, by normalized (course, school), in order of first lecture.
+    by_course: dict[tuple[str, str], set[int]] = field(default_factory=dict)
+    # Anything with a course field, lecture or not.
+    with_course: set[int] = field(default_factory=set)
+
+    @classmethod
+    def build(cls, publications: list[Publication], config: ArchiveConfig) -> PublicationIndex:
+        index = cls(publications, config)
+        for i, pub in enumerate(publications):
+            for tag in config.normalize_list(pub.tags):
+                index.by_tag.setdefault(tag, set()).add(i)
+            index.by_year.setdefault(pub.year, set()).add(i)
+            index.by_type.setdefault(pub.type, set()).add(i)
+            index.by_language.setdefault(pub.language, set()).add(i)
+            if pub.course:
+                index.with_course.add(i)
+                if pub.presentation_type in COURSE_TYPES:
+                    school = config.normalize(pub.school) if pub.school else ""
+                    index.by_course.setdefault((config.normalize(pub.course), school), set()).add(i)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.publications)
+
+    def take(self, positions: Iterable[int]) -> list[Publication]:
+        """The publications at `positions`, in catalogue order."""
+        return [self.publications[i] for i in sorted(positions)]
+
+    def tagged(self, tags: Iterable[str]) -> set[int]:
+        """Positions of publications carrying any of the normalized `tags`."""
+        return set().union(*(self.by_tag.get(tag, ()) for tag in tags))
+
+    def positions(self, section_filter: SectionFilter) -> set[int]:
+        """Positions matching every criterion of `section_filter`."""
+        f = section_filter
+        constraints: list[set[int]] = []
+        if f.tag:
+            constraints.append(self.by_tag.get(self.config.normalize(f.tag), set()))
+        if f.has_course is True:
+            constraints.append(self.with_course)
+        elif f.has_course is False:
+            constraints.append(set(range(len(self))) - self.with_course)
+        if f.year_from is not None or f.year_to is not None:
+            low, high = f.year_from or 0, f.year_to or 9999
+            constraints.append(set().union(*(ps for year, ps in self.by_year.items() if low <= year <= high)))
+        if f.types is not None:
+            constraints.append(set().union(*(self.by_type.get(t, ()) for t in f.types)))
+        if not constraints:
+            return set(range(len(self)))
+        smallest, *rest = sorted(constraints, key=len)
+        return smallest.intersection(*rest)
+
+    def match(self, section_filter: SectionFilter) -> list[Publication]:
+        """The publications a section with `section_filter` shows, in catalogue order."""
+        return self.take(self.positions(section_filter))
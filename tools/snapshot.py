@@ -0,0 +1,149 @@
+"""Binary publications snapshot: a fixed-width index over per-record JSON, read through mmap.
+
+publications.json stays the published artifact; the snapshot written with it
+(under .cache/, out of Hugo's reach) is for tools that only need a few fields
+or a few records. Opening one maps the file and unpacks the index (id, year, month,
+day, type per record); a record's JSON is decoded only when it is asked for.
+
+Layout, little-endian:
+
+    MAGIC | HEADER | meta JSON {"types", "ids"} | INDEX_ROW x count | record JSON...
+
+The header records the size and mtime of the JSON file the snapshot was
+written with; a snapshot whose JSON has changed since is stale and not opened.
+"""
+
+import json
+import mmap
+import struct
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Self
+
+from models import PUBLICATIONS, Publication, gc_paused, get_derived_path
+
+MAGIC = b"PUBSNAP1"
+# source size, source mtime_ns, record count, meta length
+HEADER = struct.Struct("<QqII")
+# year, month, day (0 = unknown), type index, record offset, record length
+INDEX_ROW = struct.Struct("<HBBHQI")
+
+
+def snapshot_path(path: Path) -> Path:
+    """The snapshot kept for a publications JSON file."""
+    return get_derived_path(path, ".snapshot")
+
+
+def source_stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_snapshot(path: Path, publications: Iterable[Publication], source: Path) -> None:
+    """Write a snapshot of `publications`, stamped with the JSON file `source` they were saved to."""
+    pubs = list(publications)
+    records = [pub.model_dump_json(by_alias=True).encode() for pub in pubs]
+    types = list(dict.fromkeys(pub.type for pub in pubs))
+    type_index = {t: i for i, t in enumerate(types)}
+    meta = json.dumps({"types": types, "ids": [pub.id for pub in pubs]}, ensure_ascii=False).encode()
+
+    rows, offset = [], 0
+    for pub, record in zip(pubs, records, strict=True):
+        rows.append(INDEX_ROW.pack(pub.year, pub.month or 0, pub.day or 0, type_index[pub.type], offset, len(record)))
+        offset += len(record)
+
+    tmp = path.with_suffix(".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tmp.open("wb") as f:
+        f.write(MAGIC + HEADER.pack(*source_stamp(source), len(pubs), len(meta)) + meta)
+        f.writelines(rows)
+        f.writelines(records)
+    tmp.replace(path)
+
+
+class PublicationsSnapshot:
+    """A mapped snapshot: index columns up front, records decoded on access."""
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a publications snapshot: {path}")
+        pos = len(MAGIC)
+        size, mtime_ns, count, meta_len = HEADER.unpack_from(self._map, pos)
+        self.source_stamp = (size, mtime_ns)
+        pos += HEADER.size
+        meta = json.loads(self._map[pos : pos + meta_len])
+        pos += meta_len
+        self.ids: list[str] = meta["ids"]
+        self.types: list[str] = meta["types"]
+        self._rows = list(INDEX_ROW.iter_unpack(self._map[pos : pos + count * INDEX_ROW.size]))
+        self._records = pos + count * INDEX_ROW.size
+        self._positions = {key: i for i, key in enumerate(self.ids)}
+
+    @classmethod
+    def open(cls, source: Path) -> Self | None:
+        """The snapshot of the JSON file `source`, or None if there is none or it is stale."""
+        path = snapshot_path(source)
+        if not path.exists() or not source.exists():
+            return None
+        snapshot = cls(path)
+        if snapshot.source_stamp != source_stamp(source):
+            snapshot.close()
+            return None
+        return snapshot
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i: int) -> Publication:
+        return Publication.model_validate_json(self._record(i))
+
+    def __iter__(self) -> Iterator[Publication]:
+        return (self[i] for i in range(len(self)))
+
+    def _record(self, i: int) -> bytes:
+        offset, length = self._rows[i][4:]
+        start = self._records + offset
+        return self._map[start : start + length]
+
+    def get(self, key: str) -> Publication | None:
+        """The record with id `key`, decoding only that record."""
+        i = self._positions.get(key)
+        return None if i is None else self[i]
+
+    def year(self, i: int) -> int:
+        return self._rows[i][0]
+
+    def date_sort_key(self, i: int) -> tuple[int, int, int]:
+        return self._rows[i][:3]
+
+    def type(self, i: int) -> str:
+        return self.types[self._rows[i][3]]
+
+    def select(self, years: Iterable[int] | None = None, types: Iterable[str] | None = None) -> list[int]:
+        """Positions of the records matching every given filter, from the index alone."""
+        year_set = set(years) if years is not None else None
+        type_set = {self.types.index(t) for t in types if t in self.types} if types is not None else None
+        return [
+            i
+            for i, row in enumerate(self._rows)
+            if (year_set is None or row[0] in year_set) and (type_set is None or row[3] in type_set)
+        ]
+
+    def decode(self, positions: Iterable[int] | None = None) -> list[Publication]:
+        """Records at `positions` (default: all), validated in one call."""
+        positions = range(len(self)) if positions is None else positions
+        payload = b"[" + b",".join(map(self._record, positions)) + b"]"
+        with gc_paused():
+            return PUBLICATIONS.validate_json(payload)
@@ -1,9 +1,11 @@
-"""Playwright test configuration."""
+"""Shared test configuration: a private cache directory, and Playwright settings."""
 
 from pathlib import Path
 
 import pytest
 
+import models
+
 BASE_URL = "http://localhost:1313"
 SNAPSHOTS_DIR = Path(__file__).parent / "snapshots"
 
@@ -17,6 +19,13 @@ PAGES = [
 ]
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Keep snapshots and checksums out of the project's own .cache/."""
+    monkeypatch.setattr(models, "get_cache_dir", lambda: tmp_path / ".cache")
+    return tmp_path / ".cache"
+
+
 @pytest.fixture(scope="session")
 def browser_type_launch_args() -> dict:
     return {"channel": "chrome"}
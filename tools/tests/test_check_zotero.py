@@ -0,0 +1,90 @@
+"""Unit tests for check_zotero.py: change detection against the Zotero stand-in."""
+
+import json
+
+import httpx
+import pytest
+from click.testing import CliRunner
+
+import check_zotero
+from check_zotero import CheckState, get_changes
+from zotero_api import RateLimiter, sync_client
+from zotero_standin import StandInLibrary, synthetic_items
+
+URL = "https://api.zotero.org/users/1"
+
+
+def changes(library: StandInLibrary, since: int, published: list[str] | None = None) -> check_zotero.LibraryChanges:
+    with sync_client("k", RateLimiter(rate=10_000), transport=library.transport()) as client:
+        return get_changes(client, URL, CheckState(since, published or list(library.items)))
+
+
+class TestGetChanges:
+    def test_unchanged_library_is_one_request(self) -> None:
+        library = StandInLibrary(synthetic_items(20))
+        result = changes(library, since=20)
+        assert (result.version, result.changed, result.removed) == (20, [], [])
+        assert len(library.requests) == 1
+
+    def test_edits_and_deletions(self) -> None:
+        library = StandInLibrary(synthetic_items(20))
+        known = list(library.items)
+        edited, deleted = known[:2]
+        library.touch(edited, title="Edited")
+        library.delete(deleted)
+        result = changes(library, since=20, published=known)
+        assert (result.since, result.version) == (20, 22)
+        assert result.changed == [edited]
+        assert result.removed == [deleted]
+
+    def test_unpublished_edits_are_not_removals(self) -> None:
+        library = StandInLibrary(synthetic_items(20))
+        known = list(library.items)
+        library.touch("NEWITEM1")
+        library.delete(known[0])
+        result = changes(library, since=20, published=known[1:])
+        assert result.changed == ["NEWITEM1"]
+        assert result.removed == []
+
+    def test_trashed_item_is_removed(self) -> None:
+        library = StandInLibrary(synthetic_items(20))
+        known = list(library.items)
+        library.trash(known[0])
+        result = changes(library, since=20, published=known)
+        assert (result.changed, result.removed) == ([], [known[0]])
+
+    def test_error_raises(self) -> None:
+        transport = httpx.MockTransport(lambda request: httpx.Response(403))
+        with sync_client("k", RateLimiter(), transport=transport) as client, pytest.raises(httpx.HTTPStatusError):
+            get_changes(client, URL, CheckState(1))
+
+    def test_first_run_reports_everything(self) -> None:
+        library = StandInLibrary(synthetic_items(20))
+        assert changes(library, since=0).changed == sorted(library.items)
+
+
+class TestMain:
+    @pytest.mark.parametrize("library_type", ["user", "group"])
+    def test_state_round_trip(self, tmp_path, monkeypatch, library_type: str) -> None:
+        library = StandInLibrary(synthetic_items(5), library_type=library_type)
+        server = library.serve()
+        host, port = server.server_address[:2]
+        monkeypatch.setenv("ZOTERO_API_KEY", "k")
+        monkeypatch.setenv("ZOTERO_LIBRARY_ID", "1")
+        monkeypatch.setenv("ZOTERO_LIBRARY_TYPE", library_type)
+        monkeypatch.setenv("ZOTERO_API_URL", f"http://{host}:{port}")
+        state = tmp_path / "version.json"
+        try:
+            first = CliRunner().invoke(check_zotero.main, ["--state", str(state)])
+            second = CliRunner().invoke(check_zotero.main, ["--state", str(state)])
+        finally:
+            server.shutdown()
+        assert first.exit_code == 0, first.output
+        assert len(json.loads(first.output)["changed"]) == 5
+        assert json.loads(second.output) == {"since": 5, "version": 5, "changed": [], "removed": []}
+        assert CheckState.load(state) == CheckState(5, sorted(library.items))
+
+    def test_apply(self) -> None:
+        state = CheckState(3, ["A", "B"])
+        state.apply(check_zotero.LibraryChanges(since=3, version=7, changed=["C"], removed=["A"]))
+        assert state == CheckState(7, ["B", "C"])
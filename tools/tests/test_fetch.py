@@ -1,12 +1,32 @@
-"""Unit tests for fetch.py: extract_related_keys and merges."""
+"""Unit tests for fetch.py: extract_related_keys, merges and incremental sync."""
 
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+import fetch
 from fetch import (
+    FetchJournal,
+    ItemCache,
+    Library,
+    UnionFind,
+    ZoteroFetcherConfig,
+    client_factory,
     extract_related_keys,
+    fetch_details,
+    fetch_incremental,
     merge_event_artifacts,
+    merge_library_copies,
     merge_preprints,
+    merge_related,
+    merge_streams,
+    parse_date,
     parse_item,
 )
-from models import Artifact, Publication
+from models import ArchiveConfig, Artifact, Publication, get_archive_config_path
+from zotero_standin import synthetic_items
 
 
 class TestParseItemCreators:
@@ -59,6 +79,40 @@ def arxiv_of(pub: Publication) -> str | None:
     return next((a.url for a in pub.artifacts if a.kind == "arxiv"), None)
 
 
+class TestParseDate:
+    @pytest.mark.parametrize(
+        ("value", "expected"),
+        [
+            ("2024-05-03", (2024, 5, 3)),
+            ("2024/5/3", (2024, 5, 3)),
+            ("2024-05", (2024, 5, None)),
+            ("2024/12", (2024, 12, None)),
+            ("2024", (2024, None, None)),
+            ("2024-02-30", (2024, None, None)),  # not a date: falls back to the year
+            ("2024-13", (2024, None, None)),
+            ("2024/05-03", (2024, None, None)),  # mixed separators
+            ("May 2024", (2024, None, None)),
+            ("0000", (0, None, None)),
+            ("", (0, None, None)),
+            (None, (0, None, None)),
+        ],
+    )
+    def test_formats(self, value: str | None, expected: tuple) -> None:
+        assert parse_date(value) == expected
+
+
+class TestItemParser:
+    def test_batches_match_item_by_item(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(fetch, "PARSE_BATCH", 7)
+        items = synthetic_items(50)
+        parser = fetch.ItemParser()
+        for item in items:
+            parser.add(item)
+        parser.flush()
+        published = [item["data"] for item in items if item["data"]["itemType"] not in fetch.SKIP_TYPES]
+        assert parser.publications == [pub for data in published if (pub := parse_item(data))]
+
+
 class TestExtractRelatedKeys:
     def test_empty_relations(self) -> None:
         assert extract_related_keys({}) == []
@@ -228,3 +282,359 @@ class TestMergeEventArtifacts:
         result = merge_event_artifacts([slides, paper, video], relations)
         assert len(result) == 3
         assert all(p.artifacts == [] for p in result)
+
+
+class TestMergeRelated:
+    def test_preprint_chain_merged_into_published(self) -> None:
+        """v1 -> v2 -> journal: both versions go, the journal keeps the first link."""
+        v1 = make_pub("P1", "preprint", "https://arxiv.org/abs/1v1")
+        v2 = make_pub("P2", "preprint", "https://arxiv.org/abs/1v2")
+        journal = make_pub("J1", "journalArticle")
+        result = merge_related([journal, v1, v2], {"P1": ["P2"], "P2": ["J1"]})
+        assert [p.id for p in result] == ["J1"]
+        assert arxiv_of(result[0]) == "https://arxiv.org/abs/1v1"
+
+    def test_every_published_version_gets_the_preprint(self) -> None:
+        conf = make_pub("C1", "conferencePaper")
+        journal = make_pub("J1", "journalArticle")
+        preprint = make_pub("P1", "preprint", "https://arxiv.org/abs/1")
+        result = merge_related([conf, journal, preprint], {"P1": ["C1", "J1"]})
+        assert [(p.id, arxiv_of(p)) for p in result] == [("C1", preprint.url), ("J1", preprint.url)]
+
+    def test_video_shared_by_two_talks_goes_to_the_first(self) -> None:
+        s1 = make_pub("S1", "presentation", "https://files/1.pdf")
+        s2 = make_pub("S2", "presentation", "https://files/2.pdf")
+        video = make_pub("V1", "videoRecording", "https://youtu.be/abc")
+        result = merge_related([s1, s2, video], {"V1": ["S2", "S1"]})
+        assert [(p.id, [a.kind for a in p.artifacts]) for p in result] == [("S1", ["slides", "video"]), ("S2", [])]
+
+    def test_large_cluster_is_order_independent(self) -> None:
+        def run(reverse: bool) -> list[tuple[str, str | None]]:
+            pubs = [make_pub(f"P{i:04d}", "preprint", f"https://arxiv.org/abs/{i}") for i in range(1000)]
+            pubs.append(make_pub("J1", "journalArticle"))
+            # A path P0000 - P0001 - ... - J1, listed from either end.
+            relations = {f"P{i:04d}": [f"P{i + 1:04d}"] for i in range(999)} | {"P0999": ["J1"]}
+            if reverse:
+                relations = {k: relations[k] for k in reversed(relations)}
+            return [(p.id, arxiv_of(p)) for p in merge_related(pubs, relations)]
+
+        assert run(False) == run(True) == [("J1", "https://arxiv.org/abs/0")]
+
+
+class TestUnionFind:
+    def test_groups_in_key_order(self) -> None:
+        uf = UnionFind()
+        uf.union("c", "a")
+        uf.union("d", "e")
+        uf.union("b", "a")
+        assert uf.groups("abcdef") == [["a", "b", "c"], ["d", "e"]]
+
+    def test_chain_has_one_root(self) -> None:
+        uf = UnionFind()
+        for a, b in zip("abcde", "bcdef", strict=True):
+            uf.union(a, b)
+        assert len({uf.find(k) for k in "abcdef"}) == 1
+        assert uf.find("z") == "z"
+
+
+class TestMergeLibraryCopies:
+    def test_copy_dropped_and_relations_redirected(self) -> None:
+        original = make_pub("ORIG", "journalArticle")
+        copy = make_pub("COPY", "journalArticle")
+        preprint = make_pub("PRE", "preprint", "https://arxiv.org/abs/1")
+        kept, relations = merge_library_copies(
+            [original, copy, preprint], {"COPY": ["PRE"], "PRE": ["COPY"]}, {"COPY": ["ORIG"]}
+        )
+        assert [p.id for p in kept] == ["ORIG", "PRE"]
+        assert relations == {"ORIG": ["PRE"], "PRE": ["ORIG"]}
+        assert arxiv_of(merge_preprints(kept, relations)[0]) == "https://arxiv.org/abs/1"
+
+    def test_original_not_fetched_keeps_copy(self) -> None:
+        copy = make_pub("COPY", "journalArticle")
+        kept, _ = merge_library_copies([copy], {}, {"COPY": ["ELSEWHERE"]})
+        assert kept == [copy]
+
+    def test_mutual_same_as_keeps_one(self) -> None:
+        a, b = make_pub("A", "journalArticle"), make_pub("B", "journalArticle")
+        kept, _ = merge_library_copies([a, b], {}, {"A": ["B"], "B": ["A"]})
+        assert [p.id for p in kept] == ["B"]
+
+    def test_parser_reads_same_as(self) -> None:
+        parser = fetch.ItemParser()
+        for key, same_as in (("ORIG", None), ("COPY", "http://zotero.org/users/1/items/ORIG")):
+            item = raw_item(key)
+            if same_as:
+                item["data"]["relations"] = {"owl:sameAs": same_as}
+            parser.add(item)
+        assert [p.id for p in parser.finish()] == ["ORIG"]
+
+
+class TestLibraries:
+    def test_parse(self) -> None:
+        assert Library.parse("group:42") == Library("group", 42)
+        with pytest.raises(ValueError):
+            Library.parse("team:42")
+
+    def test_for_library_gets_own_journal(self, tmp_path) -> None:
+        config = ZoteroFetcherConfig(
+            api_key="k", library_id=1, journal=tmp_path / "j.ndjson", extra_libraries=(Library("group", 5),)
+        )
+        assert config.for_library(config.libraries[0]).journal == tmp_path / "j.ndjson"
+        group = config.for_library(Library("group", 5))
+        assert (group.library_type, group.library_id, group.extra_libraries) == ("group", 5, ())
+        assert group.journal == tmp_path / "j-group-5.ndjson"
+
+    def test_from_env(self, monkeypatch) -> None:
+        monkeypatch.setenv("ZOTERO_API_KEY", "k")
+        monkeypatch.setenv("ZOTERO_LIBRARY_ID", "1")
+        monkeypatch.setenv("ZOTERO_LIBRARIES", "group:5, group:6,user:1")
+        assert ZoteroFetcherConfig.from_env().libraries == [
+            Library("user", 1),
+            Library("group", 5),
+            Library("group", 6),
+        ]
+
+    def test_listing_params(self) -> None:
+        assert CONFIG.listing_params == {"itemType": "-attachment || note"}
+        config = ZoteroFetcherConfig(api_key="k", library_id=1, item_type="", tags=("ai", "mipt"))
+        assert config.listing_params == {"tag": "ai || mipt"}
+
+    def test_curated_tags_cover_groups_sections_and_aliases(self) -> None:
+        archive = ArchiveConfig.model_validate(
+            {
+                "site": {"author": "A"},
+                "groups": [{"name": "Research", "tags": ["MIPT", "ai"]}],
+                "sections": [{"path": "/casimir/", "label": "Casimir", "filter": {"tag": "casimir"}}],
+                "aliases": {"MIPT": ["Moscow Institute of Physics and Technology"]},
+            }
+        )
+        assert fetch.curated_tags_of(archive) == ("MIPT", "Moscow Institute of Physics and Technology", "ai", "casimir")
+
+    def test_curated_tags_match_aliases_ignoring_case(self) -> None:
+        archive = ArchiveConfig.load(get_archive_config_path())
+        tags = fetch.curated_tags_of(archive)
+        for spelling in (
+            "mipt",
+            "Moscow Institute of Physics and Technology",
+            "SPbPU",
+            "Saint Petersburg Polytechnic University",
+        ):
+            assert spelling in tags
+
+    def test_merge_streams_interleaves_and_raises(self) -> None:
+        async def chunks(name: str, count: int, fail: bool = False):
+            for i in range(count):
+                await asyncio.sleep(0)
+                yield [f"{name}{i}"]
+            if fail:
+                raise RuntimeError(name)
+
+        async def collect(*streams) -> list[list[str]]:
+            return [chunk async for chunk in merge_streams(list(streams))]
+
+        merged = asyncio.run(collect(chunks("a", 3), chunks("b", 2)))
+        assert sorted(merged) == [["a0"], ["a1"], ["a2"], ["b0"], ["b1"]]
+        with pytest.raises(RuntimeError, match="b"):
+            asyncio.run(collect(chunks("a", 50), chunks("b", 2, fail=True)))
+
+
+def raw_item(key: str, version: int = 1) -> dict[str, Any]:
+    data = {"key": key, "version": version, "itemType": "journalArticle", "date": "2024", "title": key, "relations": {}}
+    return {"key": key, "version": version, "data": data}
+
+
+def listing_entry(key: str) -> dict[str, Any]:
+    """A listing entry without full `data` (e.g. fetched with a narrower include)."""
+    return {"key": key, "version": 1, "data": {"key": key}}
+
+
+class FakeZotero:
+    """The slice of pyzotero's Zotero used by fetch, backed by a dict library."""
+
+    library: dict[str, dict[str, Any]] = {}
+    unpublished: set[str] = set()
+    trashed: set[str] = set()
+    deleted_keys: list[str] = []
+    version = 0
+    calls: list[str] = []
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.request = SimpleNamespace(headers={"last-modified-version": str(self.version)})
+
+    def add_parameters(self, **params: Any) -> None:
+        pass
+
+    def last_modified_version(self) -> int:
+        self.calls.append("version")
+        return self.version
+
+    def item_versions(self, since: int, includeTrashed: int = 0) -> dict[str, int]:  # noqa: N803
+        self.calls.append("versions")
+        touched = {k: i["version"] for k, i in self.library.items() if i["version"] > since}
+        return touched if includeTrashed else {k: v for k, v in touched.items() if k not in self.trashed}
+
+    def deleted(self, since: int) -> dict[str, list[str]]:
+        self.calls.append("deleted")
+        return {"items": self.deleted_keys}
+
+    def publications(self, since: int = 0, start: int = 0, limit: int = 100, **params: Any) -> list[dict[str, Any]]:
+        self.calls.append("publications")
+        hidden = self.unpublished | self.trashed
+        matched = [i for k, i in self.library.items() if i["version"] > since and k not in hidden]
+        self.request.headers["Total-Results"] = str(len(matched))
+        return matched[start : start + limit]
+
+    def everything(self, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return items
+
+    def item(self, key: str) -> dict[str, Any]:
+        self.calls.append(f"item:{key}")
+        return self.library[key]
+
+    def items(self, itemKey: str, include: str, limit: int) -> list[dict[str, Any]]:  # noqa: N803
+        self.calls.append(f"items:{itemKey}")
+        return [self.library[k] for k in itemKey.split(",")]
+
+
+@pytest.fixture
+def fake_zotero(monkeypatch: pytest.MonkeyPatch) -> type[FakeZotero]:
+    FakeZotero.library = {k: raw_item(k) for k in ("A", "B", "C")}
+    FakeZotero.unpublished = set()
+    FakeZotero.trashed = set()
+    FakeZotero.deleted_keys = []
+    FakeZotero.version = 1
+    FakeZotero.calls = []
+    monkeypatch.setattr(fetch.zotero, "Zotero", FakeZotero)
+    return FakeZotero
+
+
+CONFIG = ZoteroFetcherConfig(api_key="k", library_id=1, workers=2)
+
+
+class TestFetchDetails:
+    def test_complete_listing_needs_no_requests(self, fake_zotero: type[FakeZotero]) -> None:
+        listed = list(fake_zotero.library.values())
+        detailed = fetch_details(client_factory(CONFIG), listed, CONFIG)
+        assert sorted(i["key"] for i in detailed) == ["A", "B", "C"]
+        assert fake_zotero.calls == []
+
+    def test_incomplete_entries_fetched_in_batches(self, fake_zotero: type[FakeZotero]) -> None:
+        keys = [f"K{i:03}" for i in range(120)]
+        fake_zotero.library = {k: raw_item(k) for k in keys}
+        listed = [listing_entry(k) for k in keys[:110]] + [raw_item(k) for k in keys[110:]]
+
+        detailed = fetch_details(client_factory(CONFIG), listed, CONFIG)
+
+        assert sorted(i["key"] for i in detailed) == keys
+        assert all(i["data"]["itemType"] == "journalArticle" for i in detailed)
+        batches = [c.removeprefix("items:").split(",") for c in fake_zotero.calls]
+        assert sorted(map(len, batches)) == [10, 50, 50]
+
+    def test_no_bulk_fetches_each_item(self, fake_zotero: type[FakeZotero]) -> None:
+        config = ZoteroFetcherConfig(api_key="k", library_id=1, bulk=False)
+        listed = list(fake_zotero.library.values())
+        fetch_details(client_factory(config), listed, config)
+        assert sorted(fake_zotero.calls) == ["item:A", "item:B", "item:C"]
+
+
+class TestFetchJournal:
+    def test_failed_run_resumes_missing_batches(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        keys = [f"K{i:03}" for i in range(120)]
+        fake_zotero.library = {k: raw_item(k) for k in keys}
+        listed = [listing_entry(k) for k in keys]
+        config = ZoteroFetcherConfig(api_key="k", library_id=1, workers=1, journal=tmp_path / "journal.ndjson")
+        failing = FakeZotero.items
+
+        def fail_last(self: FakeZotero, itemKey: str, include: str, limit: int) -> list[dict[str, Any]]:  # noqa: N803
+            if itemKey.startswith("K100"):
+                raise ConnectionError("network down")
+            return failing(self, itemKey, include, limit)
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(FakeZotero, "items", fail_last)
+            with pytest.raises(ConnectionError):
+                fetch_details(client_factory(config), listed, config, FetchJournal(config.journal))
+        assert len(config.journal.read_text().splitlines()) == 100
+
+        fake_zotero.calls = []
+        journal = FetchJournal(config.journal, resume=True)
+        detailed = fetch_details(client_factory(config), listed, config, journal)
+        assert sorted(i["key"] for i in detailed) == keys
+        assert [len(c.split(",")) for c in fake_zotero.calls] == [20]
+
+    def test_changed_items_refetched(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        path = tmp_path / "journal.ndjson"
+        FetchJournal(path).record([raw_item("A", 1), raw_item("B", 1)])
+        with path.open("a") as f:
+            f.write('{"key": "C", "ver')  # killed mid-write
+        journal = FetchJournal(path, resume=True)
+        assert journal.items.keys() == {"A", "B"}
+        assert journal.get(listing_entry("A")) == raw_item("A", 1)
+        assert journal.get({"key": "B", "version": 2}) is None
+
+    def test_fresh_run_discards_old_journal(self, tmp_path) -> None:
+        path = tmp_path / "journal.ndjson"
+        FetchJournal(path).record([raw_item("A")])
+        assert FetchJournal(path).items == {}
+        assert not path.exists()
+
+
+class TestItemCache:
+    def test_missing_file_is_empty(self, tmp_path) -> None:
+        cache = ItemCache.load(tmp_path / "none.json")
+        assert cache.version == 0
+        assert cache.items == {}
+
+    def test_patch_and_roundtrip(self, tmp_path) -> None:
+        cache = ItemCache(version=1, items={"A": raw_item("A"), "B": raw_item("B")})
+        cache.patch(5, [raw_item("A", 5), raw_item("C", 4)], ["B", "GONE"])
+        cache.save(tmp_path / "cache.json")
+
+        loaded = ItemCache.load(tmp_path / "cache.json")
+        assert loaded.version == 5
+        assert sorted(loaded.items) == ["A", "C"]
+        assert loaded.items["A"]["version"] == 5
+
+
+class TestFetchIncremental:
+    def test_cold_cache_fetches_everything(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        items = fetch_incremental(CONFIG, tmp_path / "cache.json")
+        assert sorted(i["key"] for i in items) == ["A", "B", "C"]
+        assert ItemCache.load(tmp_path / "cache.json").version == 1
+
+    def test_unchanged_library_is_one_request(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        fetch_incremental(CONFIG, tmp_path / "cache.json")
+        fake_zotero.calls = []
+
+        items = fetch_incremental(CONFIG, tmp_path / "cache.json")
+
+        assert len(items) == 3
+        assert fake_zotero.calls == ["versions"]
+
+    def test_patches_changed_deleted_and_unpublished(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        fetch_incremental(CONFIG, tmp_path / "cache.json")
+        fake_zotero.version = 2
+        fake_zotero.library["A"] = raw_item("A", 2)  # edited
+        fake_zotero.library["B"] = raw_item("B", 2)  # taken out of My Publications
+        fake_zotero.unpublished = {"B"}
+        fake_zotero.library["D"] = raw_item("D", 2)  # added
+        del fake_zotero.library["C"]
+        fake_zotero.deleted_keys = ["C"]
+        fake_zotero.calls = []
+
+        items = fetch_incremental(CONFIG, tmp_path / "cache.json")
+
+        assert sorted(i["key"] for i in items) == ["A", "D"]
+        assert next(i for i in items if i["key"] == "A")["version"] == 2
+        assert not [c for c in fake_zotero.calls if c.startswith("item")]  # listing payloads reused
+        assert ItemCache.load(tmp_path / "cache.json").version == 2
+
+    def test_trashed_item_is_dropped(self, fake_zotero: type[FakeZotero], tmp_path) -> None:
+        fetch_incremental(CONFIG, tmp_path / "cache.json")
+        fake_zotero.version = 2
+        fake_zotero.library["B"] = raw_item("B", 2)  # moved to the trash, not yet in /deleted
+        fake_zotero.trashed = {"B"}
+
+        items = fetch_incremental(CONFIG, tmp_path / "cache.json")
+
+        assert sorted(i["key"] for i in items) == ["A", "C"]
@@ -1,10 +1,16 @@
 """Unit tests for generate.py helpers."""
 
+import pytest
+import yaml
+
 from generate import (
     curate_tags,
+    dump_frontmatter,
     pub_to_item,
     quote_block,
     strip_shortcodes,
+    write_frontmatter,
+    write_if_changed,
 )
 from models import ArchiveConfig, Author, Group, Publication, SiteConfig
 
@@ -112,3 +118,40 @@ class TestPubToItem:
         config = make_config()
         pub = Publication(id="P", type="journalArticle", year=2024, title="T")
         assert "license" not in pub_to_item(pub, config)
+
+
+class TestWriteIfChanged:
+    def test_identical_content_left_untouched(self, tmp_path) -> None:
+        path = tmp_path / "sub" / "page.md"
+        assert write_if_changed(path, "a") is True
+        mtime = path.stat().st_mtime_ns
+        assert write_if_changed(path, "a") is False
+        assert path.stat().st_mtime_ns == mtime
+        assert write_if_changed(path, "b") is True
+        assert path.read_text() == "b"
+
+    def test_frontmatter_layout(self, tmp_path) -> None:
+        path = tmp_path / "page.md"
+        assert write_frontmatter(path, {"title": "T"}, content="Body")
+        assert path.read_text() == "---\ntitle: T\n---\n\nBody"
+        assert not write_frontmatter(path, {"title": "T"}, content="Body")
+
+
+class TestDumpFrontmatter:
+    @pytest.mark.parametrize(
+        "title",
+        [
+            "Plain title",
+            "Smile \U0001f600 please",
+            "Лекция \U0001f600 " + "слово " * 20,
+            "Tab\tand bell\x07 " + "word " * 30,
+            'Quoted "part" of a title: ' + "word " * 30 + "\nsecond line\u2028third",
+        ],
+    )
+    def test_same_as_pure_python_emitter(self, title: str) -> None:
+        data = {"title": title, "tags": [title], "params": {"title": title, "year": 2024}}
+        expected = yaml.dump(data, Dumper=yaml.Dumper, allow_unicode=True, default_flow_style=False, sort_keys=False)
+        assert dump_frontmatter(data) == expected
+
+    def test_emoji_stays_literal(self) -> None:
+        assert dump_frontmatter({"title": "Smile \U0001f600"}) == "title: Smile \U0001f600\n"
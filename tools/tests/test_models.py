@@ -1,10 +1,22 @@
 """Unit tests for models.py helpers."""
 
 import unicodedata
+from datetime import date
 
 import pytest
+from pydantic import ValidationError
 
-from models import Author, Publication, PublicationsData, slugify
+from models import (
+    ArchiveConfig,
+    Author,
+    CourseConfig,
+    Group,
+    Publication,
+    PublicationsData,
+    PublicationType,
+    SiteConfig,
+    slugify,
+)
 
 
 @pytest.mark.parametrize(
@@ -42,3 +54,52 @@ def test_license_survives_save_load(tmp_path) -> None:
 
     loaded = PublicationsData.load(path)
     assert loaded.publications[0].license == "MIT"
+
+
+def test_load_rejects_malformed_json(tmp_path) -> None:
+    path = tmp_path / "pubs.json"
+    path.write_text('{"publications": [')
+    with pytest.raises(ValidationError):
+        PublicationsData.load(path)
+
+
+class TestArchiveConfigIndexes:
+    CONFIG = ArchiveConfig(
+        site=SiteConfig(author="X"),
+        groups=[Group(name="AI", tags=["ml", "Vision"]), Group(name="HW", tags=["FPGA"])],
+        courses=[CourseConfig(slug="c", description="first"), CourseConfig(slug="c", description="second")],
+        aliases={"Machine Learning": ["ml", "ML"], "ML": ["machine-learning"], "Computer Vision": ["Vision"]},
+    )
+
+    def test_normalize_first_listing_wins(self) -> None:
+        assert self.CONFIG.normalize("ml") == "Machine Learning"
+        assert self.CONFIG.normalize("ML") == "Machine Learning"  # variant of an earlier entry beats its own
+        assert self.CONFIG.normalize("machine-learning") == "ML"
+        assert self.CONFIG.normalize("unknown") == "unknown"
+
+    def test_taxonomy_and_group_tags(self) -> None:
+        assert self.CONFIG.taxonomy == {
+            "machine learning": "Machine Learning",
+            "computer vision": "Computer Vision",
+            "fpga": "FPGA",
+        }
+        assert self.CONFIG.group_tags == [{"Machine Learning", "Computer Vision"}, {"FPGA"}]
+
+    def test_course_description_first_wins(self) -> None:
+        assert self.CONFIG.course_description("c") == "first"
+        assert self.CONFIG.course_description("missing") == ""
+
+
+def test_derived_publication_fields() -> None:
+    pub = Publication(
+        id="P",
+        type="preprint",
+        year=2024,
+        month=5,
+        title="T",
+        authors=[Author(firstName="A", lastName="B"), Author(), Author(lastName="Lab")],
+    )
+    assert pub.pub_type is PublicationType.PREPRINT
+    assert (pub.date_sort_key, pub.pub_date) == ((2024, 5, 0), date(2024, 5, 1))
+    assert pub.author_names == ["A B", "Lab"]
+    assert Publication(id="S", type="software", year=2024, title="T").pub_type is None
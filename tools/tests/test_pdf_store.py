@@ -0,0 +1,144 @@
+"""Unit tests for pdf_store.py and PDF linking in fetch, against the Zotero stand-in."""
+
+import asyncio
+import hashlib
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import fetch
+from fetch import ItemParser, ZoteroFetcherConfig, download_pdfs
+from models import PublicationsData
+from pdf_store import PdfStore, pdf_attachment
+from zotero_api import AsyncZotero, RateLimiter
+from zotero_standin import StandInLibrary, server_url, synthetic_items
+
+PDF = b"%PDF-1.7 " + b"x" * 100_000
+MD5 = hashlib.md5(PDF).hexdigest()
+CONFIG = ZoteroFetcherConfig(api_key="k", library_id=1)
+
+
+def attachment_data(**overrides: str) -> dict[str, str]:
+    data = {
+        "key": "ATT1",
+        "itemType": "attachment",
+        "parentItem": "PARENT",
+        "linkMode": "imported_file",
+        "contentType": "application/pdf",
+        "md5": MD5,
+    }
+    return data | overrides
+
+
+def library_with_pdf() -> StandInLibrary:
+    library = StandInLibrary(synthetic_items(3))
+    library.attach(next(iter(library.items)), "ATT1", PDF)
+    return library
+
+
+def download(store: PdfStore, library: StandInLibrary, attachments: list[dict[str, str]]) -> set[str]:
+    async def run() -> set[str]:
+        async with AsyncZotero(1, limiter=RateLimiter(rate=10_000), transport=library.transport()) as zt:
+            return await store.download_all(zt, attachments)
+
+    return asyncio.run(run())
+
+
+class TestPdfAttachment:
+    def test_stored_pdf(self) -> None:
+        assert pdf_attachment(attachment_data()) == {"key": "ATT1", "parent": "PARENT", "md5": MD5}
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [{"linkMode": "linked_url"}, {"contentType": "text/html"}, {"parentItem": ""}, {"md5": ""}],
+    )
+    def test_not_downloadable(self, overrides: dict[str, str]) -> None:
+        assert pdf_attachment(attachment_data(**overrides)) is None
+
+    def test_parser_collects_first_per_parent(self) -> None:
+        parser = ItemParser()
+        parser.add({"data": attachment_data()})
+        parser.add({"data": attachment_data(key="ATT2", md5="other")})
+        assert parser.attachments == {"PARENT": {"key": "ATT1", "parent": "PARENT", "md5": MD5}}
+
+
+class TestPdfStore:
+    def test_streams_into_content_address(self, tmp_path: Path) -> None:
+        store = PdfStore(tmp_path)
+        assert download(store, library_with_pdf(), [pdf_attachment(attachment_data())]) == {MD5}
+        assert store.path(MD5).read_bytes() == PDF
+        assert store.url(MD5) == f"/pdf/{MD5}.pdf"
+
+    def test_present_file_not_downloaded(self, tmp_path: Path) -> None:
+        store = PdfStore(tmp_path)
+        store.path(MD5).write_bytes(PDF)
+        library = library_with_pdf()
+        assert download(store, library, [pdf_attachment(attachment_data())]) == {MD5}
+        assert library.requests == []
+
+    def test_checksum_mismatch_discarded(self, tmp_path: Path) -> None:
+        store = PdfStore(tmp_path)
+        wrong = pdf_attachment(attachment_data(md5="0" * 32))
+        assert download(store, library_with_pdf(), [wrong]) == set()
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestDownloadPdfs:
+    def test_links_publications(self, tmp_path: Path) -> None:
+        library = library_with_pdf()
+        parser = ItemParser()
+        for item in library.items.values():
+            parser.add(item)
+        publications = parser.finish()
+        store = PdfStore(tmp_path)
+
+        asyncio.run(
+            download_pdfs(
+                CONFIG, publications, parser.attachments, store, RateLimiter(rate=10_000), library.transport()
+            )
+        )
+
+        linked = {pub.id: pub.pdf for pub in publications if pub.pdf}
+        assert linked == {next(iter(library.items)): f"/pdf/{MD5}.pdf"}
+
+    def test_group_attachment_downloads_from_its_library(self, tmp_path: Path) -> None:
+        group = StandInLibrary(synthetic_items(3, seed=1), library_id=7, library_type="group")
+        parent = next(iter(group.items))
+        group.attach(parent, "ATT1", PDF)
+        parser = ItemParser()
+        for item in group.items.values():
+            parser.add({**item, "library": {"type": "group", "id": 7}})
+        publications = parser.finish()
+        user = StandInLibrary([]).mount(group)
+
+        asyncio.run(download_pdfs(CONFIG, publications, parser.attachments, PdfStore(tmp_path), None, user.transport()))
+
+        assert {pub.id: pub.pdf for pub in publications if pub.pdf} == {parent: f"/pdf/{MD5}.pdf"}
+        assert "/groups/7/items/ATT1/file" in group.requests
+
+    def test_curated_tags_keep_untagged_attachments(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        library = StandInLibrary(synthetic_items(3))
+        parent, other = list(library.items)[:2]
+        library.touch(parent, tags=[{"tag": "casimir"}])
+        library.touch(other, tags=[])
+        library.attach(parent, "ATT1", PDF)
+        archive = tmp_path / "archive.yaml"
+        archive.write_text("site:\n  author: A\ngroups:\n  - name: Research\n    tags: [casimir]\n")
+        monkeypatch.setattr(fetch, "get_archive_config_path", lambda: archive)
+        monkeypatch.setattr(fetch, "get_pdf_dir", lambda: tmp_path / "pdf")
+        monkeypatch.setattr(fetch, "get_cache_dir", lambda: tmp_path / ".cache")
+        server = library.serve()
+        monkeypatch.setenv("ZOTERO_API_KEY", "k")
+        monkeypatch.setenv("ZOTERO_LIBRARY_ID", "1")
+        monkeypatch.setenv("ZOTERO_API_URL", server_url(server))
+        output = tmp_path / "publications.json"
+        try:
+            args = ["-o", str(output), "--pdfs", "--curated-tags", "--no-http-cache"]
+            result = CliRunner().invoke(fetch.main, args)
+        finally:
+            server.shutdown()
+
+        assert result.exit_code == 0, result.output
+        linked = {pub.id: pub.pdf for pub in PublicationsData.load(output).publications if pub.pdf}
+        assert linked == {parent: f"/pdf/{MD5}.pdf"}
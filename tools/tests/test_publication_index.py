@@ -0,0 +1,75 @@
+"""Unit tests for publication_index.py: inverted indexes and compiled section filters."""
+
+import pytest
+
+from generate import compute_courses
+from models import ArchiveConfig, Publication, SectionFilter, SiteConfig
+from publication_index import PublicationIndex
+
+CONFIG = ArchiveConfig(site=SiteConfig(author="Owner"), aliases={"AI": ["ML", "ai", "machine learning"]})
+
+PUBLICATIONS = [
+    Publication(id="J1", type="journalArticle", year=2024, title="Paper", tags=["ML"]),
+    Publication(
+        id="L1",
+        type="presentation",
+        year=2023,
+        title="Lecture",
+        tags=["ai"],
+        series="Deep Learning",
+        school="MIPT",
+        presentationType="Lecture",
+        language="russian",
+    ),
+    Publication(id="T1", type="presentation", year=2022, title="Talk", tags=["casimir"], series="Workshop"),
+    Publication(id="J2", type="conferencePaper", year=2021, title="Older", tags=["machine learning", "casimir"]),
+]
+
+
+@pytest.fixture
+def index() -> PublicationIndex:
+    return PublicationIndex.build(PUBLICATIONS, CONFIG)
+
+
+def ids(pubs: list[Publication]) -> list[str]:
+    return [p.id for p in pubs]
+
+
+class TestPublicationIndex:
+    def test_tags_are_normalized_once(self, index: PublicationIndex) -> None:
+        assert index.by_tag["AI"] == {0, 1, 3}
+        assert index.tagged({"AI", "casimir"}) == {0, 1, 2, 3}
+
+    def test_columns(self, index: PublicationIndex) -> None:
+        assert index.by_year[2023] == {1}
+        assert index.by_type["presentation"] == {1, 2}
+        assert index.by_language["russian"] == {1}
+        assert index.with_course == {1, 2}
+        assert index.by_course == {("Deep Learning", "MIPT"): {1}}
+
+    def test_take_keeps_catalogue_order(self, index: PublicationIndex) -> None:
+        assert ids(index.take({3, 0, 2})) == ["J1", "T1", "J2"]
+
+    def test_courses_from_lectures_only(self, index: PublicationIndex) -> None:
+        assert [c.name for c in compute_courses(index)] == ["Deep Learning"]
+
+
+class TestSectionFilter:
+    @pytest.mark.parametrize(
+        ("section_filter", "expected"),
+        [
+            (SectionFilter(), ["J1", "L1", "T1", "J2"]),
+            (SectionFilter(tag="machine learning"), ["J1", "L1", "J2"]),
+            (SectionFilter(tag="unknown"), []),
+            (SectionFilter(has_course=True), ["L1", "T1"]),
+            (SectionFilter(has_course=False), ["J1", "J2"]),
+            (SectionFilter(tag="casimir", has_course=False), ["J2"]),
+            (SectionFilter(year_from=2022), ["J1", "L1", "T1"]),
+            (SectionFilter(year_from=2022, year_to=2023), ["L1", "T1"]),
+            (SectionFilter(year_to=2021), ["J2"]),
+            (SectionFilter(types=["journalArticle", "conferencePaper"]), ["J1", "J2"]),
+            (SectionFilter(tag="ai", types=["presentation"], year_from=2023), ["L1"]),
+        ],
+    )
+    def test_match(self, index: PublicationIndex, section_filter: SectionFilter, expected: list[str]) -> None:
+        assert ids(index.match(section_filter)) == expected
@@ -0,0 +1,85 @@
+"""Unit tests for snapshot.py: writing, mapping and lazily decoding publication snapshots."""
+
+from pathlib import Path
+
+import pytest
+
+from models import Artifact, Author, Publication, PublicationsData
+from snapshot import PublicationsSnapshot, snapshot_path
+
+PUBLICATIONS = [
+    Publication(
+        id="J1",
+        type="journalArticle",
+        year=2024,
+        month=5,
+        title="Paper",
+        authors=[Author(firstName="Алиса", lastName="First")],
+        artifacts=[Artifact(kind="arxiv", url="https://arxiv.org/abs/1")],
+        series="Course",
+    ),
+    Publication(id="T1", type="presentation", year=2023, month=3, day=2, title="Talk", presentationType="Keynote"),
+    Publication(id="J2", type="journalArticle", year=2023, title="Older paper"),
+]
+
+
+@pytest.fixture
+def saved(tmp_path: Path) -> Path:
+    path = tmp_path / "publications.json"
+    PublicationsData(publications=PUBLICATIONS).save(path, snapshot=True)
+    return path
+
+
+class TestPublicationsSnapshot:
+    def test_roundtrip(self, saved: Path) -> None:
+        with PublicationsSnapshot.open(saved) as snapshot:
+            assert len(snapshot) == 3
+            assert snapshot.ids == ["J1", "T1", "J2"]
+            assert snapshot.decode() == PUBLICATIONS
+            assert list(snapshot) == PUBLICATIONS
+
+    def test_index_answers_without_decoding(self, saved: Path) -> None:
+        with PublicationsSnapshot.open(saved) as snapshot:
+            assert (snapshot.year(1), snapshot.type(1)) == (2023, "presentation")
+            assert snapshot.date_sort_key(1) == (2023, 3, 2)
+            assert snapshot.select(years=[2023]) == [1, 2]
+            assert snapshot.select(years=[2023], types=["journalArticle"]) == [2]
+            assert snapshot.select(types=["book"]) == []
+
+    def test_get_decodes_one_record(self, saved: Path) -> None:
+        with PublicationsSnapshot.open(saved) as snapshot:
+            assert snapshot.get("T1") == PUBLICATIONS[1]
+            assert snapshot.get("missing") is None
+
+    def test_stale_snapshot_is_not_opened(self, saved: Path) -> None:
+        saved.write_text('{"publications": []}')
+        assert PublicationsSnapshot.open(saved) is None
+
+    def test_kept_out_of_the_published_directory(self, saved: Path, cache_dir: Path) -> None:
+        assert snapshot_path(saved).is_relative_to(cache_dir)
+        assert [p.name for p in saved.parent.iterdir() if p.is_file()] == ["publications.json"]
+
+    def test_each_json_file_has_its_own(self, saved: Path, tmp_path: Path) -> None:
+        other = tmp_path / "other" / "publications.json"
+        PublicationsData(publications=PUBLICATIONS[:1]).save(other, snapshot=True)
+        assert snapshot_path(other) != snapshot_path(saved)
+        with PublicationsSnapshot.open(saved) as snapshot:
+            assert len(snapshot) == 3
+
+    def test_saving_without_snapshot_removes_old_one(self, saved: Path) -> None:
+        PublicationsData(publications=PUBLICATIONS).save(saved)
+        assert not snapshot_path(saved).exists()
+
+    def test_rejects_other_files(self, saved: Path) -> None:
+        with pytest.raises(ValueError):
+            PublicationsSnapshot(saved)
+
+
+class TestFilteredLoad:
+    @pytest.mark.parametrize("snapshot", [True, False])
+    def test_same_records_with_or_without_snapshot(self, tmp_path: Path, snapshot: bool) -> None:
+        path = tmp_path / "publications.json"
+        PublicationsData(publications=PUBLICATIONS).save(path, snapshot=snapshot)
+        assert PublicationsData.load(path, years=[2023]).publications == PUBLICATIONS[1:]
+        assert PublicationsData.load(path, types=["journalArticle"]).publications == [PUBLICATIONS[0], PUBLICATIONS[2]]
+        assert PublicationsData.load(path).publications == PUBLICATIONS
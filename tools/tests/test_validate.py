@@ -1,5 +1,11 @@
 """Unit tests for editorial rules in validate.py."""
 
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import validate
 from models import (
     ArchiveConfig,
     Artifact,
@@ -15,6 +21,7 @@ from validate import (
     check_group_overlap,
     check_no_dropbox,
     check_url_present,
+    checksum_path,
 )
 
 
@@ -114,3 +121,34 @@ class TestCheckEditorial:
         errors, warnings = check_editorial(data, config)
         assert errors == []
         assert len(warnings) == 3  # placeholder url + empty authors + multi-group
+
+
+class TestIfChanged:
+    @pytest.fixture
+    def files(self, tmp_path: Path) -> tuple[Path, Path]:
+        (tmp_path / "data").mkdir()
+        publications, config = tmp_path / "data" / "publications.json", tmp_path / "archive.yaml"
+        PublicationsData(publications=[make_pub()]).save(publications)
+        config.write_text("site:\n  author: X\n")
+        return publications, config
+
+    def run(self, files: tuple[Path, Path]) -> int:
+        args = ["-p", str(files[0]), "-c", str(files[1]), "--if-changed"]
+        return CliRunner().invoke(validate.main, args).exit_code
+
+    def test_unchanged_files_are_skipped(self, files: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch) -> None:
+        assert self.run(files) == 0
+        assert checksum_path(files[0]).exists()
+        assert [p.name for p in files[0].parent.iterdir()] == ["publications.json"]  # nothing for Hugo to publish
+        monkeypatch.setattr(validate, "validate_publications", lambda path: pytest.fail("revalidated"))
+        assert self.run(files) == 0
+
+    def test_changed_config_is_revalidated(self, files: tuple[Path, Path]) -> None:
+        assert self.run(files) == 0
+        files[1].write_text("site: {}\n")
+        assert self.run(files) == 1
+
+    def test_failed_validation_leaves_no_checksum(self, files: tuple[Path, Path]) -> None:
+        files[0].write_text('{"publications": [{"id": "K1"}]}')
+        assert self.run(files) == 1
+        assert not checksum_path(files[0]).exists()
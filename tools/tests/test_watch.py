@@ -0,0 +1,132 @@
+"""Tests for watch.py: polling the Zotero stand-in and rebuilding content."""
+
+import threading
+from dataclasses import replace
+
+import httpx
+import pytest
+
+from fetch import ZoteroFetcherConfig
+from models import ArchiveConfig, PublicationsData, Section, SectionFilter, SiteConfig
+from pdf_store import PdfStore
+from watch import Watcher
+from zotero_standin import StandInLibrary, server_url, synthetic_items
+
+
+@pytest.fixture
+def watched(tmp_path):
+    """A watcher over a 60-item stand-in, building into a scratch Hugo site."""
+    library = StandInLibrary(synthetic_items(60))
+    server = library.serve()
+    site = tmp_path / "site"
+    (site / "static").mkdir(parents=True)
+    (site / "hugo.toml").write_text('baseURL = "https://example.org/"\n')
+    watcher = Watcher(
+        config=ZoteroFetcherConfig(api_key="k", library_id=1, endpoint=server_url(server)),
+        archive=ArchiveConfig(site=SiteConfig(author="Owner")),
+        cache_path=tmp_path / "items.json",
+        publications_path=site / "static" / "data" / "publications.json",
+        content_dir=site / "content",
+    )
+    yield library, watcher
+    server.shutdown()
+
+
+def first_publication(library: StandInLibrary, watcher: Watcher) -> str:
+    return next(pub.id for pub in watcher.publications if pub.id in library.items)
+
+
+class TestWatcher:
+    def test_first_poll_builds_then_idles_on_one_request(self, watched) -> None:
+        library, watcher = watched
+        assert watcher.poll() is True
+        assert (watcher.content_dir / "_index.md").exists()
+        assert watcher.cache_path.exists()
+
+        library.requests.clear()
+        assert watcher.poll() is False
+        assert library.requests == ["/users/1/items"]
+
+    def test_edit_rebuilds_with_new_data(self, watched) -> None:
+        library, watcher = watched
+        watcher.poll()
+        key = first_publication(library, watcher)
+        library.touch(key, title="Edited title")
+
+        assert watcher.poll() is True
+        saved = PublicationsData.load(watcher.publications_path).publications
+        assert any(pub.title == "Edited title" for pub in saved)
+
+    def test_irrelevant_change_skips_rebuild(self, watched) -> None:
+        library, watcher = watched
+        watcher.poll()
+        index = watcher.content_dir / "_index.md"
+        mtime = index.stat().st_mtime_ns
+        library.touch("NOTE0001", itemType="note", title="A note")
+
+        assert watcher.poll() is False
+        assert index.stat().st_mtime_ns == mtime
+
+    def test_rebuild_keeps_stored_pdfs_linked(self, watched, tmp_path) -> None:
+        library, watcher = watched
+        watcher = replace(watcher, pdf_store=PdfStore(tmp_path / "pdf"))
+        watcher.poll()
+        key, other = [pub.id for pub in watcher.publications if pub.id in library.items][:2]
+        library.attach(key, "PDF00001", b"%PDF-1.4 paper")
+        assert watcher.poll() is True
+        library.touch(other, title="Edited title")
+        assert watcher.poll() is True
+
+        saved = {pub.id: pub for pub in PublicationsData.load(watcher.publications_path).publications}
+        md5 = library.items["PDF00001"]["data"]["md5"]
+        assert saved[key].pdf == f"/pdf/{md5}.pdf"
+        assert md5 in watcher.pdf_store
+        assert library.requests.count("/users/1/items/PDF00001/file") == 1
+
+    def test_course_without_lectures_loses_its_page(self, watched) -> None:
+        library, watcher = watched
+        teaching = Section(path="/teaching/", label="Teaching", filter=SectionFilter(has_course=True))
+        watcher.archive = ArchiveConfig(site=SiteConfig(author="Owner"), sections=[teaching])
+        watcher.poll()
+        key = first_publication(library, watcher)
+        library.touch(key, series="Old course", presentationType="Lecture")
+        watcher.poll()
+        teaching_dir = watcher.content_dir / "teaching"
+        (page,) = (p for p in teaching_dir.glob("*.md") if p.name != "_index.md")
+        about = watcher.content_dir / "about" / "_index.md"
+        about.write_text("---\ntitle: About\n---\nEdited by hand\n")
+
+        library.touch(key, series="")
+        assert watcher.poll() is True
+        assert not page.exists()
+        assert (teaching_dir / "_index.md").exists()
+        assert about.read_text().endswith("Edited by hand\n")
+
+    def test_run_backs_off_on_failure(self, watched, monkeypatch) -> None:
+        _, watcher = watched
+        waits: list[float] = []
+        stop = threading.Event()
+
+        def failing_poll() -> bool:
+            raise httpx.ConnectError("down")
+
+        def wait(delay: float) -> bool:
+            waits.append(delay)
+            if len(waits) == 4:
+                stop.set()
+            return stop.is_set()
+
+        monkeypatch.setattr(watcher, "poll", failing_poll)
+        monkeypatch.setattr(stop, "wait", wait)
+        watcher.run(interval=10, max_interval=50, stop=stop)
+        assert waits == [20, 40, 50, 50]
+
+    def test_run_does_not_swallow_bugs(self, watched, monkeypatch) -> None:
+        _, watcher = watched
+
+        def broken_poll() -> bool:
+            raise RuntimeError("not a network problem")
+
+        monkeypatch.setattr(watcher, "poll", broken_poll)
+        with pytest.raises(RuntimeError, match="not a network"):
+            watcher.run(interval=10, max_interval=50)
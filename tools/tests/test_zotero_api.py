@@ -0,0 +1,338 @@
+"""Unit tests for zotero_api.py and the async fetch engine, against an in-process mock API."""
+
+import asyncio
+from typing import Any
+
+import httpx
+import pytest
+
+from fetch import ZoteroFetcherConfig, fetch_and_parse, fetch_from_zotero_async, parse_items
+from zotero_api import (
+    AsyncZotero,
+    FetchMetrics,
+    RateLimiter,
+    RateLimitError,
+    ResponseCache,
+    ThrottledTransport,
+    histogram,
+    route,
+    sync_client,
+)
+
+
+def make_item(key: str) -> dict[str, Any]:
+    data = {"key": key, "version": 1, "itemType": "journalArticle", "date": "2024", "title": key, "relations": {}}
+    return {"key": key, "version": 1, "data": data}
+
+
+class MockLibrary:
+    """Serves /publications/items (paged), /items?itemKey= and /items/{key}; counts requests."""
+
+    def __init__(self, n: int, complete: bool = True, rate_limit_first: bool = False, total: bool = False) -> None:
+        self.items = {f"K{i:04}": make_item(f"K{i:04}") for i in range(n)}
+        self.complete = complete
+        self.total = total  # send Total-Results, as Zotero does
+        self.rate_limit_first = rate_limit_first
+        self.requests: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            return self.respond(request)
+        finally:
+            self.in_flight -= 1
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if self.rate_limit_first:
+            self.rate_limit_first = False
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        params = request.url.params
+        path = request.url.path.removeprefix("/users/1")
+        if path == "/publications/items":
+            start, limit = int(params.get("start", 0)), int(params["limit"])
+            page = list(self.items.values())[start : start + limit]
+            if not self.complete:
+                page = [{"key": i["key"], "version": 1, "data": {"key": i["key"]}} for i in page]
+            headers = {"Total-Results": str(len(self.items))} if self.total else {}
+            if start + limit < len(self.items):
+                headers["Link"] = f'<{request.url.copy_merge_params({"start": start + limit})}>; rel="next"'
+            return httpx.Response(200, json=page, headers=headers)
+        if path == "/items":
+            return httpx.Response(200, json=[self.items[k] for k in params["itemKey"].split(",")])
+        return httpx.Response(200, json=self.items[path.removeprefix("/items/")])
+
+
+def fast_limiter() -> RateLimiter:
+    return RateLimiter(rate=10_000, burst=100)
+
+
+def run_fetch(library: MockLibrary, **config: Any) -> list[dict[str, Any]]:
+    cfg = ZoteroFetcherConfig(api_key="k", library_id=1, **config)
+    return asyncio.run(fetch_from_zotero_async(cfg, fast_limiter(), httpx.MockTransport(library)))
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def response(status: int = 200, **headers: str) -> httpx.Response:
+    return httpx.Response(status, headers=headers)
+
+
+class TestRateLimiter:
+    def test_burst_then_paced(self) -> None:
+        limiter = RateLimiter(rate=10, burst=3, clock=FakeClock())
+        delays = [limiter.reserve() for _ in range(5)]
+        assert delays == pytest.approx([0, 0, 0, 0.1, 0.2])
+
+    def test_backoff_header_pauses_every_caller(self) -> None:
+        clock = FakeClock()
+        limiter = RateLimiter(rate=10, burst=10, clock=clock)
+        assert limiter.observe(response(200, Backoff="5")) is False
+        assert limiter.reserve() == pytest.approx(5)
+        assert limiter.reserve() == pytest.approx(5 + 1 / limiter.rate)  # paced, not bursting, after the pause
+
+    def test_parallel_429s_halve_rate_once(self) -> None:
+        limiter = RateLimiter(rate=8, clock=FakeClock())
+        for _ in range(4):
+            assert limiter.observe(response(429, **{"Retry-After": "2"})) is True
+        assert limiter.rate == 4
+        assert limiter.paused_until == 102
+
+    def test_success_increases_rate_up_to_max(self) -> None:
+        limiter = RateLimiter(rate=1, max_rate=2, increase=0.5, clock=FakeClock())
+        for _ in range(5):
+            limiter.observe(response())
+        assert limiter.rate == 2
+
+    def test_retry_budget_is_shared(self) -> None:
+        clock = FakeClock()
+        limiter = RateLimiter(retry_budget=2, clock=clock)
+        assert limiter.observe(None)
+        limiter.observe(response())
+        assert limiter.observe(response(503))
+        clock.now += 1
+        with pytest.raises(RateLimitError, match="budget"):
+            limiter.observe(response(429))
+
+    def test_wave_wider_than_breaker_counts_once(self) -> None:
+        limiter = RateLimiter(burst=16, breaker=8, retry_budget=4, clock=FakeClock())
+        for _ in range(16):  # one 429 per worker
+            assert limiter.observe(response(429)) is True
+        assert (limiter.failures, limiter.retry_budget) == (1, 3)
+        assert limiter.reserve() == 0
+
+    def test_burst_capped_after_429_until_successes(self) -> None:
+        clock = FakeClock()
+        limiter = RateLimiter(rate=10, burst=4, clock=clock)
+        limiter.observe(response(429))
+        assert [limiter.reserve() for _ in range(3)] == pytest.approx([0, 0.2, 0.4])
+        clock.now += 10
+        for _ in range(20):  # a couple of seconds of successes restore the burst
+            limiter.observe(response())
+        assert [limiter.reserve() for _ in range(4)] == [0, 0, 0, 0]
+
+    def test_circuit_opens_after_consecutive_failures(self) -> None:
+        limiter = RateLimiter(breaker=3, clock=FakeClock())
+        for _ in range(3):
+            limiter.observe(None)
+        with pytest.raises(RateLimitError, match="Circuit open"):
+            limiter.reserve()
+
+
+class TestThrottledTransport:
+    def test_retries_429_transparently(self) -> None:
+        statuses = iter([429, 429, 200])
+        transport = ThrottledTransport(
+            fast_limiter(),
+            httpx.MockTransport(lambda request: httpx.Response(next(statuses), headers={"Retry-After": "0"})),
+        )
+        with httpx.Client(transport=transport) as client:
+            assert client.get("https://api.zotero.org/users/1/items").status_code == 200
+
+
+class VersionedLibrary:
+    """Answers 304 while If-Modified-Since-Version is not behind the library version."""
+
+    def __init__(self) -> None:
+        self.version = 5
+        self.bodies = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        headers = {"Last-Modified-Version": str(self.version)}
+        since = request.headers.get("If-Modified-Since-Version")
+        if since and int(since) >= self.version:
+            return httpx.Response(304, headers=headers)
+        self.bodies += 1
+        return httpx.Response(200, json={"ITEM0001": self.version}, headers=headers)
+
+
+class TestResponseCache:
+    URL = "https://api.zotero.org/users/1/publications/items?format=versions"
+
+    def test_sync_client_replays_on_304(self, tmp_path) -> None:
+        library = VersionedLibrary()
+        with sync_client("k", fast_limiter(), ResponseCache(tmp_path), httpx.MockTransport(library)) as client:
+            first = client.get(self.URL).json()
+            second = client.get(self.URL).json()
+            library.version = 6
+            third = client.get(self.URL).json()
+        assert first == second == {"ITEM0001": 5}
+        assert third == {"ITEM0001": 6}
+        assert library.bodies == 2
+
+    def test_async_client_shares_cache_across_runs(self, tmp_path) -> None:
+        library = VersionedLibrary()
+
+        async def get() -> Any:
+            async with AsyncZotero(
+                1, limiter=fast_limiter(), cache=ResponseCache(tmp_path), transport=httpx.MockTransport(library)
+            ) as zt:
+                return await zt.get_json("/publications/items", format="versions")
+
+        assert asyncio.run(get()) == asyncio.run(get()) == {"ITEM0001": 5}
+        assert library.bodies == 1
+
+    def test_unversioned_responses_not_stored(self, tmp_path) -> None:
+        cache = ResponseCache(tmp_path)
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        with sync_client("k", fast_limiter(), cache, transport) as client:
+            client.get(self.URL)
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestAsyncZotero:
+    def test_pages_follow_next_links(self) -> None:
+        library = MockLibrary(250)
+
+        async def collect() -> list[int]:
+            async with AsyncZotero(1, limiter=fast_limiter(), transport=httpx.MockTransport(library)) as zt:
+                return [len(page) async for page in zt.pages("/publications/items")]
+
+        assert asyncio.run(collect()) == [100, 100, 50]
+
+    def test_pages_after_total_results_run_in_parallel(self) -> None:
+        library = MockLibrary(450, total=True)
+
+        async def collect() -> list[str]:
+            async with AsyncZotero(1, limiter=fast_limiter(), transport=httpx.MockTransport(library)) as zt:
+                return [item["key"] async for page in zt.pages("/publications/items") for item in page]
+
+        assert sorted(asyncio.run(collect())) == sorted(library.items)
+        assert len(library.requests) == 5
+        assert library.max_in_flight == 4  # every page after the first at once
+
+    def test_retries_after_rate_limit(self) -> None:
+        library = MockLibrary(1, rate_limit_first=True)
+
+        async def get() -> Any:
+            async with AsyncZotero(1, limiter=fast_limiter(), transport=httpx.MockTransport(library)) as zt:
+                return await zt.get_json("/items/K0000")
+
+        assert asyncio.run(get())["key"] == "K0000"
+        assert len(library.requests) == 2
+
+
+class TestFetchFromZoteroAsync:
+    def test_complete_listing_is_only_requests(self) -> None:
+        library = MockLibrary(250)
+        items = run_fetch(library)
+        assert sorted(i["key"] for i in items) == sorted(library.items)
+        assert len(library.requests) == 3  # listing pages only
+
+    def test_incomplete_listing_batched(self) -> None:
+        library = MockLibrary(120, complete=False)
+        items = run_fetch(library)
+        assert [i["data"]["itemType"] for i in items] == ["journalArticle"] * 120
+        assert library.requests.count("/users/1/items") == 3
+
+    def test_no_bulk_matches_and_respects_concurrency(self) -> None:
+        library = MockLibrary(40)
+        items = run_fetch(library, bulk=False, workers=4)
+        assert sorted(i["key"] for i in items) == sorted(library.items)
+        assert len(library.requests) == 41
+        assert library.max_in_flight <= 4
+
+
+class TestFetchAndParse:
+    def test_matches_fetch_then_parse(self, tmp_path) -> None:
+        library = MockLibrary(230, complete=False)
+        preprint = library.items["K0001"]["data"]
+        preprint.update(itemType="preprint", url="https://arxiv.org/abs/1")
+        preprint["relations"] = {"dc:relation": "http://zotero.org/users/1/items/K0000"}
+        cfg = ZoteroFetcherConfig(api_key="k", library_id=1)
+        spill = tmp_path / "items.ndjson"
+
+        streamed = asyncio.run(fetch_and_parse(cfg, spill, 2, fast_limiter(), httpx.MockTransport(library)))
+        batch = parse_items(run_fetch(library))
+
+        assert len(streamed) == 229  # preprint merged into K0000
+        assert sorted(p.model_dump_json() for p in streamed) == sorted(p.model_dump_json() for p in batch)
+        assert len(spill.read_text().splitlines()) == 230
+
+    def test_fetch_error_propagates(self) -> None:
+        def fail(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404)
+
+        cfg = ZoteroFetcherConfig(api_key="k", library_id=1)
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(fetch_and_parse(cfg, limiter=fast_limiter(), transport=httpx.MockTransport(fail)))
+
+
+class TestFetchMetrics:
+    @pytest.mark.parametrize(
+        ("url", "label"),
+        [
+            ("https://api.zotero.org/users/1/publications/items?start=100", "/publications/items"),
+            ("https://api.zotero.org/users/1/items?itemKey=A,B", "/items?itemKey"),
+            ("https://api.zotero.org/groups/7/items/ABCD2345/file", "/items/{key}/file"),
+        ],
+    )
+    def test_route(self, url: str, label: str) -> None:
+        assert route(httpx.Request("GET", url)) == label
+
+    def test_histogram(self) -> None:
+        stats = histogram([0.005, 0.02, 0.2, 6.0])
+        assert (stats["p50"], stats["max"]) == (200.0, 6000.0)
+        assert stats["histogram"]["<=25"] == 2
+        assert stats["histogram"][">5000"] == 1
+
+    def test_async_fetch_report(self) -> None:
+        library = MockLibrary(120, complete=False, rate_limit_first=True)
+        metrics = FetchMetrics()
+        cfg = ZoteroFetcherConfig(api_key="k", library_id=1, metrics=metrics)
+        items = asyncio.run(fetch_from_zotero_async(cfg, fast_limiter(), httpx.MockTransport(library)))
+
+        report = metrics.report(items=len(items))
+        assert report["requests"] == len(library.requests) == 6
+        assert report["statuses"] == {"200": 5, "429": 1}
+        assert (report["rate_limited"], report["retries"]) == (1, 1)
+        assert report["routes"]["/items?itemKey"]["requests"] == 3
+        assert report["routes"]["/items?itemKey"]["bytes"] > 0
+        assert report["bytes"] == sum(r["bytes"] for r in report["routes"].values())
+        assert report["items"] == 120
+
+    def test_sync_client_counts_transport_errors(self) -> None:
+        attempts = iter([httpx.ConnectError("down"), httpx.Response(200, json=[])])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            outcome = next(attempts)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        metrics = FetchMetrics()
+        with sync_client("k", fast_limiter(), transport=httpx.MockTransport(handler), metrics=metrics) as client:
+            client.get("https://api.zotero.org/users/1/items")
+        report = metrics.report(items=0)
+        assert (report["requests"], report["transport_errors"], report["retries"]) == (2, 1, 1)
+        assert report["bytes"] == 2
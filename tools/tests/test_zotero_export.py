@@ -0,0 +1,217 @@
+"""Unit tests for zotero_export.py: streaming CSL-JSON and Zotero RDF readers."""
+
+import io
+import json
+import re
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import fetch
+from fetch import extract_related_keys, parse_items
+from models import PublicationsData
+from zotero_export import item_key, iter_json_array, read_csl_json, read_rdf
+
+CSL = [
+    {
+        "id": "http://zotero.org/users/1/items/ARTICLE1",
+        "type": "article-journal",
+        "title": "Paper",
+        "URL": "https://doi.org/10/x",
+        "issued": {"date-parts": [[2024, 5]]},
+        "author": [{"family": "First", "given": "Alice"}, {"literal": "Research Lab"}],
+        "keyword": "ml, systems",
+        "language": "ru",
+    },
+    {
+        "id": "TALK0001",
+        "type": "speech",
+        "title": "Talk",
+        "genre": "Conference presentation",
+        "event-place": "Moscow",
+        "issued": {"raw": "March 2023"},
+    },
+    {"id": "NODATE01", "type": "report", "title": "Undated"},
+]
+
+# Shaped like Zotero's own RDF export: items are named by their URL or a local
+# #item_N, and Related Items, attachments and journals point at those names.
+RDF = """<rdf:RDF
+ xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+ xmlns:z="http://www.zotero.org/namespaces/export#"
+ xmlns:dcterms="http://purl.org/dc/terms/"
+ xmlns:bib="http://purl.org/net/biblio#"
+ xmlns:foaf="http://xmlns.com/foaf/0.1/"
+ xmlns:link="http://purl.org/rss/1.0/modules/link/"
+ xmlns:dc="http://purl.org/dc/elements/1.1/"
+ xmlns:prism="http://prismstandard.org/namespaces/1.2/basic/">
+    <bib:Article rdf:about="https://doi.org/10/x">
+        <z:itemType>journalArticle</z:itemType>
+        <dcterms:isPartOf rdf:resource="urn:issn:1234-5678"/>
+        <bib:authors>
+            <rdf:Seq>
+                <rdf:li>
+                    <foaf:Person>
+                        <foaf:surname>First</foaf:surname>
+                        <foaf:givenName>Alice</foaf:givenName>
+                    </foaf:Person>
+                </rdf:li>
+            </rdf:Seq>
+        </bib:authors>
+        <link:link rdf:resource="#item_12"/>
+        <dc:subject>ml</dc:subject>
+        <dc:subject>
+           <z:AutomaticTag>
+              <rdf:value>auto</rdf:value>
+           </z:AutomaticTag>
+        </dc:subject>
+        <dc:relation rdf:resource="http://arxiv.org/abs/1"/>
+        <dc:title>Paper</dc:title>
+        <dc:date>2024-05-03</dc:date>
+        <dc:identifier>
+            <dcterms:URI>
+               <rdf:value>https://doi.org/10/x</rdf:value>
+            </dcterms:URI>
+        </dc:identifier>
+    </bib:Article>
+    <bib:Journal rdf:about="urn:issn:1234-5678">
+        <prism:volume>1</prism:volume>
+        <dc:title>Journal</dc:title>
+        <dc:identifier>ISSN 1234-5678</dc:identifier>
+    </bib:Journal>
+    <z:Attachment rdf:about="#item_12">
+        <z:itemType>attachment</z:itemType>
+        <rdf:resource rdf:resource="files/12/paper.pdf"/>
+        <dc:title>Full Text PDF</dc:title>
+        <link:type>application/pdf</link:type>
+    </z:Attachment>
+    <rdf:Description rdf:about="http://arxiv.org/abs/1">
+        <z:itemType>preprint</z:itemType>
+        <dc:relation rdf:resource="https://doi.org/10/x"/>
+        <dc:title>Paper</dc:title>
+        <dc:date>2023</dc:date>
+        <dc:identifier>
+            <dcterms:URI>
+               <rdf:value>https://arxiv.org/abs/1</rdf:value>
+            </dcterms:URI>
+        </dc:identifier>
+    </rdf:Description>
+    <bib:Data rdf:about="#item_13">
+        <z:itemType>presentation</z:itemType>
+        <z:presenters>
+            <rdf:Seq>
+                <rdf:li>
+                    <foaf:Person>
+                        <foaf:surname>K</foaf:surname>
+                        <foaf:givenName>C</foaf:givenName>
+                    </foaf:Person>
+                </rdf:li>
+            </rdf:Seq>
+        </z:presenters>
+        <dcterms:isReferencedBy rdf:resource="#item_14"/>
+        <z:type>Keynote</z:type>
+        <dc:title>Talk</dc:title>
+        <dc:date>2024</dc:date>
+    </bib:Data>
+    <bib:Memo rdf:about="#item_14">
+        <rdf:value>&lt;p&gt;A note&lt;/p&gt;</rdf:value>
+    </bib:Memo>
+</rdf:RDF>
+"""
+ARTICLE, PREPRINT, TALK = item_key("https://doi.org/10/x"), item_key("http://arxiv.org/abs/1"), item_key("#item_13")
+
+
+@pytest.fixture
+def csl_file(tmp_path: Path) -> Path:
+    path = tmp_path / "export.json"
+    path.write_text(json.dumps(CSL, indent=2))
+    return path
+
+
+@pytest.fixture
+def rdf_file(tmp_path: Path) -> Path:
+    path = tmp_path / "export.rdf"
+    path.write_text(RDF)
+    return path
+
+
+class TestIterJsonArray:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+    def test_elements_split_across_chunks(self, chunk_size: int) -> None:
+        values = [{"a": "x, ]"}, [1, 2], "s", 3.5, None]
+        assert list(iter_json_array(io.StringIO(json.dumps(values)), chunk_size)) == values
+
+    def test_empty_array(self) -> None:
+        assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+    @pytest.mark.parametrize("document", ['{"a": 1}', '[{"a": 1}', '[{"a": ', "[1x]"])
+    def test_malformed(self, document: str) -> None:
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO(document), 4))
+
+
+class TestReadCslJson:
+    def test_maps_onto_item_data(self, csl_file: Path) -> None:
+        article, talk, _ = (item["data"] for item in read_csl_json(csl_file, chunk_size=16))
+        assert (article["key"], article["itemType"], article["date"]) == ("ARTICLE1", "journalArticle", "2024-05")
+        assert article["creators"] == [
+            {"creatorType": "author", "firstName": "Alice", "lastName": "First"},
+            {"creatorType": "author", "name": "Research Lab"},
+        ]
+        assert article["tags"] == [{"tag": "ml"}, {"tag": "systems"}]
+        assert (talk["itemType"], talk["date"], talk["place"]) == ("presentation", "March 2023", "Moscow")
+        assert talk["presentationType"] == "Conference presentation"
+
+    def test_parse_items(self, csl_file: Path) -> None:
+        article, talk = parse_items(read_csl_json(csl_file))
+        assert (article.id, article.year, article.month, article.language) == ("ARTICLE1", 2024, 5, "russian")
+        assert (talk.type, talk.year, talk.school) == ("presentation", 2023, "Moscow")
+
+
+class TestItemKey:
+    @pytest.mark.parametrize(
+        ("uri", "key"),
+        [("http://zotero.org/users/1/items/ARTICLE1", "ARTICLE1"), ("TALK0001", "TALK0001")],
+    )
+    def test_zotero_keys_kept(self, uri: str, key: str) -> None:
+        assert item_key(uri) == key
+
+    @pytest.mark.parametrize("uri", ["#item_13", "https://doi.org/10/x", "urn:isbn:9780262035613"])
+    def test_rdf_resources_get_stable_keys(self, uri: str) -> None:
+        assert item_key(uri) == item_key(uri)
+        assert re.fullmatch(r"[A-Z0-9]{8}", item_key(uri))
+
+    def test_resources_do_not_collide(self) -> None:
+        assert len({item_key(f"#item_{n}") for n in range(10_000)}) == 10_000
+
+
+class TestReadRdf:
+    def test_maps_onto_item_data(self, rdf_file: Path) -> None:
+        article, attachment, preprint, talk = (item["data"] for item in read_rdf(rdf_file))
+        assert (article["key"], article["itemType"], article["date"]) == (ARTICLE, "journalArticle", "2024-05-03")
+        assert article["creators"] == [{"creatorType": "author", "firstName": "Alice", "lastName": "First"}]
+        assert article["tags"] == [{"tag": "ml"}, {"tag": "auto"}]
+        assert extract_related_keys(article) == [PREPRINT]
+        assert extract_related_keys(preprint) == [ARTICLE]
+        assert article["url"] == "https://doi.org/10/x"
+        assert attachment["itemType"] == "attachment"
+        assert talk["creators"][0]["creatorType"] == "presenter"
+        assert talk["presentationType"] == "Keynote"
+
+    def test_related_preprint_is_merged(self, rdf_file: Path) -> None:
+        article, talk = parse_items(read_rdf(rdf_file))
+        assert (article.id, talk.id) == (ARTICLE, TALK)
+        assert [(a.kind, a.url) for a in article.artifacts] == [("arxiv", "https://arxiv.org/abs/1")]
+        assert [str(a) for a in talk.authors] == ["C K"]
+
+
+class TestSourceOption:
+    @pytest.mark.parametrize(("kind", "fixture"), [("csl", "csl_file"), ("rdf", "rdf_file")])
+    def test_fetch_from_export(self, kind: str, fixture: str, tmp_path: Path, request: pytest.FixtureRequest) -> None:
+        output = tmp_path / "publications.json"
+        export = request.getfixturevalue(fixture)
+        result = CliRunner().invoke(fetch.main, ["--source", f"{kind}:{export}", "-o", str(output)])
+        assert result.exit_code == 0, result.output
+        expected = ["ARTICLE1", "TALK0001"] if kind == "csl" else [ARTICLE, TALK]
+        assert [p.id for p in PublicationsData.load(output).publications] == expected
@@ -0,0 +1,176 @@
+"""Unit tests for zotero_sqlite.py against a minimal copy of the Zotero desktop schema."""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+import fetch
+from fetch import parse_items
+from models import PublicationsData
+from zotero_sqlite import read_publications
+
+# The tables and columns read_publications touches, as in zotero.sqlite.
+SCHEMA = """
+CREATE TABLE libraries (libraryID INTEGER PRIMARY KEY, type TEXT NOT NULL);
+CREATE TABLE itemTypes (itemTypeID INTEGER PRIMARY KEY, typeName TEXT);
+CREATE TABLE items (
+    itemID INTEGER PRIMARY KEY, itemTypeID INT, dateAdded TEXT, dateModified TEXT,
+    libraryID INT, key TEXT, version INT
+);
+CREATE TABLE fields (fieldID INTEGER PRIMARY KEY, fieldName TEXT);
+CREATE TABLE itemDataValues (valueID INTEGER PRIMARY KEY, value);
+CREATE TABLE itemData (itemID INT, fieldID INT, valueID INT);
+CREATE TABLE creatorTypes (creatorTypeID INTEGER PRIMARY KEY, creatorType TEXT);
+CREATE TABLE creators (creatorID INTEGER PRIMARY KEY, firstName TEXT, lastName TEXT, fieldMode INT);
+CREATE TABLE itemCreators (itemID INT, creatorID INT, creatorTypeID INT, orderIndex INT);
+CREATE TABLE tags (tagID INTEGER PRIMARY KEY, name TEXT);
+CREATE TABLE itemTags (itemID INT, tagID INT, type INT);
+CREATE TABLE relationPredicates (predicateID INTEGER PRIMARY KEY, predicate TEXT);
+CREATE TABLE itemRelations (itemID INT, predicateID INT, object TEXT);
+CREATE TABLE publicationsItems (itemID INTEGER PRIMARY KEY);
+CREATE TABLE deletedItems (itemID INTEGER PRIMARY KEY);
+CREATE TABLE itemAttachments (
+    itemID INTEGER PRIMARY KEY, parentItemID INT, linkMode INT, contentType TEXT, path TEXT, storageHash TEXT
+);
+CREATE TABLE itemNotes (itemID INTEGER PRIMARY KEY, parentItemID INT, note TEXT);
+
+INSERT INTO libraries VALUES (1, 'user'), (2, 'group');
+INSERT INTO itemTypes VALUES (1, 'journalArticle'), (2, 'preprint'), (3, 'attachment'), (4, 'note');
+INSERT INTO fields VALUES (1, 'title'), (2, 'date'), (3, 'url');
+INSERT INTO creatorTypes VALUES (1, 'author'), (2, 'editor');
+INSERT INTO relationPredicates VALUES (1, 'dc:relation'), (2, 'owl:sameAs');
+"""
+
+
+class ZoteroDatabase:
+    """Builds a zotero.sqlite with a handful of items."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def item(self, key: str, type_id: int, published: bool = True, library: int = 1, **fields: str) -> int:
+        cursor = self.db.execute(
+            "INSERT INTO items (itemTypeID, dateAdded, dateModified, libraryID, key, version)"
+            " VALUES (?, '2024-01-02 03:04:05', '2024-02-03 04:05:06', ?, ?, 7)",
+            (type_id, library, key),
+        )
+        item_id = cursor.lastrowid
+        for name, value in fields.items():
+            (field_id,) = self.db.execute("SELECT fieldID FROM fields WHERE fieldName = ?", (name,)).fetchone()
+            value_id = self.db.execute("INSERT INTO itemDataValues (value) VALUES (?)", (value,)).lastrowid
+            self.db.execute("INSERT INTO itemData VALUES (?, ?, ?)", (item_id, field_id, value_id))
+        if published:
+            self.db.execute("INSERT INTO publicationsItems VALUES (?)", (item_id,))
+        return item_id
+
+    def author(self, item_id: int, order: int, first: str, last: str, field_mode: int = 0) -> None:
+        creator_id = self.db.execute(
+            "INSERT INTO creators (firstName, lastName, fieldMode) VALUES (?, ?, ?)", (first, last, field_mode)
+        ).lastrowid
+        self.db.execute("INSERT INTO itemCreators VALUES (?, ?, 1, ?)", (item_id, creator_id, order))
+
+    def tag(self, item_id: int, name: str) -> None:
+        tag_id = self.db.execute("INSERT INTO tags (name) VALUES (?)", (name,)).lastrowid
+        self.db.execute("INSERT INTO itemTags VALUES (?, ?, 0)", (item_id, tag_id))
+
+    def relate(self, item_id: int, key: str) -> None:
+        self.db.execute(
+            "INSERT INTO itemRelations VALUES (?, 1, ?)", (item_id, f"http://zotero.org/users/1/items/{key}")
+        )
+
+    def close(self) -> Path:
+        self.db.commit()
+        self.db.close()
+        return self.path
+
+
+@pytest.fixture
+def database(tmp_path: Path) -> Path:
+    zdb = ZoteroDatabase(tmp_path / "zotero.sqlite")
+    article = zdb.item("ARTICLE1", 1, title="Paper", date="2024-05-00 May 2024", url="https://example.org")
+    zdb.author(article, 1, "Bob", "Second")
+    zdb.author(article, 0, "Alice", "First")
+    zdb.tag(article, "ml")
+    zdb.relate(article, "PREPRNT1")
+    preprint = zdb.item("PREPRNT1", 2, title="Paper", date="2023-11-02 2023-11-02")
+    zdb.author(preprint, 0, "", "Research Lab", field_mode=1)
+    zdb.relate(preprint, "ARTICLE1")
+    pdf = zdb.item("PDFFILE1", 3, title="Full Text PDF")
+    zdb.db.execute(
+        "INSERT INTO itemAttachments VALUES (?, ?, 0, 'application/pdf', 'storage:paper.pdf', 'abc123')",
+        (pdf, article),
+    )
+    zdb.item("DRAFT001", 1, published=False, title="Draft", date="2024")
+    trashed = zdb.item("TRASHED1", 1, title="Trashed", date="2024")
+    zdb.db.execute("INSERT INTO deletedItems VALUES (?)", (trashed,))
+    zdb.item("GROUP001", 1, library=2, title="Group item", date="2024")
+    return zdb.close()
+
+
+class TestReadPublications:
+    def test_reads_published_items_only(self, database: Path) -> None:
+        assert [item["key"] for item in read_publications(database)] == ["ARTICLE1", "PREPRNT1", "PDFFILE1"]
+
+    def test_item_shape_matches_api(self, database: Path) -> None:
+        article = next(read_publications(database))
+        data = article["data"]
+        assert (article["version"], data["key"], data["itemType"]) == (7, "ARTICLE1", "journalArticle")
+        assert data["date"] == "May 2024"
+        assert data["url"] == "https://example.org"
+        assert data["creators"] == [
+            {"creatorType": "author", "firstName": "Alice", "lastName": "First"},
+            {"creatorType": "author", "firstName": "Bob", "lastName": "Second"},
+        ]
+        assert data["tags"] == [{"tag": "ml"}]
+        assert data["relations"] == {"dc:relation": ["http://zotero.org/users/1/items/PREPRNT1"]}
+        assert data["dateModified"] == "2024-02-03T04:05:06Z"
+
+    def test_single_field_creator_and_attachment(self, database: Path) -> None:
+        items = {item["key"]: item["data"] for item in read_publications(database)}
+        assert items["PREPRNT1"]["creators"] == [{"creatorType": "author", "name": "Research Lab"}]
+        pdf = items["PDFFILE1"]
+        assert (pdf["parentItem"], pdf["linkMode"], pdf["md5"]) == ("ARTICLE1", "imported_file", "abc123")
+
+    def test_parses_and_merges_like_api_items(self, database: Path) -> None:
+        parser = fetch.ItemParser()
+        [publication] = parse_items(read_publications(database), parser)
+        assert publication.id == "ARTICLE1"
+        assert publication.year == 2024
+        assert parser.attachments["ARTICLE1"]["md5"] == "abc123"
+
+    def test_database_is_not_modified(self, database: Path) -> None:
+        before = database.read_bytes()
+        list(read_publications(database))
+        assert database.read_bytes() == before
+
+    def test_missing_database(self, tmp_path: Path) -> None:
+        with pytest.raises(FileNotFoundError):
+            list(read_publications(tmp_path / "zotero.sqlite"))
+
+
+class TestSourceOption:
+    def test_fetch_from_sqlite(self, database: Path, tmp_path: Path) -> None:
+        output = tmp_path / "publications.json"
+        result = CliRunner().invoke(fetch.main, ["--source", f"sqlite:{database}", "-o", str(output)])
+        assert result.exit_code == 0, result.output
+        assert [p.id for p in PublicationsData.load(output).publications] == ["ARTICLE1"]
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            ["--source", "ftp:x"],
+            ["--source", "sqlite:x", "--stream"],
+            ["--source", "csl:"],
+            ["--source", "rdf:x", "--library", "group:2"],
+            ["--source", "sqlite:x", "--resume"],
+            ["--source", "csl:x", "--curated-tags"],
+            ["--source", "sqlite:x", "--incremental"],
+        ],
+    )
+    def test_rejects_bad_combinations(self, args: list[str]) -> None:
+        result = CliRunner().invoke(fetch.main, args)
+        assert result.exit_code == 2, result.output
@@ -0,0 +1,252 @@
+"""Tests for zotero_standin.py: the API emulation, and fetch end to end against it."""
+
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from bench import bench_fetch
+from fetch import (
+    FetchJournal,
+    ItemCache,
+    Library,
+    ZoteroFetcherConfig,
+    fetch_from_zotero,
+    fetch_incremental,
+    parse_items,
+)
+from zotero_standin import StandInLibrary, server_url, synthetic_items
+
+URL = "http://127.0.0.1/users/1"
+
+
+@pytest.fixture
+def served():
+    """A 250-item stand-in on a real localhost port, with a fetch config pointing at it."""
+    library = StandInLibrary(synthetic_items(250))
+    server = library.serve()
+    yield library, ZoteroFetcherConfig(api_key="k", library_id=1, endpoint=server_url(server))
+    server.shutdown()
+
+
+def listed_keys(*libraries: StandInLibrary) -> list[str]:
+    """Keys fetch asks for by default: everything but attachments and notes."""
+    skipped = {"attachment", "note"}
+    return sorted(k for lib in libraries for k, i in lib.items.items() if i["data"]["itemType"] not in skipped)
+
+
+class TestSyntheticItems:
+    def test_reproducible(self) -> None:
+        assert synthetic_items(50, seed=3) == synthetic_items(50, seed=3)
+        assert synthetic_items(50, seed=3) != synthetic_items(50, seed=4)
+
+    def test_parse_like_real_items(self) -> None:
+        publications = parse_items(synthetic_items(200))
+        assert 0 < len(publications) < 200  # notes/attachments skipped, relations merged
+
+
+class TestStandInLibrary:
+    def get(self, library: StandInLibrary, path: str, **headers: str) -> httpx.Response:
+        with httpx.Client(transport=library.transport()) as client:
+            return client.get(URL + path, headers=headers)
+
+    def test_pages_with_next_link_and_total(self) -> None:
+        library = StandInLibrary(synthetic_items(150))
+        first = self.get(library, "/publications/items")
+        assert len(first.json()) == 100
+        assert first.headers["Total-Results"] == "150"
+        second = self.get(library, first.links["next"]["url"].removeprefix(URL))
+        assert len(second.json()) == 50
+        assert "next" not in second.links
+
+    def test_since_versions_and_deleted(self) -> None:
+        library = StandInLibrary(synthetic_items(10))
+        key, gone = list(library.items)[:2]
+        library.touch(key, title="Edited")
+        library.delete(gone)
+        assert self.get(library, "/publications/items?format=versions&since=10").json() == {key: 11}
+        assert self.get(library, "/deleted?since=10").json()["items"] == [gone]
+        assert self.get(library, f"/items/{key}").json()["data"]["title"] == "Edited"
+
+    def test_not_modified_since_version(self) -> None:
+        library = StandInLibrary(synthetic_items(10))
+        assert self.get(library, "/items", **{"If-Modified-Since-Version": "10"}).status_code == 304
+        library.touch("NEWITEM1")
+        assert self.get(library, "/items", **{"If-Modified-Since-Version": "10"}).status_code == 200
+
+    def test_rate_limit_answers_429(self) -> None:
+        clock = iter([0.0] + [0.0] * 3 + [1.0]).__next__
+        library = StandInLibrary(synthetic_items(1), rate_limit=2, clock=clock)
+        statuses = [self.get(library, "/items").status_code for _ in range(4)]
+        assert statuses == [200, 200, 429, 200]
+        assert library.rate_limited == 1
+
+    def test_incomplete_listing_strips_data(self) -> None:
+        library = StandInLibrary(synthetic_items(5), complete=False)
+        assert all(set(item["data"]) == {"key"} for item in self.get(library, "/publications/items").json())
+
+
+class TestEndToEnd:
+    def test_threads_engine_over_http(self, served) -> None:
+        library, config = served
+        items = fetch_from_zotero(config)
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        assert len(library.requests) == 3  # complete listing: pages only
+
+    def test_threads_engine_lists_pages_in_parallel(self, served) -> None:
+        library, config = served
+        in_flight, peak, lock = [0], [0], threading.Lock()
+        handle = library.handle
+
+        def slow_handle(url: httpx.URL, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.05)
+            try:
+                return handle(url, headers)
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+
+        library.handle = slow_handle
+        items = fetch_from_zotero(config)
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        assert peak[0] == 2  # both pages after the first together
+
+    def test_async_engine_matches_threads(self, served) -> None:
+        library, config = served
+        library.complete = False
+        threads = fetch_from_zotero(config)
+        asynced = fetch_from_zotero(ZoteroFetcherConfig(**{**config.__dict__, "engine": "async"}))
+        assert sorted(json.dumps(i, sort_keys=True) for i in threads) == sorted(
+            json.dumps(i, sort_keys=True) for i in asynced
+        )
+
+    @pytest.mark.parametrize("engine", ["threads", "async"])
+    def test_several_libraries_in_one_run(self, served, engine: str) -> None:
+        library, config = served
+        groups = [StandInLibrary(synthetic_items(120, seed=g), library_id=g, library_type="group") for g in (5, 6)]
+        for group in groups:
+            group.complete = False
+            library.mount(group)
+        libraries = tuple(Library("group", g) for g in (5, 6))
+        items = fetch_from_zotero(
+            ZoteroFetcherConfig(**{**config.__dict__, "engine": engine, "extra_libraries": libraries})
+        )
+        assert sorted(i["key"] for i in items) == listed_keys(library, *groups)
+        # Groups have no My Publications: 2 pages of /items, then 120 keys in batches of 50.
+        assert groups[0].requests.count("/groups/5/items") == 2 + -(-len(listed_keys(groups[0])) // 50)
+
+    def test_async_resume_skips_journaled_items(self, served, tmp_path) -> None:
+        library, config = served
+        library.complete = False
+        journal = tmp_path / "journal.ndjson"
+        listed = set(listed_keys(library))
+        FetchJournal(journal).record([i for i in library.items.values() if i["key"] in listed][:200])
+        config = ZoteroFetcherConfig(**{**config.__dict__, "engine": "async", "journal": journal, "resume": True})
+        items = fetch_from_zotero(config)
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        assert library.requests.count("/users/1/items") == 1  # only the unjournaled tail of the listing
+        assert not journal.exists()
+
+    @pytest.mark.parametrize("engine", ["threads", "async"])
+    def test_resume_after_failing_mid_listing(self, served, tmp_path, engine: str) -> None:
+        library, config = served  # complete listing: no detail requests on a clean run
+        journal = tmp_path / "journal.ndjson"
+        config = ZoteroFetcherConfig(**{**config.__dict__, "engine": engine, "journal": journal})
+        handle = library.handle
+
+        def fail_last_page(url: httpx.URL, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+            if url.params.get("start") == "200":
+                time.sleep(0.2)  # let the other pages land first
+                return 500, {}, b"Internal error"
+            return handle(url, headers)
+
+        library.handle = fail_last_page
+        with pytest.raises(Exception, match="500|Internal error"):
+            fetch_from_zotero(config)
+        journaled = {json.loads(line)["key"] for line in journal.read_text().splitlines()}
+        assert len(journaled) == 200
+
+        library.handle = handle
+        library.requests.clear()
+        items = fetch_from_zotero(ZoteroFetcherConfig(**{**config.__dict__, "resume": True}))
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        # One versions request, then the unjournaled keys in itemKey batches.
+        assert library.requests == ["/users/1/publications/items", "/users/1/items"]
+        assert not journal.exists()
+
+    @pytest.mark.parametrize("engine", ["threads", "async"])
+    def test_listing_without_total_follows_next_links(self, served, engine: str) -> None:
+        library, config = served
+        handle = library.handle
+
+        def drop_total(url: httpx.URL, headers: dict[str, str]) -> tuple[int, dict[str, str], bytes]:
+            status, reply_headers, body = handle(url, headers)
+            reply_headers.pop("Total-Results", None)
+            return status, reply_headers, body
+
+        library.handle = drop_total
+        items = fetch_from_zotero(ZoteroFetcherConfig(**{**config.__dict__, "engine": engine}))
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        assert library.requests.count("/users/1/publications/items") == 3
+
+    def test_incremental_sync_picks_up_changes(self, served, tmp_path) -> None:
+        library, config = served
+        cache = tmp_path / "items.json"
+        fetch_incremental(config, cache)
+        key, gone = list(library.items)[:2]
+        library.touch(key, title="Edited")
+        library.delete(gone)
+        items = {i["key"]: i for i in fetch_incremental(config, cache)}
+        assert items[key]["data"]["title"] == "Edited"
+        assert gone not in items
+        assert ItemCache.load(cache).version == library.version
+
+    def test_incremental_sync_of_a_group_library(self, tmp_path) -> None:
+        library = StandInLibrary(synthetic_items(50), library_type="group")
+        server = library.serve()
+        config = ZoteroFetcherConfig(api_key="k", library_id=1, library_type="group", endpoint=server_url(server))
+        cache = tmp_path / "items.json"
+        try:
+            fetch_incremental(config, cache)
+            key, gone = listed_keys(library)[:2]
+            library.touch(key, title="Edited")
+            library.trash(gone)
+            items = {i["key"]: i for i in fetch_incremental(config, cache)}
+        finally:
+            server.shutdown()
+        assert items[key]["data"]["title"] == "Edited"
+        assert set(items) == set(listed_keys(library)) - {gone}  # trashed, not yet in /deleted
+        assert "/groups/1/publications/items" not in library.requests
+
+    def test_rate_limited_fetch_with_more_workers_than_breaker(self) -> None:
+        library = StandInLibrary(synthetic_items(1000), rate_limit=4, complete=False)
+        server = library.serve()
+        try:
+            config = ZoteroFetcherConfig(api_key="k", library_id=1, endpoint=server_url(server), workers=16)
+            items = fetch_from_zotero(config)
+        finally:
+            server.shutdown()
+        assert sorted(i["key"] for i in items) == listed_keys(library)
+        assert library.rate_limited <= 2 * config.workers  # a wave or two, not one per pause
+
+    def test_bench_counts_requests(self, served) -> None:
+        library, config = served
+        run = bench_fetch(library, config)
+        assert (run.items, run.requests, run.rate_limited) == (len(listed_keys(library)), 3, 0)
+
+    def test_filters_are_applied_by_the_server(self, served) -> None:
+        library, config = served
+        config = ZoteroFetcherConfig(**{**config.__dict__, "item_type": "-note", "tags": ("ai", "Casimir")})
+        items = fetch_from_zotero(config)
+        types = {i["data"]["itemType"] for i in items}
+        assert "attachment" in types and "note" not in types
+        assert all({t["tag"].casefold() for t in i["data"]["tags"]} & {"ai", "casimir"} for i in items)
+        assert len(items) == sum(
+            i["data"]["itemType"] != "note" and bool({t["tag"] for t in i["data"]["tags"]} & {"ai", "casimir"})
+            for i in library.items.values()
+        )
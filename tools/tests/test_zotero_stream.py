@@ -0,0 +1,141 @@
+"""Tests for zotero_stream.py against a local WebSocket stand-in of the streaming API."""
+
+import asyncio
+import json
+import socket
+from collections.abc import Callable
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from websockets.asyncio.server import ServerConnection, serve  # noqa: E402
+
+from zotero_stream import StreamListener  # noqa: E402
+
+TOPIC = "/users/1"
+
+
+class StreamStandIn:
+    """Speaks the Zotero streaming protocol: greet, accept subscriptions, push topic updates."""
+
+    def __init__(self, refuse: int = 0, retry_ms: int = 50) -> None:
+        self.refuse = refuse  # close this many connections before greeting
+        self.retry_ms = retry_ms
+        self.connections = 0
+        self.subscribers: set[ServerConnection] = set()
+
+    async def handler(self, ws: ServerConnection) -> None:
+        self.connections += 1
+        if self.refuse:
+            self.refuse -= 1
+            await ws.close()
+            return
+        await ws.send(json.dumps({"event": "connected", "retry": self.retry_ms}))
+        request = json.loads(await ws.recv())
+        topics = request["subscriptions"][0]["topics"]
+        await ws.send(
+            json.dumps({"event": "subscriptionsCreated", "subscriptions": [{"topics": topics}], "errors": []})
+        )
+        self.subscribers.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.subscribers.discard(ws)
+
+    async def publish(self, version: int, topic: str = TOPIC) -> None:
+        for ws in list(self.subscribers):
+            await ws.send(json.dumps({"event": "topicUpdated", "topic": topic, "version": version}))
+
+    async def drop(self) -> None:
+        for ws in list(self.subscribers):
+            await ws.close()
+
+
+async def until(condition: Callable[[], bool], timeout: float = 3.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def listener(url: str, **kwargs: float) -> StreamListener:
+    return StreamListener("key", TOPIC, lambda: None, url=url, **kwargs)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def with_stand_in(stand_in: StreamStandIn, scenario: Callable[[str], object]) -> None:
+    async with serve(stand_in.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        await scenario(f"ws://127.0.0.1:{port}")
+
+
+class TestStreamListener:
+    def test_burst_of_updates_fires_once(self) -> None:
+        stand_in = StreamStandIn()
+
+        async def scenario(url: str) -> None:
+            stream = listener(url, debounce=0.1)
+            task = asyncio.create_task(stream.run())
+            await until(lambda: stream.updates == 1)  # catch-up on subscribe
+            for version in range(10, 15):
+                await stand_in.publish(version)
+            await stand_in.publish(99, topic="/groups/7")  # not ours
+            await until(lambda: stream.updates == 2)
+            await asyncio.sleep(0.3)
+            assert stream.updates == 2
+            stream.stop.set()
+            await task
+
+        asyncio.run(with_stand_in(stand_in, scenario))
+
+    def test_reconnects_after_drop_and_refusal(self) -> None:
+        stand_in = StreamStandIn()
+
+        async def scenario(url: str) -> None:
+            stream = listener(url, debounce=0.05)
+            task = asyncio.create_task(stream.run())
+            await until(lambda: stream.updates == 1)
+            stand_in.refuse = 2
+            await stand_in.drop()
+            await until(lambda: stream.updates == 2)  # resubscribed and caught up
+            assert stand_in.connections == 4
+            assert stream.failures == 0
+            stream.stop.set()
+            await task
+
+        asyncio.run(with_stand_in(stand_in, scenario))
+
+    def test_polls_while_stream_unreachable(self) -> None:
+        async def scenario() -> None:
+            stream = listener(f"ws://127.0.0.1:{free_port()}", poll_interval=0.05)
+            stream.retry = 0.5
+            task = asyncio.create_task(stream.run())
+            await until(lambda: stream.updates >= 3)
+            assert stream.failures >= 1
+            stream.stop.set()
+            await task
+
+        asyncio.run(scenario())
+
+    def test_update_errors_are_not_fatal(self) -> None:
+        stand_in = StreamStandIn()
+
+        def broken() -> None:
+            raise RuntimeError("API down")
+
+        async def scenario(url: str) -> None:
+            stream = StreamListener("key", TOPIC, broken, url=url, debounce=0.01)
+            task = asyncio.create_task(stream.run())
+            await until(lambda: stream.updates == 1)
+            await stand_in.publish(2)
+            await until(lambda: stream.updates == 2)
+            assert not task.done()
+            stream.stop.set()
+            await task
+
+        asyncio.run(with_stand_in(stand_in, scenario))
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Validate publications.json against Pydantic schema."""
 
+import hashlib
 import logging
 import sys
 from pathlib import Path
@@ -14,6 +15,7 @@ from models import (
     Publication,
     PublicationsData,
     get_archive_config_path,
+    get_derived_path,
     get_static_data_dir,
 )
 
@@ -74,7 +76,7 @@ def check_group_overlap(pub: Publication, config: ArchiveConfig) -> list[str]:
     means classification silently depends on the order of groups.
     """
     pub_tags = set(config.normalize_list(pub.tags))
-    matched = [g.name for g in config.groups if pub_tags & {config.normalize(t) for t in g.tags}]
+    matched = [g.name for g, tags in zip(config.groups, config.group_tags, strict=True) if pub_tags & tags]
     if len(matched) > 1:
         return [f"{describe(pub)}: matches multiple groups {matched}"]
     return []
@@ -122,6 +124,19 @@ def validate_config(path: Path) -> ArchiveConfig | None:
         return None
 
 
+def checksum_path(path: Path) -> Path:
+    """Where the checksum of the inputs that last passed is kept (under .cache/, never published)."""
+    return get_derived_path(path, ".sha256")
+
+
+def checksum(*paths: Path) -> str:
+    """SHA-256 over the contents of `paths`, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
 def print_stats(data: PublicationsData) -> None:
     """Print publication statistics."""
     pubs = data.publications
@@ -141,11 +156,19 @@ def print_stats(data: PublicationsData) -> None:
 @click.command()
 @click.option("-p", "--publications", type=click.Path(), help="Path to publications.json")
 @click.option("-c", "--config", type=click.Path(), help="Path to archive.yaml")
-def main(publications: str | None, config: str | None) -> None:
+@click.option("--if-changed", is_flag=True, help="Skip files that already passed (checksum kept in .cache/)")
+def main(publications: str | None, config: str | None, if_changed: bool) -> None:
     """Validate data files and show statistics."""
     pub_path = Path(publications) if publications else get_static_data_dir() / "publications.json"
     config_path = Path(config) if config else get_archive_config_path()
 
+    # publications.json is rewritten on every fetch, so mtimes alone would revalidate unchanged data.
+    checksum_file = checksum_path(pub_path)
+    digest = checksum(pub_path, config_path) if pub_path.exists() and config_path.exists() else None
+    if if_changed and digest and checksum_file.exists() and checksum_file.read_text().strip() == digest:
+        log.info(f"{pub_path.name} and {config_path.name} unchanged since they last passed")
+        return
+
     data = validate_publications(pub_path)
     cfg = validate_config(config_path)
 
@@ -163,6 +186,9 @@ def main(publications: str | None, config: str | None) -> None:
         sys.exit(1)
 
     print_stats(data)
+    if digest:
+        checksum_file.parent.mkdir(parents=True, exist_ok=True)
+        checksum_file.write_text(digest + "\n")
     log.info("All validations passed")
 
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Keep the local site in sync with Zotero: poll the library version, rebuild what changed.
+
+Run next to `make serve`; Hugo picks up the rewritten content files.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+import click
+import httpx
+from pyzotero import zotero_errors
+
+from fetch import (
+    FetchError,
+    ItemCache,
+    ItemParser,
+    ZoteroFetcherConfig,
+    client_factory,
+    download_pdfs,
+    make_limiter,
+    parse_items,
+    sync_cache,
+)
+from generate import generate_all, prune_content
+from models import (
+    ArchiveConfig,
+    Publication,
+    PublicationsData,
+    get_archive_config_path,
+    get_cache_dir,
+    get_content_dir,
+    get_pdf_dir,
+    get_static_data_dir,
+)
+from pdf_store import PdfStore
+from zotero_api import RateLimitError
+from zotero_stream import STREAM_URL, StreamListener
+
+log = logging.getLogger(__name__)
+
+# Failures that only mean "try again later": network and API errors, a spent
+# retry budget or open circuit, or a garbled payload (expect_json).
+TRANSIENT_ERRORS = (httpx.HTTPError, zotero_errors.PyZoteroError, RateLimitError, FetchError)
+
+
+@dataclass
+class Watcher:
+    """Long-lived sync state: one set of API clients, the raw items and the parsed publications.
+
+    Each `poll` costs one conditional request while the library is unchanged.
+    On a change only the changed items are downloaded; content is regenerated
+    from memory, only files whose text differs are rewritten, and pages the
+    rebuild no longer produces (a course without lectures) are removed.
+
+    With a `pdf_store`, attachments are synced too and every rebuild links
+    their PDFs as `fetch --pdfs` does: stored files cost no request, new
+    ones are downloaded first.
+    """
+
+    config: ZoteroFetcherConfig
+    archive: ArchiveConfig
+    cache_path: Path
+    publications_path: Path
+    content_dir: Path
+    pdf_store: PdfStore | None = None
+    publications: list[Publication] | None = None
+    cache: ItemCache = field(init=False)
+
+    def __post_init__(self) -> None:
+        if self.pdf_store:
+            self.config = replace(self.config, item_type="-note")
+        self.limiter = make_limiter(self.config)
+        self.zt_factory = client_factory(self.config, self.limiter)
+        self.cache = ItemCache.load(self.cache_path)
+
+    def poll(self) -> bool:
+        """Sync once; return whether the site was rebuilt."""
+        # Each poll is a run of its own: a bad hour must not spend the budget for good.
+        self.limiter.refill(self.config.retry_budget)
+        changed = sync_cache(self.cache, self.zt_factory, self.config)
+        if changed:
+            self.cache.save(self.cache_path)
+        elif self.publications is not None:
+            return False
+
+        parser = ItemParser()
+        publications = parse_items(self.cache.items.values(), parser)
+        if self.pdf_store:
+            asyncio.run(download_pdfs(self.config, publications, parser.attachments, self.pdf_store))
+        if publications == self.publications:
+            log.info("No publication changed")
+            return False
+        self.publications = publications
+        PublicationsData(publications=publications).save(self.publications_path, snapshot=True)
+        prune_content(self.content_dir, generate_all(publications, self.archive, self.content_dir))
+        return True
+
+    def run(self, interval: float, max_interval: float, stop: threading.Event | None = None) -> None:
+        """Poll every `interval` seconds until `stop` is set, backing off on failures."""
+        stop = stop or threading.Event()
+        delay = interval
+        while not stop.is_set():
+            started = time.monotonic()
+            try:
+                if self.poll():
+                    log.info(f"Site rebuilt in {time.monotonic() - started:.1f}s")
+                delay = interval
+            except TRANSIENT_ERRORS as e:
+                delay = min(max_interval, delay * 2)
+                log.warning(f"Sync failed ({e}), retrying in {delay:.0f}s")
+            stop.wait(delay)
+
+
+@click.command()
+@click.option("--interval", type=click.FloatRange(min=1), default=30, help="Seconds between version checks")
+@click.option("--max-interval", type=click.FloatRange(min=1), default=600, help="Backoff ceiling after failures")
+@click.option("--cache", type=click.Path(), help="Raw item cache (shared with fetch --incremental)")
+@click.option("--workers", type=click.IntRange(min=1), default=8, help="Parallel requests in flight")
+@click.option("--stream", is_flag=True, help="React to Zotero push updates (needs websockets); poll only while down")
+def main(interval: float, max_interval: float, cache: str | None, workers: int, stream: bool) -> None:
+    """Watch the Zotero library and regenerate site content on every change."""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    watcher = Watcher(
+        config=replace(ZoteroFetcherConfig.from_env(), workers=workers, http_cache=get_cache_dir() / "http"),
+        archive=ArchiveConfig.load(get_archive_config_path()),
+        cache_path=Path(cache) if cache else get_cache_dir() / "zotero-items.json",
+        publications_path=get_static_data_dir() / "publications.json",
+        content_dir=get_content_dir(),
+        pdf_store=PdfStore(get_pdf_dir()),
+    )
+    config = watcher.config
+    with contextlib.suppress(KeyboardInterrupt):
+        if stream:
+            listener = StreamListener(
+                config.api_key,
+                f"/{config.library_type}s/{config.library_id}",
+                watcher.poll,
+                url=os.environ.get("ZOTERO_STREAM_URL", STREAM_URL),
+                poll_interval=interval,
+                max_retry=max_interval,
+            )
+            asyncio.run(listener.run())
+        else:
+            log.info(f"Watching Zotero library {config.library_id} every {interval:.0f}s (Ctrl-C to stop)")
+            watcher.run(interval, max_interval)
+
+
+if __name__ == "__main__":
+    main()
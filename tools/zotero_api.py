@@ -0,0 +1,554 @@
+"""Zotero Web API plumbing: a shared rate limiter and an async client over one connection pool."""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import TracebackType
+from typing import Any
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+API_URL = "https://api.zotero.org"
+API_VERSION = "3"
+# Zotero's maximum page size for item listings.
+PAGE_SIZE = 100
+TIMEOUT = 30.0
+RETRY_STATUSES = {429, 503}
+
+
+def api_headers(api_key: str | None) -> dict[str, str]:
+    """Headers every Zotero API request carries."""
+    headers = {"Zotero-API-Version": API_VERSION}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+def backoff_seconds(headers: httpx.Headers) -> float | None:
+    """Seconds the server asks us to wait: `Retry-After` on 429/503, `Backoff` on any response."""
+    value = headers.get("retry-after") or headers.get("backoff")
+    return float(value) if value else None
+
+
+class RateLimitError(RuntimeError):
+    """The shared retry budget is spent or the circuit breaker is open."""
+
+
+class RateLimiter:
+    """One throttle for every worker in the process, threads and coroutines alike.
+
+    A token bucket paces requests at `rate` per second with bursts of `burst`.
+    The rate is AIMD-adjusted: each success adds `increase / rate`, so it grows
+    by about `increase` per second, and a 429/503 halves it. A
+    `Backoff`/`Retry-After` header pauses all callers until it expires.
+
+    Parallel workers see a rate limit as a wave of 429s. A wave, the 429s
+    within one second of the first, halves the rate once and counts as one
+    failure and one retry. After a 429 or `Backoff` the burst drops to 1, so
+    the pause is not followed by another wave; every second of successes gives
+    one slot of it back.
+
+    Retries of failed requests draw from one `retry_budget` for the whole run;
+    `breaker` consecutive failures with no success in between open the circuit
+    and every later request fails fast with RateLimitError.
+    """
+
+    def __init__(
+        self,
+        rate: float = 8.0,
+        burst: int = 8,
+        *,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        increase: float = 0.5,
+        retry_budget: int = 30,
+        breaker: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.retry_budget = retry_budget
+        self.breaker = breaker
+        self.clock = clock
+        self.failures = 0
+        self.paused_until = 0.0
+        self._burst = burst  # current burst, down to 1 while throttled
+        self._arrival = 0.0  # GCRA theoretical arrival time of the next request
+        self._decreased_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def refill(self, retry_budget: int) -> None:
+        """Start a new run on a long-lived limiter: fresh retry budget, circuit closed."""
+        with self._lock:
+            self.retry_budget = retry_budget
+            self.failures = 0
+
+    def reserve(self) -> float:
+        """Claim the next send slot; return how long the caller must wait for it."""
+        with self._lock:
+            if self.failures >= self.breaker:
+                raise RateLimitError(f"Circuit open after {self.failures} consecutive failures")
+            now = self.clock()
+            interval = 1 / self.rate
+            arrival = max(self._arrival, now)
+            send_at = max(now, arrival - (self._burst - 1) * interval, self.paused_until)
+            self._arrival = max(arrival, send_at) + interval
+            return send_at - now
+
+    def observe(self, response: httpx.Response | None) -> bool:
+        """Record a response (None: connection error); return True if it should be retried.
+
+        Raises RateLimitError when a retry is due but the budget is spent.
+        """
+        with self._lock:
+            now = self.clock()
+            if response is not None:
+                delay = backoff_seconds(response.headers)
+                if delay:
+                    self.paused_until = max(self.paused_until, now + delay)
+                    self._burst = 1
+                if response.status_code not in RETRY_STATUSES:
+                    self.failures = 0
+                    self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+                    if not delay:
+                        self._burst = min(self.burst, self._burst + 1 / self.rate)
+                    return False
+                self._burst = 1
+                if now - self._decreased_at < 1:
+                    return True  # rest of a wave that has already been counted
+                self.rate = max(self.min_rate, self.rate / 2)
+                self._decreased_at = now
+                log.debug(f"Throttled: rate now {self.rate:.2f} req/s")
+            self.failures += 1
+            if self.retry_budget <= 0:
+                raise RateLimitError("Retry budget spent")
+            self.retry_budget -= 1
+            return True
+
+
+# Upper bounds (ms) of the latency histogram buckets.
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def route(request: httpx.Request) -> str:
+    """Endpoint label for metrics: library prefix dropped, item keys generalized.
+
+    A detail batch (`/items?itemKey=`) is its own route, apart from listings.
+    """
+    path = re.sub(r"^/(users|groups)/\d+", "", request.url.path)
+    path = re.sub(r"/items/[A-Z0-9]{8}", "/items/{key}", path)
+    return path + "?itemKey" if "itemKey" in request.url.params else path
+
+
+class FetchMetrics:
+    """Per-request counters for one fetch, fed by the throttled transports.
+
+    Latency runs from send to response headers; bytes are counted as the body
+    is consumed, so streamed downloads are measured without buffering. Time a
+    request spent waiting on the RateLimiter (pacing, server backoff) is kept
+    apart, which is what separates a rate-limited run from a slow server.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.started = clock()
+        self.latencies: dict[str, list[float]] = {}
+        self.bytes: dict[str, int] = {}
+        self.statuses: dict[int, int] = {}
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0.0
+        self._lock = threading.Lock()
+
+    def attempt(
+        self,
+        request: httpx.Request,
+        response: httpx.Response | None,
+        waited: float,
+        seconds: float,
+        retried: bool,
+    ) -> None:
+        """Record one send: `waited` on the limiter, then `seconds` to headers; None = transport error."""
+        label = route(request)
+        with self._lock:
+            self.throttled += waited
+            self.latencies.setdefault(label, []).append(seconds)
+            self.retries += retried
+            if response is None:
+                self.errors += 1
+                return
+            self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+        if response.is_stream_consumed:  # body already in memory (e.g. a replayed or mocked response)
+            self.received(label, len(response.content))
+        else:
+            response.stream = CountedStream(response.stream, self, label)
+
+    def received(self, label: str, size: int) -> None:
+        with self._lock:
+            self.bytes[label] = self.bytes.get(label, 0) + size
+
+    def report(self, items: int) -> dict[str, Any]:
+        """The run so far as a JSON-ready dict."""
+        with self._lock:
+            elapsed = self.clock() - self.started
+            routes = {
+                label: {"requests": len(times), "bytes": self.bytes.get(label, 0), "latency_ms": histogram(times)}
+                for label, times in sorted(self.latencies.items())
+            }
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "items": items,
+                "items_per_s": round(items / elapsed, 1) if elapsed else None,
+                "requests": sum(len(times) for times in self.latencies.values()),
+                "bytes": sum(self.bytes.values()),
+                "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+                "rate_limited": self.statuses.get(429, 0),
+                "retries": self.retries,
+                "transport_errors": self.errors,
+                "throttle_wait_s": round(self.throttled, 3),
+                "routes": routes,
+            }
+
+
+def histogram(seconds: list[float]) -> dict[str, Any]:
+    """Percentiles and bucket counts of a latency sample, in milliseconds."""
+    ms = sorted(s * 1000 for s in seconds)
+    buckets = {f"<={bound}": sum(x <= bound for x in ms) for bound in LATENCY_BUCKETS_MS}
+    buckets[f">{LATENCY_BUCKETS_MS[-1]}"] = sum(x > LATENCY_BUCKETS_MS[-1] for x in ms)
+    return {
+        "p50": round(ms[len(ms) // 2], 1),
+        "p95": round(ms[min(len(ms) - 1, len(ms) * 95 // 100)], 1),
+        "max": round(ms[-1], 1),
+        # Cumulative, Prometheus-style: each bucket counts everything at or under its bound.
+        "histogram": buckets,
+    }
+
+
+class CountedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """A response body passed through unchanged, its size added to FetchMetrics."""
+
+    def __init__(self, inner: Any, metrics: FetchMetrics, label: str) -> None:
+        self.inner = inner
+        self.metrics = metrics
+        self.label = label
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.inner:
+            self.metrics.received(self.label, len(chunk))
+            yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.inner:
+            self.metrics.received(self.label, len(chunk))
+            yield chunk
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ThrottledTransport(httpx.BaseTransport):
+    """Sync transport sending every request through a shared RateLimiter, retrying 429/503."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        inner: httpx.BaseTransport | None = None,
+        metrics: FetchMetrics | None = None,
+    ) -> None:
+        self.limiter = limiter
+        self.inner = inner or httpx.HTTPTransport()
+        self.metrics = metrics
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        while True:
+            delay = self.limiter.reserve()
+            time.sleep(delay)
+            started = time.perf_counter()
+            try:
+                response = self.inner.handle_request(request)
+            except httpx.TransportError:
+                retry = self.limiter.observe(None)
+                if self.metrics:
+                    self.metrics.attempt(request, None, delay, time.perf_counter() - started, retry)
+                if retry:
+                    continue
+                raise
+            retry = self.limiter.observe(response)
+            if self.metrics:
+                self.metrics.attempt(request, response, delay, time.perf_counter() - started, retry)
+            if not retry:
+                return response
+            response.close()
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncThrottledTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ThrottledTransport; the limiter may be shared with sync clients."""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        inner: httpx.AsyncBaseTransport | None = None,
+        metrics: FetchMetrics | None = None,
+    ) -> None:
+        self.limiter = limiter
+        self.inner = inner or httpx.AsyncHTTPTransport()
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        while True:
+            delay = self.limiter.reserve()
+            await asyncio.sleep(delay)
+            started = time.perf_counter()
+            try:
+                response = await self.inner.handle_async_request(request)
+            except httpx.TransportError:
+                retry = self.limiter.observe(None)
+                if self.metrics:
+                    self.metrics.attempt(request, None, delay, time.perf_counter() - started, retry)
+                if retry:
+                    continue
+                raise
+            retry = self.limiter.observe(response)
+            if self.metrics:
+                self.metrics.attempt(request, response, delay, time.perf_counter() - started, retry)
+            if not retry:
+                return response
+            await response.aclose()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ResponseCache:
+    """On-disk cache of Zotero GET responses, revalidated by library version.
+
+    Each entry keeps the body and `Last-Modified-Version` of one URL. Replays
+    send `If-Modified-Since-Version`; Zotero answers 304 without a body when
+    nothing relevant changed, and the stored response is served instead.
+    """
+
+    # Response headers callers rely on: decoding, paging, totals, versions.
+    KEPT_HEADERS = ("content-type", "link", "total-results", "last-modified-version")
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def prepare(self, request: httpx.Request) -> dict[str, Any] | None:
+        """Return the cached entry for a GET, making the request conditional on its version."""
+        path = self._path(str(request.url))
+        if request.method != "GET" or not path.exists():
+            return None
+        with path.open() as f:
+            entry = json.load(f)
+        request.headers["If-Modified-Since-Version"] = str(entry["version"])
+        return entry
+
+    def replay(self, entry: dict[str, Any]) -> httpx.Response:
+        """The cached response, standing in for a 304."""
+        return httpx.Response(200, headers=entry["headers"], content=entry["body"].encode())
+
+    def store(self, request: httpx.Request, response: httpx.Response) -> None:
+        """Save a read, versioned 200 response to a GET."""
+        version = response.headers.get("last-modified-version")
+        if request.method != "GET" or response.status_code != 200 or not version:
+            return
+        entry = {
+            "url": str(request.url),
+            "version": int(version),
+            "headers": {k: response.headers[k] for k in self.KEPT_HEADERS if k in response.headers},
+            "body": response.text,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename: concurrent workers and interrupted runs never leave half an entry.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, self._path(entry["url"]))
+
+
+class CachingTransport(httpx.BaseTransport):
+    """Sync transport answering repeat GETs from a ResponseCache when Zotero says 304."""
+
+    def __init__(self, cache: ResponseCache, inner: httpx.BaseTransport) -> None:
+        self.cache = cache
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.prepare(request)
+        response = self.inner.handle_request(request)
+        if entry and response.status_code == 304:
+            response.close()
+            return self.cache.replay(entry)
+        response.read()
+        self.cache.store(request, response)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of CachingTransport."""
+
+    def __init__(self, cache: ResponseCache, inner: httpx.AsyncBaseTransport) -> None:
+        self.cache = cache
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.cache.prepare(request)
+        response = await self.inner.handle_async_request(request)
+        if entry and response.status_code == 304:
+            await response.aclose()
+            return self.cache.replay(entry)
+        await response.aread()
+        self.cache.store(request, response)
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def sync_client(
+    api_key: str | None,
+    limiter: RateLimiter,
+    cache: ResponseCache | None = None,
+    transport: httpx.BaseTransport | None = None,
+    metrics: FetchMetrics | None = None,
+) -> httpx.Client:
+    """An httpx client for pyzotero: cache (optional) over the shared limiter over `transport`."""
+    stack: httpx.BaseTransport = ThrottledTransport(limiter, transport, metrics)
+    if cache:
+        stack = CachingTransport(cache, stack)
+    return httpx.Client(headers=api_headers(api_key), transport=stack, follow_redirects=True, timeout=TIMEOUT)
+
+
+class AsyncZotero:
+    """Read-only Zotero client for asyncio.
+
+    Unlike pyzotero, which keeps per-request state on the instance and needs a
+    client per thread, this holds no request state: every coroutine shares one
+    httpx connection pool, and `concurrency` bounds the requests in flight.
+    Pacing and retries belong to `limiter`, which other clients may share;
+    `cache` makes repeat GETs conditional (see ResponseCache); `metrics`
+    records every attempt (see FetchMetrics).
+    """
+
+    def __init__(
+        self,
+        library_id: int,
+        library_type: str = "user",
+        api_key: str | None = None,
+        *,
+        concurrency: int = 8,
+        limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        endpoint: str = API_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+        metrics: FetchMetrics | None = None,
+    ) -> None:
+        self.prefix = f"/{library_type}s/{library_id}"
+        self.limiter = limiter or RateLimiter(burst=concurrency)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        stack: httpx.AsyncBaseTransport = AsyncThrottledTransport(
+            self.limiter, transport or httpx.AsyncHTTPTransport(limits=limits), metrics
+        )
+        if cache:
+            stack = AsyncCachingTransport(cache, stack)
+        self.client = httpx.AsyncClient(
+            base_url=endpoint, headers=api_headers(api_key), timeout=TIMEOUT, transport=stack
+        )
+
+    async def __aenter__(self) -> AsyncZotero:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.client.aclose()
+
+    def library(self, library_id: int, library_type: str = "user") -> AsyncZotero:
+        """A view of another library sharing this client's connections, limiter and concurrency.
+
+        Only the client that opened the pool closes it; views need no closing.
+        """
+        view = copy.copy(self)
+        view.prefix = f"/{library_type}s/{library_id}"
+        return view
+
+    async def get(self, url: str, params: dict[str, Any] | None = None) -> httpx.Response:
+        """GET a library-relative path (or an absolute `Link` URL)."""
+        if not url.startswith("http"):
+            url = self.prefix + url
+        async with self.semaphore:
+            response = await self.client.get(url, params=params)
+        response.raise_for_status()
+        return response
+
+    @asynccontextmanager
+    async def stream(self, url: str) -> AsyncIterator[httpx.Response]:
+        """GET a library-relative path without reading the body, following redirects (file downloads)."""
+        async with self.semaphore, self.client.stream("GET", self.prefix + url, follow_redirects=True) as response:
+            response.raise_for_status()
+            yield response
+
+    async def get_json(self, url: str, **params: Any) -> Any:
+        """GET and decode a JSON body."""
+        return (await self.get(url, params)).json()
+
+    async def pages(self, url: str, **params: Any) -> AsyncIterator[list[dict[str, Any]]]:
+        """Yield each page of a listing as it lands.
+
+        The first page's `Total-Results` gives the page count, and the rest
+        are requested at once (`concurrency` and the limiter still apply),
+        so pages may come out of order. Without the header, follow
+        `Link: rel="next"` one page at a time.
+        """
+        params = {"limit": PAGE_SIZE, **params}
+        response = await self.get(url, params)
+        yield response.json()
+        if "Total-Results" not in response.headers:
+            while "next" in response.links:
+                response = await self.get(response.links["next"]["url"])
+                yield response.json()
+            return
+
+        step, total = int(params["limit"]), int(response.headers["Total-Results"])
+        rest = [asyncio.create_task(self.get_json(url, **params, start=start)) for start in range(step, total, step)]
+        try:
+            for page in asyncio.as_completed(rest):
+                yield await page
+        finally:
+            for task in rest:
+                task.cancel()
+
+    async def items(self, keys: list[str]) -> list[dict[str, Any]]:
+        """Full `data` for up to 50 items in one request."""
+        return await self.get_json("/items", itemKey=",".join(keys), include="data", limit=len(keys))
@@ -0,0 +1,241 @@
+"""Read Zotero export files (CSL-JSON, Zotero RDF) as a stream of API-shaped items.
+
+Both readers are incremental: CSL-JSON is decoded one array element at a
+time from fixed-size chunks, Zotero RDF is walked with `iterparse` and each
+top-level node is freed once mapped, so memory stays flat however large the
+export is. Items come out shaped like API items (`key`, `version`, `data`)
+for `parse_items`.
+
+Zotero RDF keeps Related Items (`dc:relation`), so preprints and event
+videos merge as they do from the API. CSL-JSON has no relations field: its
+items are parsed, but not merged.
+"""
+
+import base64
+import hashlib
+import json
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, TextIO
+
+# Characters read per step while scanning a CSL-JSON array.
+CHUNK_SIZE = 1 << 16
+ELEMENT_END = frozenset(",] \t\r\n")
+
+# CSL type -> Zotero itemType, as mapped by Zotero's CSL export.
+CSL_TYPES = {
+    "article-journal": "journalArticle",
+    "paper-conference": "conferencePaper",
+    "report": "report",
+    "article": "preprint",
+    "speech": "presentation",
+    "motion_picture": "videoRecording",
+    "software": "computerProgram",
+    "post-weblog": "blogPost",
+    "webpage": "webpage",
+    "book": "book",
+    "chapter": "bookSection",
+    "thesis": "thesis",
+}
+CSL_CREATORS = {"author": "author", "editor": "editor", "director": "director", "contributor": "contributor"}
+# CSL variable -> Zotero field, for the fields parse_item reads.
+CSL_FIELDS = {
+    "title": "title",
+    "URL": "url",
+    "language": "language",
+    "license": "rights",
+    "collection-title": "series",
+    "publisher-place": "place",
+    "event-place": "place",
+    "genre": "presentationType",
+}
+
+ITEM_URI = re.compile(r"/items/([A-Z0-9]+)$")
+ITEM_KEY = re.compile(r"[A-Z0-9]+")
+# Related Items are stored the way the API stores them, so fetch.extract_related_keys reads them.
+RELATION_URI = "http://zotero.org/users/local/items/{}"
+
+NS = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "z": "http://www.zotero.org/namespaces/export#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+    "bib": "http://purl.org/net/biblio#",
+    "foaf": "http://xmlns.com/foaf/0.1/",
+    "vcard": "http://nwalsh.com/rdf/vCard#",
+}
+RDF_ABOUT = f"{{{NS['rdf']}}}about"
+RDF_RESOURCE = f"{{{NS['rdf']}}}resource"
+# Creator lists are plural elements (bib:authors, z:presenters, ...) holding an rdf:Seq of people.
+RDF_CREATOR_LISTS = {NS["bib"], NS["z"]}
+
+
+def item_key(uri: Any) -> str:
+    """Zotero item key for an item URI (http://zotero.org/users/1/items/KEY) or bare key.
+
+    Zotero RDF names an item by its URL, `urn:isbn:...` or a local `#item_N`
+    instead, and points Related Items at the same resource. Those get a key
+    derived from the resource, so both ends of a relation agree on it.
+    """
+    uri = str(uri)
+    if m := ITEM_URI.search(uri):
+        return m.group(1)
+    if ITEM_KEY.fullmatch(uri):
+        return uri
+    return base64.b32encode(hashlib.sha1(uri.encode()).digest())[:8].decode()
+
+
+def iter_json_array(f: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """Yield the elements of the top-level JSON array in `f`, decoding one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, pos, opened, eof = "", 0, False, False
+    while True:
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char.isspace() or (opened and char == ","):
+                pos += 1
+            elif not opened:
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                opened = True
+                pos += 1
+            elif char == "]":
+                return
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    break  # element continues in the next chunk
+                # A number cut at the chunk edge ("3" of "3.5") decodes, but short:
+                # only trust an element once the delimiter after it is in.
+                if end == len(buffer) or buffer[end] not in ELEMENT_END:
+                    if eof:
+                        raise ValueError(f"Malformed JSON array at {buffer[pos : end + 10]!r}")
+                    break
+                yield value
+                pos = end
+        if eof:
+            raise ValueError("Unterminated JSON array")
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def csl_date(issued: dict[str, Any] | None) -> str:
+    if not issued:
+        return ""
+    if parts := issued.get("date-parts"):
+        return "-".join(f"{int(p):02d}" for p in parts[0] if p)
+    return str(issued.get("raw") or issued.get("literal") or "")
+
+
+def csl_item(csl: dict[str, Any]) -> dict[str, Any]:
+    """Map one CSL-JSON item onto Zotero item data."""
+    key = item_key(csl["id"])
+    data: dict[str, Any] = {
+        "key": key,
+        "version": 0,
+        "itemType": CSL_TYPES.get(csl.get("type", ""), csl.get("type", "")),
+        "date": csl_date(csl.get("issued")),
+        "creators": [
+            {"creatorType": creator_type, "name": name["literal"]}
+            if "literal" in name
+            else {"creatorType": creator_type, "firstName": name.get("given", ""), "lastName": name.get("family", "")}
+            for variable, creator_type in CSL_CREATORS.items()
+            for name in csl.get(variable, [])
+        ],
+        "tags": [{"tag": tag.strip()} for tag in csl.get("keyword", "").split(",") if tag.strip()],
+        "relations": {},
+    }
+    for variable, field in CSL_FIELDS.items():
+        if csl.get(variable):
+            data.setdefault(field, csl[variable])
+    return {"key": key, "version": 0, "data": data}
+
+
+def read_csl_json(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+    """Yield the items of a CSL-JSON export (a JSON array of CSL items)."""
+    with path.open(encoding="utf-8") as f:
+        for csl in iter_json_array(f, chunk_size):
+            yield csl_item(csl)
+
+
+def text(element: ET.Element | None) -> str:
+    return (element.text or "").strip() if element is not None else ""
+
+
+def rdf_creators(node: ET.Element) -> list[dict[str, str]]:
+    creators = []
+    for role in node:
+        namespace, _, local = role.tag[1:].partition("}")
+        if namespace not in RDF_CREATOR_LISTS or not local.endswith("s"):
+            continue
+        for person in role.iterfind("rdf:Seq/rdf:li/foaf:Person", NS):
+            creators.append(
+                {
+                    "creatorType": local.removesuffix("s"),
+                    "firstName": text(person.find("foaf:givenName", NS)),
+                    "lastName": text(person.find("foaf:surname", NS)),
+                }
+            )
+    return creators
+
+
+def rdf_item(node: ET.Element) -> dict[str, Any] | None:
+    """Map one top-level Zotero RDF node onto Zotero item data; None for non-items (journals, notes)."""
+    item_type = text(node.find("z:itemType", NS))
+    if not item_type:
+        return None
+    key = item_key(node.get(RDF_ABOUT, ""))
+    data: dict[str, Any] = {
+        "key": key,
+        "version": 0,
+        "itemType": item_type,
+        "title": text(node.find("dc:title", NS)),
+        "date": text(node.find("dc:date", NS)),
+        "creators": rdf_creators(node),
+        # Manual tags are plain text, automatic ones wrapped in z:AutomaticTag.
+        "tags": [
+            {"tag": text(subject) or text(subject.find(".//rdf:value", NS))}
+            for subject in node.iterfind("dc:subject", NS)
+        ],
+        "relations": {},
+    }
+    related = [
+        RELATION_URI.format(item_key(r.get(RDF_RESOURCE)))
+        for r in node.iterfind("dc:relation", NS)
+        if r.get(RDF_RESOURCE)
+    ]
+    if related:
+        data["relations"]["dc:relation"] = related
+    fields = {
+        "url": text(node.find("dc:identifier/dcterms:URI/rdf:value", NS)),
+        "language": text(node.find("z:language", NS)),
+        "rights": text(node.find("dc:rights", NS)),
+        "series": text(node.find("dcterms:isPartOf/bib:Series/dc:title", NS)),
+        "place": text(node.find(".//vcard:locality", NS)),
+        "presentationType": text(node.find("z:type", NS)) if item_type == "presentation" else "",
+    }
+    data |= {field: value for field, value in fields.items() if value}
+    return {"key": key, "version": 0, "data": data}
+
+
+def read_rdf(path: Path) -> Iterator[dict[str, Any]]:
+    """Yield the items of a Zotero RDF export, one top-level node at a time."""
+    depth = 0
+    root: ET.Element | None = None
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            root = root if root is not None else element
+            continue
+        depth -= 1
+        if depth == 1:  # a complete child of rdf:RDF
+            item = rdf_item(element)
+            root.remove(element)
+            if item:
+                yield item
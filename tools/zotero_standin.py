@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Local stand-in for the slice of the Zotero Web API that fetch uses.
+
+Serves a recorded fixture or a synthetic library of any size, with paging,
+versions, `since`, `itemType`/`tag` filters, trash, deletions, conditional
+requests and 429 rate limiting, so fetch can be exercised and benchmarked offline.
+
+    uv run tools/zotero_standin.py record -o library.json     # live credentials
+    uv run tools/zotero_standin.py serve --fixture library.json --latency 0.05
+    ZOTERO_API_URL=http://127.0.0.1:8085 ZOTERO_API_KEY=x ZOTERO_LIBRARY_ID=1 uv run tools/fetch.py --dry-run
+"""
+
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable, Mapping
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import click
+import httpx
+
+log = logging.getLogger(__name__)
+
+KEY_ALPHABET = "23456789ABCDEFGHIJKLMNPQRSTUVWXYZ"
+MAX_LIMIT = 100
+ITEM_TYPES = [
+    ("journalArticle", 30),
+    ("conferencePaper", 20),
+    ("preprint", 10),
+    ("presentation", 15),
+    ("videoRecording", 5),
+    ("computerProgram", 5),
+    ("blogPost", 5),
+    ("attachment", 7),
+    ("note", 3),
+]
+TAGS = ["casimir", "ai", "mipt", "polytech", "popscience", "habr", "fun", "Drude model", "Casimir force"]
+
+
+def synthetic_items(count: int, seed: int = 0, library_id: int = 1) -> list[dict[str, Any]]:
+    """A reproducible library shaped like ours: mixed types, tags, related preprints and talks."""
+    rng = random.Random(seed)
+    types, weights = zip(*ITEM_TYPES, strict=True)
+    keys = ["".join(rng.choices(KEY_ALPHABET, k=8)) for _ in range(count)]
+    items = []
+    for i, key in enumerate(keys):
+        item_type = rng.choices(types, weights)[0]
+        data: dict[str, Any] = {
+            "key": key,
+            "version": i + 1,
+            "itemType": item_type,
+            "title": f"Synthetic {item_type} {i}",
+            "creators": [
+                {"creatorType": "author", "firstName": rng.choice("ABCDE"), "lastName": f"Author{rng.randrange(50)}"}
+                for _ in range(rng.randrange(1, 4))
+            ],
+            "date": f"{rng.randrange(2005, 2027)}-{rng.randrange(1, 13):02}-{rng.randrange(1, 29):02}",
+            "tags": [{"tag": t} for t in rng.sample(TAGS, rng.randrange(0, 3))],
+            "url": f"https://example.org/{key}",
+            "language": rng.choice(["en", "ru"]),
+            "relations": {},
+        }
+        if item_type in ("preprint", "videoRecording") and i:
+            data["relations"] = {"dc:relation": f"http://zotero.org/users/{library_id}/items/{keys[i - 1]}"}
+        items.append({"key": key, "version": i + 1, "data": data})
+    return items
+
+
+def search_matches(values: set[str], query: str) -> bool:
+    """Zotero search syntax: `a || b` matches either, a leading `-` negates the whole query."""
+    wanted = {v.strip().casefold() for v in query.removeprefix("-").split("||")}
+    return bool({v.casefold() for v in values} & wanted) != query.startswith("-")
+
+
+class StandInLibrary:
+    """An in-memory library answering Zotero API requests.
+
+    `handle` is the whole API: both the HTTP server (`serve`) and the
+    in-process httpx transport (`transport`) delegate to it. `rate_limit`
+    (requests/second, burst of one second's worth) answers 429 with
+    `Retry-After` when exceeded; `backoff` adds a `Backoff` header to every
+    reply, as Zotero does under load; `complete=False` strips `data` from
+    listings to force detail requests.
+    """
+
+    def __init__(
+        self,
+        items: list[dict[str, Any]],
+        *,
+        library_id: int = 1,
+        library_type: str = "user",
+        rate_limit: float | None = None,
+        backoff: float | None = None,
+        complete: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.items = {item["key"]: item for item in items}
+        self.version = max((item["version"] for item in items), default=0)
+        self.deleted: dict[str, int] = {}
+        # Attachment key -> stored file, served via a redirect as Zotero does (to S3).
+        self.files: dict[str, bytes] = {}
+        self.prefix = f"/{library_type}s/{library_id}"
+        self.group = library_type == "group"
+        # Further libraries answered on this one's transport and server (see `mount`).
+        self.mounted: dict[str, StandInLibrary] = {}
+        self.rate_limit = rate_limit
+        self.backoff = backoff
+        self.complete = complete
+        self.clock = clock
+        self.requests: list[str] = []
+        self.rate_limited = 0
+        self._tokens = rate_limit or 0.0
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_fixture(cls, path: Path, **kwargs: Any) -> StandInLibrary:
+        """Load raw items recorded with `record` (same shape fetch returns)."""
+        with path.open() as f:
+            return cls(json.load(f), **kwargs)
+
+    def touch(self, key: str, **fields: Any) -> None:
+        """Edit an item (or add one), bumping the library version."""
+        with self._lock:
+            self.version += 1
+            item = self.items.setdefault(key, {"key": key, "data": {"key": key, "relations": {}}})
+            item["version"] = item["data"]["version"] = self.version
+            item["data"].update(fields)
+
+    def attach(self, parent: str, key: str, content: bytes) -> None:
+        """Add a stored PDF attachment under `parent`, as a child item with its file."""
+        self.touch(
+            key,
+            itemType="attachment",
+            parentItem=parent,
+            linkMode="imported_file",
+            contentType="application/pdf",
+            md5=hashlib.md5(content).hexdigest(),
+            title=f"{key}.pdf",
+        )
+        self.files[key] = content
+
+    def trash(self, key: str) -> None:
+        """Move an item to the trash: out of listings and My Publications, but not in /deleted yet."""
+        self.touch(key, deleted=1)
+
+    def delete(self, key: str) -> None:
+        """Delete an item, bumping the library version."""
+        with self._lock:
+            self.version += 1
+            del self.items[key]
+            self.deleted[key] = self.version
+
+    def mount(self, other: StandInLibrary) -> StandInLibrary:
+        """Also serve `other` (e.g. a group library) from this library's transport and server."""
+        self.mounted[other.prefix] = other
+        return self
+
+    def _throttled(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        now = self.clock()
+        self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            self.rate_limited += 1
+            return True
+        self._tokens -= 1
+        return False
+
+    def handle(self, url: httpx.URL, headers: Mapping[str, str]) -> tuple[int, dict[str, str], bytes]:
+        """Answer one GET: (status, headers, body)."""
+        for prefix, other in self.mounted.items():
+            if url.path.startswith(f"{prefix}/"):
+                return other.handle(url, headers)
+        with self._lock:
+            self.requests.append(url.path)
+            if self._throttled():
+                return 429, {"Retry-After": "1"}, b""
+            path = url.path.removeprefix(self.prefix)
+            params = url.params
+            since = int(params.get("since", 0))
+            unmodified = int(headers.get("if-modified-since-version", -1))
+            reply_headers = {"Content-Type": "application/json", "Last-Modified-Version": str(self.version)}
+            if self.backoff:
+                reply_headers["Backoff"] = str(self.backoff)
+
+            if path.startswith("/files/"):
+                body = self.files.get(path.removeprefix("/files/"))
+                if body is None:
+                    return 404, {}, b"Not found"
+                return 200, {"Content-Type": "application/pdf"}, body
+            if path.startswith("/items/") and path.endswith("/file"):
+                key = path.removeprefix("/items/").removesuffix("/file")
+                if key not in self.files:
+                    return 404, {}, b"Not found"
+                return 302, {"Location": f"{self.prefix}/files/{key}"}, b""
+            if path.startswith("/items/"):
+                item = self.items.get(path.removeprefix("/items/"))
+                if item is None:
+                    return 404, {}, b"Not found"
+                if unmodified >= item["version"]:
+                    return 304, reply_headers, b""
+                return 200, reply_headers, json.dumps(item).encode()
+            if unmodified >= self.version:
+                return 304, reply_headers, b""
+            if path == "/deleted":
+                body = {"items": [k for k, v in self.deleted.items() if v > since], "collections": [], "tags": []}
+                return 200, reply_headers, json.dumps(body).encode()
+            if path not in ("/items", "/publications/items") or (path == "/publications/items" and self.group):
+                return 404, {}, b"Not found"  # only user libraries have My Publications
+
+            matched = [i for i in self.items.values() if i["version"] > since]
+            if path == "/publications/items" or params.get("includeTrashed") != "1":
+                matched = [i for i in matched if not i["data"].get("deleted")]
+            if "itemType" in params:
+                matched = [i for i in matched if search_matches({i["data"].get("itemType", "")}, params["itemType"])]
+            for query in params.get_list("tag"):
+                matched = [i for i in matched if search_matches({t["tag"] for t in i["data"].get("tags", [])}, query)]
+            if "itemKey" in params:
+                wanted = set(params["itemKey"].split(","))
+                matched = [i for i in matched if i["key"] in wanted]
+            if params.get("format") == "versions":
+                return 200, reply_headers, json.dumps({i["key"]: i["version"] for i in matched}).encode()
+
+            start, limit = int(params.get("start", 0)), min(int(params.get("limit", MAX_LIMIT)), MAX_LIMIT)
+            page = matched[start : start + limit]
+            if not (self.complete or "itemKey" in params):
+                page = [{"key": i["key"], "version": i["version"], "data": {"key": i["key"]}} for i in page]
+            reply_headers["Total-Results"] = str(len(matched))
+            if start + limit < len(matched):
+                reply_headers["Link"] = f'<{url.copy_set_param("start", start + limit)}>; rel="next"'
+            return 200, reply_headers, json.dumps(page).encode()
+
+    def transport(self) -> httpx.MockTransport:
+        """In-process httpx transport, for tests: no sockets, no latency."""
+
+        def respond(request: httpx.Request) -> httpx.Response:
+            status, headers, body = self.handle(request.url, request.headers)
+            return httpx.Response(status, headers=headers, content=body)
+
+        return httpx.MockTransport(respond)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+        """Start a keep-alive HTTP server in a daemon thread; `latency` seconds per request."""
+        library = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                time.sleep(latency)
+                url = httpx.URL(f"http://{self.headers['Host']}{self.path}")
+                status, headers, body = library.handle(url, {k.lower(): v for k, v in self.headers.items()})
+                self.send_response(status)
+                for name, value in {**headers, "Content-Length": str(len(body))}.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                log.debug(format % args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+@click.group()
+def main() -> None:
+    """Serve or record a Zotero library for offline fetch runs."""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+
+@main.command()
+@click.option("--fixture", type=click.Path(exists=True), help="Raw items recorded with `record`")
+@click.option("--items", type=int, default=1000, help="Synthetic library size (without --fixture)")
+@click.option("--port", type=int, default=8085)
+@click.option("--latency", type=float, default=0.0, help="Seconds added to every response")
+@click.option("--rate-limit", type=float, help="Requests/second before answering 429")
+@click.option("--incomplete", is_flag=True, help="Serve listings without item data")
+def serve(
+    fixture: str | None,
+    items: int,
+    port: int,
+    latency: float,
+    rate_limit: float | None,
+    incomplete: bool,
+) -> None:
+    """Serve a library until interrupted."""
+    options: dict[str, Any] = {"rate_limit": rate_limit, "complete": not incomplete}
+    library = (
+        StandInLibrary.from_fixture(Path(fixture), **options)
+        if fixture
+        else StandInLibrary(synthetic_items(items), **options)
+    )
+    server = library.serve(port=port, latency=latency)
+    log.info(f"Serving {len(library.items)} items at {server_url(server)}/users/1 (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+@main.command()
+@click.option("-o", "--output", type=click.Path(), required=True, help="Fixture file to write")
+def record(output: str) -> None:
+    """Record the live library (ZOTERO_* credentials) as a replayable fixture."""
+    from fetch import ZoteroFetcherConfig, fetch_from_zotero
+
+    items = fetch_from_zotero(ZoteroFetcherConfig.from_env())
+    Path(output).write_text(json.dumps(items, ensure_ascii=False))
+    log.info(f"Recorded {len(items)} items to {output}")
+
+
+if __name__ == "__main__":
+    main()
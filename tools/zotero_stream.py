@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Push-based change detection over the Zotero streaming API (WebSocket).
+
+Subscribes to the library topic and, for every burst of `topicUpdated`
+events, runs the same update path as `check_zotero.py --state`, printing one
+change set per line. Reconnects with backoff and polls while disconnected.
+Needs the optional `websockets` package (`archive-tools[stream]`).
+
+    uv run tools/zotero_stream.py --state .cache/zotero-version.json
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+import click
+
+from check_zotero import check_state
+from fetch import Library
+
+try:
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import WebSocketException
+except ImportError:  # optional dependency: only the listener needs it
+    connect = None
+    WebSocketException = OSError
+
+log = logging.getLogger(__name__)
+
+STREAM_URL = "wss://stream.zotero.org"
+
+
+class StreamError(RuntimeError):
+    """The stream refused or dropped our subscription."""
+
+
+class StreamListener:
+    """Calls `on_update` whenever the subscribed library changes.
+
+    A burst of `topicUpdated` events within `debounce` seconds fires one
+    update, after the burst. Every (re)subscription fires one too, to catch
+    up on anything missed while disconnected. A dropped connection is
+    retried after the server's `retry` hint, doubling per failure up to
+    `max_retry`; meanwhile `on_update` still runs every `poll_interval`
+    seconds, so a dead stream degrades to plain polling instead of going
+    silent. Set `stop` to shut down.
+
+    `on_update` is synchronous (e.g. `Watcher.poll`) and runs in a thread;
+    its exceptions are logged, never fatal.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        topic: str,
+        on_update: Callable[[], Any],
+        *,
+        url: str = STREAM_URL,
+        debounce: float = 2.0,
+        poll_interval: float = 300.0,
+        max_retry: float = 300.0,
+    ) -> None:
+        if connect is None:
+            raise RuntimeError("The streaming listener needs the `websockets` package (archive-tools[stream])")
+        self.api_key = api_key
+        self.topic = topic
+        self.on_update = on_update
+        self.url = url
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_retry = max_retry
+        # Server's reconnect hint (seconds), sent in its greeting.
+        self.retry = 10.0
+        self.failures = 0
+        self.updates = 0
+        self.stop = asyncio.Event()
+        self._timer: asyncio.Task[None] | None = None
+        self._lock = asyncio.Lock()
+
+    async def update(self) -> None:
+        """Run `on_update` once; concurrent triggers queue up rather than overlap."""
+        async with self._lock:
+            self.updates += 1
+            try:
+                await asyncio.to_thread(self.on_update)
+            except Exception as e:
+                log.warning(f"Update failed: {e}")
+
+    def schedule(self) -> None:
+        """(Re)start the debounce timer."""
+        if self._timer:
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._fire_later())
+
+    async def _fire_later(self) -> None:
+        await asyncio.sleep(self.debounce)
+        await self.update()
+
+    async def session(self) -> None:
+        """One connection: subscribe, then dispatch events until it closes."""
+        async with connect(self.url) as ws:
+            hello = json.loads(await ws.recv())
+            if hello.get("event") != "connected":
+                raise StreamError(f"Unexpected greeting: {hello}")
+            self.retry = hello.get("retry", self.retry * 1000) / 1000
+            subscription = {"apiKey": self.api_key, "topics": [self.topic]}
+            await ws.send(json.dumps({"action": "createSubscriptions", "subscriptions": [subscription]}))
+            async for message in ws:
+                event = json.loads(message)
+                match event.get("event"):
+                    case "subscriptionsCreated":
+                        if event.get("errors"):
+                            raise StreamError(f"Subscription refused: {event['errors']}")
+                        log.info(f"Subscribed to {self.topic} on {self.url}")
+                        self.failures = 0
+                        await self.update()
+                    case "topicUpdated" if event.get("topic") == self.topic:
+                        log.info(f"{self.topic} updated to version {event.get('version')}")
+                        self.schedule()
+                    case "topicRemoved" if event.get("topic") == self.topic:
+                        raise StreamError(f"Access to {self.topic} revoked")
+
+    async def sleep(self, seconds: float) -> bool:
+        """Sleep unless stopped first; return whether the listener was stopped."""
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self.stop.wait(), seconds)
+        return self.stop.is_set()
+
+    async def disconnected(self, delay: float) -> None:
+        """Wait `delay` before reconnecting, polling every `poll_interval` meanwhile."""
+        deadline = time.monotonic() + delay
+        while deadline - time.monotonic() > self.poll_interval:
+            if await self.sleep(self.poll_interval):
+                return
+            await self.update()
+        await self.sleep(max(0.0, deadline - time.monotonic()))
+
+    async def run(self) -> None:
+        """Listen until `stop` is set, reconnecting as needed."""
+        while not self.stop.is_set():
+            session = asyncio.create_task(self.session())
+            stopped = asyncio.create_task(self.stop.wait())
+            await asyncio.wait({session, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            stopped.cancel()
+            if self.stop.is_set():
+                session.cancel()
+                break
+            try:
+                session.result()
+                log.info("Stream closed by server")
+            except (OSError, WebSocketException, StreamError) as e:
+                log.warning(f"Stream unavailable: {e}")
+                self.failures += 1
+            delay = min(self.max_retry, self.retry * 2 ** max(0, self.failures - 1))
+            log.info(f"Reconnecting in {delay:.0f}s")
+            await self.disconnected(delay)
+        if self._timer:
+            self._timer.cancel()
+
+
+@click.command()
+@click.option("--state", type=click.Path(), required=True, help="State file shared with check_zotero.py --state")
+@click.option("--debounce", type=float, default=2.0, help="Seconds of quiet before acting on a burst of updates")
+@click.option("--poll-interval", type=float, default=300.0, help="Polling period while the stream is down")
+def main(state: str, debounce: float, poll_interval: float) -> None:
+    """Print the library change set (JSON) each time Zotero pushes an update."""
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s", stream=sys.stderr)
+    api_key = os.environ.get("ZOTERO_API_KEY")
+    library_id = os.environ.get("ZOTERO_LIBRARY_ID")
+    if not api_key or not library_id:
+        raise SystemExit("Missing ZOTERO_API_KEY or ZOTERO_LIBRARY_ID")
+    library_type = os.environ.get("ZOTERO_LIBRARY_TYPE", "user")
+    library = Library(library_type, int(library_id))
+
+    def report() -> None:
+        changes = check_state(Path(state), api_key, library)
+        if changes.changed or changes.removed:
+            print(json.dumps(asdict(changes)), flush=True)
+
+    listener = StreamListener(
+        api_key,
+        f"/{library_type}s/{library_id}",
+        report,
+        url=os.environ.get("ZOTERO_STREAM_URL", STREAM_URL),
+        debounce=debounce,
+        poll_interval=poll_interval,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(listener.run())
+
+
+if __name__ == "__main__":
+    main()